@@ -1,27 +1,56 @@
 import os
+import time
+import random
 import logging
-from flask import Flask, request, jsonify, session
+import threading
+from flask import Blueprint, Flask, request, jsonify, session, Response, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
 from arango import ArangoClient
 from dotenv import load_dotenv
 import traceback
-from datetime import datetime
+from match_index import MatchIndex, after_cursor, encode_cursor, decode_cursor
+from embedding_index import EmbeddingIndex
+from seen_sets import SeenSets
+from cache import create_cache
+from skill_catalog import SkillCatalog, SUGGEST_LIMIT
+from swipe_ingest import SwipeIngest, Backlogged, swipe_key, swipe_document, is_valid_target
+import queries
+import schema
+import mutual_matches
+import conversations
+import events
+import feeds
+import instrumentation
+import hashing
+import transport
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"]}})
+api = Blueprint('api', __name__)
+jwt = JWTManager()
 
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default-dev-key')
-# Make JWT tokens never expire
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
+def create_app(config=None):
+    """Build the Flask app. No database calls happen here; see ensure_db()."""
+    app = Flask(__name__)
+    CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"]}})
 
-jwt = JWTManager(app)
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default-dev-key')
+    # Make JWT tokens never expire
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
+    # EventSource can't set headers, so /events also accepts ?jwt=<token>
+    app.config['JWT_TOKEN_LOCATION'] = ['headers', 'query_string']
+    if config:
+        app.config.update(config)
+
+    jwt.init_app(app)
+    instrumentation.init_app(app)
+    app.before_request(connect_before_request)
+    app.register_blueprint(api)
+    return app
 
 db = None
 users = None
@@ -29,86 +58,328 @@ skills = None
 graph = None
 matches = None
 messages = None
+match_candidates = None
+candidate_feeds = None
+feed_builder = None
+swipe_ingest = None
+mutual_match = None
 db_connected = False
+warmed_up = False
+match_index = MatchIndex()
+embedding_index = EmbeddingIndex(match_index)
+seen_sets = SeenSets()
+skill_catalog = SkillCatalog()
+cache = create_cache()
+event_bus = events.create_event_bus()
+password_hasher = hashing.HashPool()
 
-try:
-    ARANGO_URL = os.getenv("ARANGO_URL")
-    ARANGO_DB_NAME = os.getenv("ARANGO_DB_NAME")
-    ARANGO_USERNAME = os.getenv("ARANGO_USERNAME")
-    ARANGO_PASSWORD = os.getenv("ARANGO_PASSWORD")
-    
-    client = ArangoClient(hosts=ARANGO_URL)
-    
-    sys_db = client.db('_system', username=ARANGO_USERNAME, password=ARANGO_PASSWORD)
-    
-    if not sys_db.has_database(ARANGO_DB_NAME):
-        logger.info(f"Database {ARANGO_DB_NAME} not found, creating it...")
-        sys_db.create_database(ARANGO_DB_NAME)
-        logger.info(f"Database {ARANGO_DB_NAME} created successfully")
-    
-    db = client.db(ARANGO_DB_NAME, username=ARANGO_USERNAME, password=ARANGO_PASSWORD)
-    
-    if not db.has_collection('users'):
-        users = db.create_collection('users')
-        logger.info("Created 'users' collection")
-    else:
-        users = db.collection('users')
-        logger.info("Using existing 'users' collection")
-    
-    if not db.has_collection('skills'):
-        skills = db.create_collection('skills')
-        logger.info("Created 'skills' collection")
-    else:
-        skills = db.collection('skills')
-        logger.info("Using existing 'skills' collection")
-    
-    if not db.has_graph('skill_graph'):
-        graph = db.create_graph('skill_graph')
-        logger.info("Created 'skill_graph' graph")
-        
-        if not graph.has_vertex_collection('users'):
-            graph.create_vertex_collection('users')
-        if not graph.has_vertex_collection('skills'):
-            graph.create_vertex_collection('skills')
-        
-        if not graph.has_edge_definition('has_skill'):
-            graph.create_edge_definition(
-                edge_collection='has_skill',
-                from_vertex_collections=['users'],
-                to_vertex_collections=['skills']
-            )
-        if not graph.has_edge_definition('wants_to_learn'):
-            graph.create_edge_definition(
-                edge_collection='wants_to_learn',
-                from_vertex_collections=['users'],
-                to_vertex_collections=['skills']
-            )
-    else:
-        graph = db.graph('skill_graph')
-        logger.info("Using existing 'skill_graph' graph")
-    
-    if not db.has_collection('matches'):
-        matches = db.create_collection('matches')
-        logger.info("Created 'matches' collection")
+PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL_SECONDS', 300))
+SKILL_CATALOG_TTL = int(os.getenv('SKILL_CATALOG_CACHE_TTL_SECONDS', 3600))
+SKILL_CATALOG_KEY = 'skills:catalog'
+
+# Delay before retrying a failed connection, doubling up to the maximum
+DB_RETRY_BASE_SECONDS = float(os.getenv('DB_RETRY_BASE_SECONDS', 0.5))
+DB_RETRY_MAX_SECONDS = float(os.getenv('DB_RETRY_MAX_SECONDS', 30))
+
+_connect_lock = threading.Lock()
+http_client = None
+connect_failures = 0
+next_connect_at = 0
+
+def connect_db():
+    global db, users, skills, graph, matches, messages, match_candidates, candidate_feeds, mutual_match
+    global feed_builder, swipe_ingest, db_connected, http_client
+
+    if http_client is None:
+        http_client = transport.PooledHTTPClient()
+    client = ArangoClient(hosts=http_client.primary, http_client=http_client)
+    username = os.getenv("ARANGO_USERNAME")
+    password = os.getenv("ARANGO_PASSWORD")
+    database = client.db(os.getenv("ARANGO_DB_NAME"), username=username, password=password)
+
+    # A single marker read on warm start; collections and indexes are only
+    # checked one by one when the schema version changed
+    schema.bootstrap(database, sys_db=client.db('_system', username=username, password=password))
+
+    # Collection and graph handles don't make requests
+    db = database
+    users = db.collection('users')
+    skills = db.collection('skills')
+    matches = db.collection('matches')
+    messages = db.collection('messages')
+    match_candidates = db.collection('match_candidates')
+    candidate_feeds = db.collection(feeds.COLLECTION)
+    graph = db.graph(schema.GRAPH)
+    mutual_match = graph.edge_collection(mutual_matches.EDGE_COLLECTION)
+
+    if feed_builder is None:
+        feed_builder = feeds.FeedBuilder(db, match_index, seen_sets)
+        feed_builder.start()
     else:
-        matches = db.collection('matches')
-        logger.info("Using existing 'matches' collection")
+        feed_builder.db = db
 
-    if not db.has_collection('messages'):
-        messages = db.create_collection('messages')
-        logger.info("Created 'messages' collection")
+    if swipe_ingest is None:
+        swipe_ingest = SwipeIngest(db, on_mutual=link_mutual_match, on_unlinked=close_mutual_match)
+        # Seen-sets loaded from the database can't see swipes still queued here
+        seen_sets.pending = swipe_ingest.pending_targets
+        swipe_ingest.start()
     else:
-        messages = db.collection('messages')
-        logger.info("Using existing 'messages' collection")
-    
-    logger.info("ArangoDB setup completed successfully")
+        swipe_ingest.db = db
+
     db_connected = True
-    
-except Exception as e:
-    logger.error(f"Error setting up ArangoDB: {e}")
+    logger.info("ArangoDB setup completed successfully")
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+def warm_up():
+    """Load the in-memory indexes so the first requests don't pay for it."""
+    global warmed_up
+    try:
+        skill_catalog.load(db)
+    except Exception as e:
+        logger.error(f"Error loading skill catalog: {e}")
+
+    try:
+        match_index.load(db)
+    except Exception as e:
+        logger.error(f"Error loading match index: {e}")
+
+    try:
+        embedding_index.build()
+    except Exception as e:
+        logger.error(f"Error building embedding index: {e}")
+
+    warmed_up = True
+
+def ensure_db():
+    """Connect on first use, and again after a failure once the backoff has passed."""
+    global connect_failures, next_connect_at
+    if db_connected:
+        return True
+    if time.time() < next_connect_at:
+        return False
+
+    with _connect_lock:
+        if db_connected or time.time() < next_connect_at:
+            return db_connected
+        try:
+            connect_db()
+            connect_failures = 0
+        except Exception as e:
+            connect_failures += 1
+            delay = min(DB_RETRY_MAX_SECONDS, DB_RETRY_BASE_SECONDS * 2 ** (connect_failures - 1))
+            delay *= random.uniform(0.5, 1)
+            next_connect_at = time.time() + delay
+            logger.error(f"Error setting up ArangoDB (attempt {connect_failures}), retrying in {delay:.1f}s: {e}")
+    return db_connected
+
+def mark_disconnected(e):
+    # The next request reconnects, starting with the shortest backoff
+    global db_connected, connect_failures, next_connect_at
+    if db_connected:
+        logger.error(f"Lost ArangoDB connection: {e}")
     db_connected = False
+    connect_failures = 0
+    next_connect_at = 0
+
+def connect_before_request():
+    # Liveness and metrics must answer without waiting on the database
+    if request.endpoint not in ('api.health_check', 'api.get_metrics'):
+        ensure_db()
+
+def profile_cache_key(user_key):
+    return f'profile:{user_key}'
+
+def resolve_skill(name, category='Technical'):
+    """Key of the skill called name (or an alias of it), creating the skill if needed."""
+    skill_catalog.ensure_fresh(db)
+    skill_id, created = skill_catalog.ensure(db, name, category)
+    if created:
+        cache.delete(SKILL_CATALOG_KEY)
+    return skill_id
+
+def invalidate_match_candidates(user_key):
+    # Precomputed lists are rebuilt by batch_scorer.py; until then a user whose
+    # skills changed is served from the live match index.
+    try:
+        match_candidates.delete(user_key, ignore_missing=True)
+    except Exception as e:
+        logger.error(f"Error invalidating match candidates for {user_key}: {e}")
+    # The user's own feed is rebuilt and their position in other feeds rescored
+    feed_builder.profile_changed(user_key)
+
+# Field each /predict mode ranks by, used for pagination cursors
+RANK_FIELDS = {
+    'complementary': 'match_score',
+    'similar': 'similarity',
+    'fuzzy': 'fuzzy_score'
+}
+MAX_PREDICT_LIMIT = 50
+# Every user_similarity edge of a user; the job keeps at most top-K of them
+SIMILAR_FETCH_LIMIT = 100
+
+# Edge collection and batch queries for each skill type
+SKILL_EDGES = {
+    'teaching': ('has_skill', queries.ADD_TEACHING_EDGES, queries.REMOVE_TEACHING_EDGES),
+    'learning': ('wants_to_learn', queries.ADD_LEARNING_EDGES, queries.REMOVE_LEARNING_EDGES)
+}
+MAX_BATCH_SKILLS = int(os.getenv('MAX_BATCH_SKILLS', 100))
+
+def parse_skill_batch(data):
+    """Parse a /skills/batch body into per-item results. Raises ValueError on bad input.
+
+    Each result is a dict that the caller fills in with a status; items
+    that can't be applied are returned already marked invalid.
+    """
+    if not isinstance(data, dict) or not any(data.get(kind) for kind in SKILL_EDGES):
+        raise ValueError("Expected 'teaching' and/or 'learning' edits")
+
+    results = []
+    for kind in SKILL_EDGES:
+        edits = data.get(kind) or {}
+        if not isinstance(edits, dict):
+            raise ValueError(f"'{kind}' must be an object with 'add' and 'remove' lists")
+        for action in ('remove', 'add'):
+            items = edits.get(action) or []
+            if not isinstance(items, list):
+                raise ValueError(f"'{kind}.{action}' must be a list")
+            for item in items:
+                if isinstance(item, str):
+                    item = {'skill_id' if action == 'remove' else 'skill_name': item}
+                name = item.get('skill_id' if action == 'remove' else 'skill_name') if isinstance(item, dict) else None
+                result = {'type': kind, 'action': action}
+                if not isinstance(name, str) or not name.strip():
+                    result['status'] = 'invalid'
+                else:
+                    # Removals take a skill id, but names and aliases resolve too
+                    result['skill_id'] = skill_catalog.key_for(name)
+                    if action == 'add':
+                        result['name'] = name.strip()
+                        if kind == 'teaching':
+                            result['level'] = item.get('skill_level', 'Intermediate')
+                results.append(result)
+
+    if len(results) > MAX_BATCH_SKILLS:
+        raise ValueError(f"At most {MAX_BATCH_SKILLS} skill edits per batch")
+    return results
+
+def page_args(args):
+    """Parse ?limit= and ?cursor= for /predict. Raises ValueError on bad input."""
+    limit = int(args.get('limit', 5))
+    if not 1 <= limit <= MAX_PREDICT_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_PREDICT_LIMIT}")
+    cursor = args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+def page_cursor(candidates, limit, mode):
+    # A short page means the ranking is exhausted
+    if len(candidates) < limit:
+        return None
+    last = candidates[-1]
+    return encode_cursor(last.get(RANK_FIELDS[mode], last['match_score']), last['user_id'])
+
+def rank_candidates(user_key, precomputed, limit=5, seen=(), after=None):
+    # Prefer the list precomputed by batch_scorer.py (one document lookup),
+    # then fall back to the in-memory skill index instead of scanning every
+    # user and their edges on each call. Both are ordered by score, then key.
+    if precomputed:
+        page = [
+            candidate for candidate in precomputed.get('candidates', [])
+            if candidate['user_id'] not in seen
+            and after_cursor(candidate['match_score'], candidate['user_id'], after)
+        ][:limit]
+        if len(page) >= limit:
+            return page
+    match_index.ensure_fresh(db)
+    return match_index.top_matches(user_key, limit=limit, exclude=seen, after=after)
+
+def feed_candidates(user_key, feed, limit=5, seen=(), after=None, precomputed=None):
+    # One page from the user's candidate feed (a single document read); a
+    # missing, stale or nearly used-up feed is rebuilt in the background
+    # while the page is ranked on the spot.
+    page = []
+    if feed is not None:
+        page = [
+            (score, other) for score, other in zip(feed['scores'], feed['ids'])
+            if other not in seen and after_cursor(score, other, after)
+        ][:limit]
+    if feeds.is_stale(feed) or len(page) < limit:
+        feed_builder.request_rebuild(user_key)
+    if len(page) < limit:
+        if precomputed is None:
+            precomputed = match_candidates.get(user_key)
+        return rank_candidates(user_key, precomputed, limit, seen, after)
+    match_index.ensure_fresh(db)
+    return [match_index.payload(user_key, other, score) for score, other in page]
 
-@app.route('/register', methods=['POST'])
+def similar_candidates(user_key, similar, limit=5, seen=(), after=None):
+    # similar holds GET_SIMILAR_USERS rows; users the similarity job hasn't
+    # reached yet get the complementary ranking instead of an empty page.
+    if not similar:
+        return rank_candidates(user_key, match_candidates.get(user_key), limit, seen, after)
+    match_index.ensure_fresh(db)
+    results = []
+    for row in similar:
+        if row['user_id'] in seen or not after_cursor(row['similarity'], row['user_id'], after):
+            continue
+        candidate = match_index.payload(user_key, row['user_id'])
+        candidate['similarity'] = row['similarity']
+        candidate['match_percentage'] = round(row['similarity'] * 100)
+        results.append(candidate)
+        if len(results) >= limit:
+            break
+    return results
+
+def fuzzy_candidates(user_key, limit=5, seen=(), after=None):
+    # Nearest neighbours on hashed skill-name embeddings, so "React" and
+    # "React Native" count as related; falls back when the user has no skills.
+    match_index.ensure_fresh(db)
+    embedding_index.ensure_fresh()
+    ranked = embedding_index.top_matches(user_key, limit=limit, exclude=seen, after=after)
+    if ranked is None:
+        return rank_candidates(user_key, match_candidates.get(user_key), limit, seen, after)
+    results = []
+    for other, fuzzy_score in ranked:
+        candidate = match_index.payload(user_key, other)
+        candidate['fuzzy_score'] = fuzzy_score
+        candidate['match_percentage'] = min(100, round(fuzzy_score * 50))
+        results.append(candidate)
+    return results
+
+def too_many_auth_requests(e):
+    response = jsonify({"error": "Too many sign-in requests right now. Please try again shortly."})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+def swipes_backlogged(e):
+    response = jsonify({"error": "Too many swipes right now. Please try again shortly."})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+def has_liked(user_key, other_key):
+    """True if user_key's latest swipe on other_key is a like, counting swipes that aren't written yet."""
+    liked = swipe_ingest.pending(user_key, other_key)
+    if liked is None:
+        swipe = matches.get(swipe_key(user_key, other_key))
+        liked = bool(swipe and swipe.get('liked'))
+    return liked
+
+def link_mutual_match(user_key, other_key):
+    mutual_matches.link(mutual_match, user_key, other_key)
+    conversations.open_conversation(db, user_key, other_key)
+    event_bus.publish(user_key, events.MATCH_MUTUAL, {'user_id': other_key})
+    event_bus.publish(other_key, events.MATCH_MUTUAL, {'user_id': user_key})
+
+def close_mutual_match(user_key, other_key):
+    conversations.close_conversation(db, user_key, other_key)
+
+def is_active_match(conversation, user_key, other_key):
+    # Conversations are opened on a mutual match and closed on a dislike;
+    # pairs from before the conversations backfill fall back to the edge.
+    if conversation is not None:
+        return conversation.get('active', False) and user_key in conversation['participants']
+    return mutual_matches.is_mutual(mutual_match, user_key, other_key)
+
+@api.route('/register', methods=['POST'])
 def register():
     try:
         if not db_connected:
@@ -125,7 +396,7 @@ def register():
         user = {
             'username': data['username'],
             'email': data['email'],
-            'password': generate_password_hash(data['password']),
+            'password': password_hasher.hash(data['password']),
             'primary_skill': data.get('primary_skill', ''),
             'secondary_skill': data.get('secondary_skill', ''),
             'learning_goal': data.get('learning_goal', '')
@@ -133,18 +404,10 @@ def register():
         
         meta = users.insert(user)
         user_key = meta['_key']
+        match_index.add_user(user_key, user['username'])
         
         if data.get('primary_skill'):
-            skill_id = data['primary_skill'].replace(" ", "_").lower()
-            try:
-                if not skills.has(skill_id):
-                    skills.insert({
-                        '_key': skill_id,
-                        'name': data['primary_skill'],
-                        'category': 'Technical'
-                    })
-            except:
-                pass
+            skill_id = resolve_skill(data['primary_skill'])
                 
             has_skill = graph.edge_collection('has_skill')
             has_skill.insert({
@@ -152,32 +415,27 @@ def register():
                 '_to': f'skills/{skill_id}',
                 'proficiency': 5
             })
+            match_index.add_skill(user_key, f'skills/{skill_id}', 'teaching')
         
         if data.get('learning_goal'):
-            skill_id = data['learning_goal'].replace(" ", "_").lower()
-            try:
-                if not skills.has(skill_id):
-                    skills.insert({
-                        '_key': skill_id,
-                        'name': data['learning_goal'],
-                        'category': 'Technical'
-                    })
-            except:
-                pass
+            skill_id = resolve_skill(data['learning_goal'])
                 
             wants_to_learn = graph.edge_collection('wants_to_learn')
             wants_to_learn.insert({
                 '_from': f'users/{user_key}',
                 '_to': f'skills/{skill_id}'
             })
+            match_index.add_skill(user_key, f'skills/{skill_id}', 'learning')
         
         return jsonify({"message": "User created successfully", "user_id": user_key}), 201
     
+    except hashing.PoolSaturated as e:
+        return too_many_auth_requests(e)
     except Exception as e:
         logger.error(f"Error in registration: {e}")
         return jsonify({"error": "Registration failed. Please try again."}), 500
 
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login():
     try:
         if not db_connected:
@@ -190,9 +448,14 @@ def login():
         cursor = users.find({'username': data['username']})
         user = next(cursor, None)
         
-        if not user or not check_password_hash(user['password'], data['password']):
+        if not user or not password_hasher.verify(user['password'], data['password']):
             return jsonify({"error": "Invalid credentials"}), 401
         
+        if password_hasher.needs_rehash(user['password']):
+            password_hasher.rehash_later(
+                data['password'], lambda pwhash: users.update({'_key': user['_key'], 'password': pwhash})
+            )
+        
         access_token = create_access_token(identity=user['_key'])
         return jsonify({
             "message": "Login successful",
@@ -201,11 +464,13 @@ def login():
             "username": user['username']
         })
     
+    except hashing.PoolSaturated as e:
+        return too_many_auth_requests(e)
     except Exception as e:
         logger.error(f"Error in login: {e}")
         return jsonify({"error": "Login failed. Please try again."}), 500
 
-@app.route('/profile', methods=['GET'])
+@api.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     try:
@@ -213,42 +478,17 @@ def get_profile():
             return jsonify({"error": "Database connection not available"}), 503
             
         user_key = get_jwt_identity()
-        user = users.get({'_key': user_key})
-        
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-        
-        user.pop('password', None)
-        
-        aql = """
-        WITH users, skills, has_skill, wants_to_learn
-        LET user_skills = (
-            FOR skill IN OUTBOUND CONCAT('users/', @user_key) has_skill
-            RETURN {
-                id: skill._key,
-                name: skill.name,
-                category: skill.category
-            }
-        )
         
-        LET learning_goals = (
-            FOR skill IN OUTBOUND CONCAT('users/', @user_key) wants_to_learn
-            RETURN {
-                id: skill._key,
-                name: skill.name,
-                category: skill.category
-            }
+        # User document and skill traversals in one statement, cached until
+        # one of the endpoints below changes them
+        profile = cache.get_or_load(
+            profile_cache_key(user_key),
+            lambda: next(db.aql.execute(queries.GET_PROFILE, bind_vars={'user_key': user_key}), None),
+            ttl=PROFILE_CACHE_TTL
         )
         
-        RETURN {
-            user: @user,
-            skills: user_skills,
-            learning_goals: learning_goals
-        }
-        """
-        
-        cursor = db.aql.execute(aql, bind_vars={'user_key': user_key, 'user': user})
-        profile = next(cursor)
+        if not profile:
+            return jsonify({"error": "User not found"}), 404
         
         return jsonify(profile)
     
@@ -256,7 +496,7 @@ def get_profile():
         logger.error(f"Error fetching profile: {e}")
         return jsonify({"error": "Could not retrieve profile"}), 500
 
-@app.route('/profile', methods=['PUT'])
+@api.route('/profile', methods=['PUT'])
 @jwt_required()
 def update_profile():
     try:
@@ -279,25 +519,13 @@ def update_profile():
         
         if update_data:
             users.update({'_key': user_key}, update_data)
+            if 'username' in update_data:
+                match_index.rename_user(user_key, update_data['username'])
         
         if 'primary_skill' in data and data['primary_skill']:
-            skill_id = data['primary_skill'].replace(" ", "_").lower()
-            
-            try:
-                if not skills.has(skill_id):
-                    skills.insert({
-                        '_key': skill_id,
-                        'name': data['primary_skill'],
-                        'category': 'Technical'
-                    })
-            except:
-                pass
+            skill_id = resolve_skill(data['primary_skill'])
             
-            aql_remove = """
-            FOR edge IN has_skill
-                FILTER edge._from == @user_doc
-                REMOVE edge IN has_skill
-            """
+            aql_remove = queries.REMOVE_ALL_TEACHING_SKILLS
             db.aql.execute(aql_remove, bind_vars={'user_doc': f'users/{user_key}'})
             
             has_skill = graph.edge_collection('has_skill')
@@ -306,25 +534,13 @@ def update_profile():
                 '_to': f'skills/{skill_id}',
                 'proficiency': 5
             })
+            match_index.set_skills(user_key, [f'skills/{skill_id}'], 'teaching')
+            invalidate_match_candidates(user_key)
         
         if 'learning_goal' in data and data['learning_goal']:
-            skill_id = data['learning_goal'].replace(" ", "_").lower()
-            
-            try:
-                if not skills.has(skill_id):
-                    skills.insert({
-                        '_key': skill_id,
-                        'name': data['learning_goal'],
-                        'category': 'Technical'
-                    })
-            except:
-                pass
+            skill_id = resolve_skill(data['learning_goal'])
             
-            aql_remove = """
-            FOR edge IN wants_to_learn
-                FILTER edge._from == @user_doc
-                REMOVE edge IN wants_to_learn
-            """
+            aql_remove = queries.REMOVE_ALL_LEARNING_GOALS
             db.aql.execute(aql_remove, bind_vars={'user_doc': f'users/{user_key}'})
             
             wants_to_learn = graph.edge_collection('wants_to_learn')
@@ -332,6 +548,10 @@ def update_profile():
                 '_from': f'users/{user_key}',
                 '_to': f'skills/{skill_id}'
             })
+            match_index.set_skills(user_key, [f'skills/{skill_id}'], 'learning')
+            invalidate_match_candidates(user_key)
+        
+        cache.delete(profile_cache_key(user_key))
         
         return jsonify({"message": "Profile updated successfully"})
     
@@ -339,7 +559,7 @@ def update_profile():
         logger.error(f"Error updating profile: {e}")
         return jsonify({"error": "Profile update failed"}), 500
 
-@app.route('/add-skill', methods=['POST'])
+@api.route('/add-skill', methods=['POST'])
 @jwt_required()
 def add_skill():
     try:
@@ -356,18 +576,15 @@ def add_skill():
         skill_type = data['skill_type']
         skill_level = data.get('skill_level', 'Intermediate')
         
-        skill_id = skill_name.replace(" ", "_").lower()
-        
         try:
-            if not skills.has(skill_id):
-                skills.insert({
-                    '_key': skill_id,
-                    'name': skill_name,
-                    'category': skill_level if skill_type == 'teaching' else 'Technical'
-                })
-            else:
-                if skill_type == 'teaching':
-                    skills.update({'_key': skill_id}, {'category': skill_level})
+            skill_id = resolve_skill(skill_name, skill_level if skill_type == 'teaching' else 'Technical')
+            if skill_type == 'teaching' and skill_catalog.get(skill_id).get('category') != skill_level:
+                skills.update({'_key': skill_id}, {'category': skill_level})
+                skill_catalog.update(skill_id, category=skill_level)
+                # Every profile listing this skill shows its category
+                cache.delete(SKILL_CATALOG_KEY, *(
+                    profile_cache_key(holder) for holder in match_index.holders(f'skills/{skill_id}')
+                ))
         except Exception as e:
             logger.error(f"Error creating skill document: {e}")
             return jsonify({"error": "Failed to create skill"}), 500
@@ -376,12 +593,7 @@ def add_skill():
             if skill_type == 'teaching':
                 has_skill = graph.edge_collection('has_skill')
                 
-                aql_check = """
-                WITH users, skills, has_skill
-                FOR edge IN has_skill
-                    FILTER edge._from == @user_doc AND edge._to == @skill_doc
-                    RETURN edge
-                """
+                aql_check = queries.FIND_TEACHING_EDGE
                 
                 cursor = db.aql.execute(
                     aql_check, 
@@ -399,16 +611,12 @@ def add_skill():
                         '_to': f'skills/{skill_id}',
                         'proficiency': 5
                     })
+                match_index.add_skill(user_key, f'skills/{skill_id}', 'teaching')
                 
             elif skill_type == 'learning':
                 wants_to_learn = graph.edge_collection('wants_to_learn')
                 
-                aql_check = """
-                WITH users, skills, wants_to_learn
-                FOR edge IN wants_to_learn
-                    FILTER edge._from == @user_doc AND edge._to == @skill_doc
-                    RETURN edge
-                """
+                aql_check = queries.FIND_LEARNING_EDGE
                 
                 cursor = db.aql.execute(
                     aql_check, 
@@ -425,6 +633,7 @@ def add_skill():
                         '_from': f'users/{user_key}',
                         '_to': f'skills/{skill_id}'
                     })
+                match_index.add_skill(user_key, f'skills/{skill_id}', 'learning')
             
             else:
                 return jsonify({"error": "Invalid skill type. Must be 'teaching' or 'learning'"}), 400
@@ -432,6 +641,9 @@ def add_skill():
         except Exception as e:
             logger.error(f"Error creating relationship: {e}")
             return jsonify({"error": "Failed to associate skill with user"}), 500
+        
+        invalidate_match_candidates(user_key)
+        cache.delete(profile_cache_key(user_key))
             
         return jsonify({
             "message": f"Successfully added {skill_type} skill",
@@ -448,7 +660,50 @@ def add_skill():
         logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to add skill. Please try again."}), 500
 
-@app.route('/remove-skill', methods=['POST'])
+@api.route('/skills', methods=['GET'])
+@jwt_required()
+def list_skills():
+    try:
+        if not db_connected:
+            return jsonify({"error": "Database connection not available"}), 503
+        
+        catalog = cache.get_or_load(
+            SKILL_CATALOG_KEY,
+            lambda: list(db.aql.execute(queries.LIST_SKILLS, batch_size=10000)),
+            ttl=SKILL_CATALOG_TTL
+        )
+        
+        return jsonify({"skills": catalog})
+    
+    except Exception as e:
+        logger.error(f"Error listing skills: {e}")
+        return jsonify({"error": "Failed to load skills. Please try again."}), 500
+
+@api.route('/skills/suggest', methods=['GET'])
+@jwt_required()
+def suggest_skills():
+    try:
+        if not db_connected:
+            return jsonify({"error": "Database connection not available"}), 503
+        
+        try:
+            limit = max(1, min(int(request.args.get('limit', 10)), SUGGEST_LIMIT))
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+        
+        skill_catalog.ensure_fresh(db)
+        suggestions = skill_catalog.suggest(request.args.get('q', ''), limit)
+        
+        return jsonify({"suggestions": [
+            {"id": skill['id'], "name": skill['name'], "category": skill.get('category')}
+            for skill in suggestions
+        ]})
+    
+    except Exception as e:
+        logger.error(f"Error suggesting skills: {e}")
+        return jsonify({"error": "Failed to suggest skills. Please try again."}), 500
+
+@api.route('/remove-skill', methods=['POST'])
 @jwt_required()
 def remove_skill():
     try:
@@ -466,12 +721,7 @@ def remove_skill():
         
         try:
             if skill_type == 'teaching':
-                aql_remove = """
-                WITH users, skills, has_skill
-                FOR edge IN has_skill
-                    FILTER edge._from == @user_doc AND edge._to == @skill_doc
-                    REMOVE edge IN has_skill
-                """
+                aql_remove = queries.REMOVE_TEACHING_EDGE
                 db.aql.execute(
                     aql_remove, 
                     bind_vars={
@@ -479,14 +729,10 @@ def remove_skill():
                         'skill_doc': f'skills/{skill_id}'
                     }
                 )
+                match_index.remove_skill(user_key, f'skills/{skill_id}', 'teaching')
                 
             elif skill_type == 'learning':
-                aql_remove = """
-                WITH users, skills, wants_to_learn
-                FOR edge IN wants_to_learn
-                    FILTER edge._from == @user_doc AND edge._to == @skill_doc
-                    REMOVE edge IN wants_to_learn
-                """
+                aql_remove = queries.REMOVE_LEARNING_EDGE
                 db.aql.execute(
                     aql_remove, 
                     bind_vars={
@@ -494,6 +740,7 @@ def remove_skill():
                         'skill_doc': f'skills/{skill_id}'
                     }
                 )
+                match_index.remove_skill(user_key, f'skills/{skill_id}', 'learning')
             
             else:
                 return jsonify({"error": "Invalid skill type. Must be 'teaching' or 'learning'"}), 400
@@ -501,6 +748,9 @@ def remove_skill():
         except Exception as e:
             logger.error(f"Error removing relationship: {e}")
             return jsonify({"error": "Failed to remove skill from user"}), 500
+        
+        invalidate_match_candidates(user_key)
+        cache.delete(profile_cache_key(user_key))
             
         return jsonify({
             "message": f"Successfully removed {skill_type} skill",
@@ -511,62 +761,136 @@ def remove_skill():
         logger.error(f"Error removing skill: {e}")
         return jsonify({"error": "Failed to remove skill. Please try again."}), 500
 
-@app.route("/predict", methods=["POST"])
+@api.route('/skills/batch', methods=['POST'])
 @jwt_required()
-def predict():
+def batch_skills():
     try:
         if not db_connected:
             return jsonify({"error": "Database connection not available"}), 503
             
         user_key = get_jwt_identity()
+        user_doc = f'users/{user_key}'
         
-        logger.info(f"Finding matches for user: {user_key}")
+        skill_catalog.ensure_fresh(db)
+        try:
+            results = parse_skill_batch(request.get_json())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        edits = [result for result in results if result.get('status') != 'invalid']
+        
+        # Same skill documents add_skill would create or recategorize
+        new_skills = {}
+        categories = {}
+        for result in edits:
+            if result['action'] != 'add':
+                continue
+            category = result.get('level', 'Technical')
+            skill = skill_catalog.get(result['skill_id'])
+            if skill is None:
+                new_skills.setdefault(result['skill_id'], skill_catalog.document(result['skill_id'], result['name'], category))
+            elif result['type'] == 'teaching' and skill.get('category') != category:
+                categories[result['skill_id']] = category
+        
+        # Removals are applied before additions, all in one stream transaction
+        removed = {}
+        created = {}
+        txn = db.begin_transaction(write=['skills'] + [edge for edge, _, _ in SKILL_EDGES.values()])
+        try:
+            if new_skills:
+                txn.collection('skills').insert_many(list(new_skills.values()), overwrite_mode='ignore')
+            if categories:
+                txn.collection('skills').update_many([
+                    {'_key': skill_id, 'category': category} for skill_id, category in categories.items()
+                ])
+            for kind, (_, add_edges, remove_edges) in SKILL_EDGES.items():
+                to_remove = {f"skills/{r['skill_id']}" for r in edits if r['type'] == kind and r['action'] == 'remove'}
+                to_add = {f"skills/{r['skill_id']}" for r in edits if r['type'] == kind and r['action'] == 'add'}
+                if to_remove:
+                    removed[kind] = set(txn.aql.execute(
+                        remove_edges, bind_vars={'user_doc': user_doc, 'skill_docs': sorted(to_remove)}
+                    ))
+                if to_add:
+                    created[kind] = {
+                        row['skill_doc']: row['created'] for row in txn.aql.execute(
+                            add_edges, bind_vars={'user_doc': user_doc, 'skill_docs': sorted(to_add)}
+                        )
+                    }
+            txn.commit_transaction()
+        except Exception as e:
+            logger.error(f"Error applying skill batch: {e}")
+            txn.abort_transaction()
+            return jsonify({"error": "Failed to update skills. Please try again."}), 500
+        
+        for skill_id, skill in new_skills.items():
+            skill_catalog.remember(skill_id, skill['name'], skill['category'])
+        for skill_id, category in categories.items():
+            skill_catalog.update(skill_id, category=category)
+        
+        for result in edits:
+            skill_doc = f"skills/{result['skill_id']}"
+            if result['action'] == 'remove':
+                result['status'] = 'removed' if skill_doc in removed[result['type']] else 'not_found'
+                match_index.remove_skill(user_key, skill_doc, result['type'])
+            else:
+                result['status'] = 'added' if created[result['type']][skill_doc] else 'unchanged'
+                match_index.add_skill(user_key, skill_doc, result['type'])
+        
+        invalidations = [profile_cache_key(user_key)]
+        if new_skills or categories:
+            invalidations.append(SKILL_CATALOG_KEY)
+        for skill_id in categories:
+            invalidations += [profile_cache_key(holder) for holder in match_index.holders(f'skills/{skill_id}')]
+        cache.delete(*set(invalidations))
+        if any(result.get('status') in ('added', 'removed') for result in edits):
+            invalidate_match_candidates(user_key)
         
-        aql = """
-        WITH users, skills, has_skill, wants_to_learn
-        FOR user IN users
-            FILTER user._key == @user_key
-            LET my_skills = (
-                FOR skill IN OUTBOUND CONCAT('users/', @user_key) has_skill
-                    RETURN skill._id
-            )
-            LET my_goals = (
-                FOR goal IN OUTBOUND CONCAT('users/', @user_key) wants_to_learn
-                    RETURN goal._id
-            )
-            FOR other IN users
-                FILTER other._key != @user_key
-                LET other_skills = (
-                    FOR skill IN OUTBOUND CONCAT('users/', other._key) has_skill
-                        RETURN skill._id
-                )
-                LET other_goals = (
-                    FOR goal IN OUTBOUND CONCAT('users/', other._key) wants_to_learn
-                        RETURN goal._id
-                )
-                LET skill_match = LENGTH(INTERSECTION(my_skills, other_goals))
-                LET goal_match = LENGTH(INTERSECTION(my_goals, other_skills))
-                LET match_score = skill_match + goal_match
-                
-                SORT match_score DESC
-                LIMIT 5
-                RETURN {
-                    user_id: other._key,
-                    username: other.username,
-                    match_score: match_score,
-                    matching_skills: INTERSECTION(my_goals, other_skills),
-                    matching_goals: INTERSECTION(my_skills, other_goals),
-                    all_skills: other_skills,
-                    all_goals: other_goals,
-                    match_percentage: CEIL(match_score * 20)
-                }
-        """
+        return jsonify({
+            "message": f"Applied {sum(1 for r in edits if r['status'] in ('added', 'removed'))} skill changes",
+            "results": results
+        })
         
-        cursor = db.aql.execute(aql, bind_vars={'user_key': user_key})
-        matches = [doc for doc in cursor]
+    except Exception as e:
+        logger.error(f"Error in skill batch: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Failed to update skills. Please try again."}), 500
+
+@api.route("/predict", methods=["POST"])
+@jwt_required()
+def predict():
+    try:
+        if not db_connected:
+            return jsonify({"error": "Database connection not available"}), 503
+            
+        user_key = get_jwt_identity()
+        
+        mode = request.args.get('mode', 'complementary')
+        if mode not in RANK_FIELDS:
+            return jsonify({"error": f"Invalid mode: {mode}"}), 400
+        
+        try:
+            limit, after = page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        logger.info(f"Finding {mode} matches for user: {user_key}")
+        
+        # Users already swiped on are never offered again
+        seen = seen_sets.get(db, user_key)
+        
+        if mode == 'similar':
+            similar = list(db.aql.execute(
+                queries.GET_SIMILAR_USERS,
+                bind_vars={'user_key': user_key, 'limit': SIMILAR_FETCH_LIMIT}
+            ))
+            matches = similar_candidates(user_key, similar, limit, seen, after)
+        elif mode == 'fuzzy':
+            matches = fuzzy_candidates(user_key, limit, seen, after)
+        else:
+            matches = feed_candidates(user_key, candidate_feeds.get(user_key), limit, seen, after)
         
         logger.info(f"Found {len(matches)} matches for user {user_key}")
-        return jsonify({"matches": matches})
+        return jsonify({"matches": matches, "cursor": page_cursor(matches, limit, mode)})
 
     except Exception as e:
         logger.error(f"Error predicting matches: {e}")
@@ -574,7 +898,7 @@ def predict():
         logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to find matches. Please try again."}), 500
 
-@app.route('/swipe', methods=['POST', 'OPTIONS'])
+@api.route('/swipe', methods=['POST', 'OPTIONS'])
 @jwt_required()
 def record_swipe():
     if request.method == 'OPTIONS':
@@ -593,40 +917,42 @@ def record_swipe():
         target_user_id = data['target_user_id']
         liked = data['liked']
         
-        # Record this user's swipe decision
-        match_record = {
-            'user_id': user_key,
-            'target_user_id': target_user_id,
-            'liked': liked,
-            'created_at': datetime.now().isoformat()
-        }
+        # The target is part of the swipe's document key, so it's checked before queueing
+        if not is_valid_target(user_key, target_user_id) or not isinstance(liked, bool):
+            return jsonify({"error": "Invalid swipe"}), 400
+        if target_user_id not in match_index.usernames and not users.has(target_user_id):
+            return jsonify({"error": "User not found"}), 404
+        
+        # Record this user's swipe decision, replacing any earlier one on the same user
+        match_record = swipe_document(user_key, target_user_id, liked)
         
-        matches.insert(match_record)
+        # Queued and written in the next group commit, unless SWIPE_WRITE_BEHIND is off
+        swipe_ingest.submit(match_record)
+        seen_sets.add(user_key, target_user_id)
         
         # Check if it's a mutual match
         is_mutual_match = False
         match_details = None
         
         if liked:
-            # Check if the other user also liked this user
-            query = {
-                'user_id': target_user_id,
-                'target_user_id': user_key,
-                'liked': True
-            }
-            cursor = matches.find(query)
-            other_match = next(cursor, None)
-            
-            if other_match:
+            # Likes still queued in another worker are caught when it flushes them
+            if has_liked(target_user_id, user_key):
                 is_mutual_match = True
+                link_mutual_match(user_key, target_user_id)
                 
                 # Get information about the match for the frontend
-                user_doc = users.get({'_key': target_user_id})
-                if user_doc:
+                username = match_index.usernames.get(target_user_id)
+                if username is None:
+                    user_doc = users.get({'_key': target_user_id})
+                    username = user_doc.get('username') if user_doc else None
+                if username is not None:
                     match_details = {
                         'user_id': target_user_id,
-                        'username': user_doc.get('username')
+                        'username': username
                     }
+        elif not swipe_ingest.write_behind and mutual_matches.unlink(mutual_match, user_key, target_user_id):
+            # With write-behind, the group commit unlinks disliked pairs
+            close_mutual_match(user_key, target_user_id)
         
         return jsonify({
             "success": True,
@@ -634,12 +960,14 @@ def record_swipe():
             "match_details": match_details
         })
         
+    except Backlogged as e:
+        return swipes_backlogged(e)
     except Exception as e:
         logger.error(f"Error recording swipe: {e}")
         logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to record choice. Please try again."}), 500
 
-@app.route('/matches', methods=['GET'])
+@api.route('/matches', methods=['GET'])
 @jwt_required()
 def get_matches():
     try:
@@ -648,65 +976,11 @@ def get_matches():
             
         user_key = get_jwt_identity()
         
-        # Find all mutual matches (where both users liked each other)
-        aql = """
-        WITH matches, users
-        LET mutual_matches = (
-            FOR m1 IN matches
-                FILTER m1.user_id == @user_key AND m1.liked == true
-                FOR m2 IN matches
-                    FILTER m2.user_id == m1.target_user_id 
-                      AND m2.target_user_id == @user_key 
-                      AND m2.liked == true
-                    RETURN m2.user_id
-        )
-        
-        LET result = (
-            FOR user_id IN mutual_matches
-                LET user = DOCUMENT(CONCAT('users/', user_id))
-                
-                // Count messages between these users
-                LET message_count = LENGTH(
-                    FOR msg IN messages
-                        FILTER (msg.sender_id == @user_key AND msg.receiver_id == user_id) OR
-                               (msg.sender_id == user_id AND msg.receiver_id == @user_key)
-                        RETURN msg
-                )
-                
-                // Count unread messages
-                LET unread_count = LENGTH(
-                    FOR msg IN messages
-                        FILTER msg.sender_id == user_id AND 
-                              msg.receiver_id == @user_key AND
-                              msg.is_read == false
-                        RETURN msg
-                )
-                
-                // Get the most recent message
-                LET last_message = FIRST(
-                    FOR msg IN messages
-                        FILTER (msg.sender_id == @user_key AND msg.receiver_id == user_id) OR
-                               (msg.sender_id == user_id AND msg.receiver_id == @user_key)
-                        SORT msg.created_at DESC
-                        LIMIT 1
-                        RETURN msg.text
-                )
-                
-                RETURN {
-                    id: user_id,
-                    username: user.username,
-                    last_message: last_message,
-                    message_count: message_count,
-                    unread_count: unread_count,
-                    max_messages: 5  // Message limit for MVP
-                }
-        )
-        
-        RETURN result
-        """
+        # Conversation summaries of all mutual matches (where both users liked each other)
+        aql = queries.GET_MATCHES
         
         cursor = db.aql.execute(aql, bind_vars={'user_key': user_key})
-        matches_list = next(cursor, [])
+        matches_list = [doc for doc in cursor]
         
         return jsonify({"matches": matches_list})
         
@@ -715,7 +989,7 @@ def get_matches():
         logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to load matches. Please try again."}), 500
 
-@app.route('/messages/<match_id>', methods=['GET'])
+@api.route('/messages/<match_id>', methods=['GET'])
 @jwt_required()
 def get_messages(match_id):
     try:
@@ -724,60 +998,88 @@ def get_messages(match_id):
             
         user_key = get_jwt_identity()
         
-        # Verify this is a valid match (both users liked each other)
-        aql_check = """
-        WITH matches
-        RETURN LENGTH(
-            FOR m1 IN matches
-                FILTER m1.user_id == @user_key AND m1.target_user_id == @match_id AND m1.liked == true
-                FOR m2 IN matches
-                    FILTER m2.user_id == @match_id AND m2.target_user_id == @user_key AND m2.liked == true
-                    RETURN 1
-        ) > 0
-        """
-        
-        cursor = db.aql.execute(aql_check, bind_vars={'user_key': user_key, 'match_id': match_id})
-        is_valid_match = next(cursor)
+        since = request.args.get('since')
+        since_position = None
+        if since:
+            try:
+                since_position = conversations.decode_cursor(since)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor"}), 400
         
-        if not is_valid_match:
+        # Verify this is a valid match (both users liked each other); the
+        # conversation summary also tells us the newest message without a scan
+        conversation = conversations.get(db, user_key, match_id)
+        
+        if not is_active_match(conversation, user_key, match_id):
             return jsonify({"error": "Invalid match or unauthorized access"}), 403
         
-        # Get messages
-        aql = """
-        WITH messages
-        LET msg_list = (
-            FOR msg IN messages
-                FILTER (msg.sender_id == @user_key AND msg.receiver_id == @match_id) OR
-                       (msg.sender_id == @match_id AND msg.receiver_id == @user_key)
-                SORT msg.created_at ASC
-                RETURN {
-                    id: msg._key,
-                    senderId: msg.sender_id,
-                    text: msg.text,
-                    timestamp: msg.created_at,
-                    isRead: msg.is_read
-                }
-        )
+        if since_position and conversation is not None:
+            latest = conversations.latest_cursor(conversation)
+            if latest is None or latest == since:
+                # Nothing new since the client's cursor
+                if request.if_none_match.contains(since):
+                    return '', 304
+                response = jsonify({"messages": [], "cursor": since})
+                response.set_etag(since)
+                return response
+        
+        # Get messages, only those after the cursor when one was given
+        if since_position:
+            aql = queries.GET_MESSAGES_SINCE
+            bind_vars = {
+                'user_key': user_key,
+                'match_id': match_id,
+                'since_at': since_position[0],
+                'since_key': since_position[1]
+            }
+        else:
+            aql = queries.GET_MESSAGES
+            bind_vars = {'user_key': user_key, 'match_id': match_id}
         
-        // Mark messages as read
-        FOR msg IN messages
-            FILTER msg.sender_id == @match_id AND msg.receiver_id == @user_key AND msg.is_read == false
-            UPDATE msg WITH { is_read: true } IN messages
-            
-        RETURN msg_list
-        """
+        cursor = db.aql.execute(aql, bind_vars=bind_vars)
+        messages_list = [doc for doc in cursor]
         
-        cursor = db.aql.execute(aql, bind_vars={'user_key': user_key, 'match_id': match_id})
-        messages_list = next(cursor, [])
+        if messages_list:
+            next_cursor = conversations.encode_cursor(messages_list[-1]['timestamp'], messages_list[-1]['id'])
+        else:
+            next_cursor = since or conversations.latest_cursor(conversation)
         
-        return jsonify({"messages": messages_list})
+        response = jsonify({"messages": messages_list, "cursor": next_cursor})
+        if next_cursor:
+            response.set_etag(next_cursor)
+        return response
         
     except Exception as e:
         logger.error(f"Error fetching messages: {e}")
         logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to load messages. Please try again."}), 500
 
-@app.route('/messages/send', methods=['POST'])
+@api.route('/messages/<match_id>/read', methods=['POST'])
+@jwt_required()
+def mark_messages_read(match_id):
+    try:
+        if not db_connected:
+            return jsonify({"error": "Database connection not available"}), 503
+            
+        user_key = get_jwt_identity()
+        
+        conversation = conversations.get(db, user_key, match_id)
+        if not is_active_match(conversation, user_key, match_id):
+            return jsonify({"error": "Invalid match or unauthorized access"}), 403
+        
+        # Idempotent: repeating the call just finds nothing left to mark
+        marked = conversations.mark_read(db, user_key, match_id)
+        if marked:
+            event_bus.publish(match_id, events.MESSAGE_READ, {'match_id': user_key, 'marked': marked})
+        
+        return jsonify({"success": True, "marked": marked})
+        
+    except Exception as e:
+        logger.error(f"Error marking messages as read: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Failed to mark messages as read. Please try again."}), 500
+
+@api.route('/messages/send', methods=['POST'])
 @jwt_required()
 def send_message():
     try:
@@ -794,51 +1096,19 @@ def send_message():
         text = data['text']
         
         # Verify this is a valid match (both users liked each other)
-        aql_check = """
-        WITH matches
-        RETURN LENGTH(
-            FOR m1 IN matches
-                FILTER m1.user_id == @user_key AND m1.target_user_id == @recipient_id AND m1.liked == true
-                FOR m2 IN matches
-                    FILTER m2.user_id == @recipient_id AND m2.target_user_id == @user_key AND m2.liked == true
-                    RETURN 1
-        ) > 0
-        """
-        
-        cursor = db.aql.execute(aql_check, bind_vars={'user_key': user_key, 'recipient_id': recipient_id})
-        is_valid_match = next(cursor)
+        is_valid_match = mutual_matches.is_mutual(mutual_match, user_key, recipient_id)
         
         if not is_valid_match:
             return jsonify({"error": "You can only message users you've matched with"}), 403
         
-        # Check message limit (5 messages max)
-        aql_count = """
-        WITH messages
-        RETURN LENGTH(
-            FOR msg IN messages
-                FILTER (msg.sender_id == @user_key AND msg.receiver_id == @recipient_id) OR
-                       (msg.sender_id == @recipient_id AND msg.receiver_id == @user_key)
-                RETURN 1
-        )
-        """
+        # Store the message and update the conversation summary; the
+        # message limit (5 messages max) is enforced in the same statement
+        message = conversations.send(db, user_key, recipient_id, text)
         
-        cursor = db.aql.execute(aql_count, bind_vars={'user_key': user_key, 'recipient_id': recipient_id})
-        message_count = next(cursor)
-        
-        if message_count >= 5:
+        if message is None:
             return jsonify({"error": "Message limit reached for this match"}), 403
         
-        # Create message
-        message = {
-            'sender_id': user_key,
-            'receiver_id': recipient_id,
-            'text': text,
-            'is_read': False,
-            'created_at': datetime.now().isoformat()
-        }
-        
-        meta = messages.insert(message)
-        message_id = meta['_key']
+        message_id = message['_key']
         
         # Return the new message
         message_response = {
@@ -849,6 +1119,9 @@ def send_message():
             'isRead': False
         }
         
+        event_bus.publish(recipient_id, events.MESSAGE_CREATED, {'match_id': user_key, 'message': message_response})
+        event_bus.publish(user_key, events.MESSAGE_CREATED, {'match_id': recipient_id, 'message': message_response})
+        
         return jsonify({"message": message_response})
         
     except Exception as e:
@@ -856,7 +1129,19 @@ def send_message():
         logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to send message. Please try again."}), 500
 
-@app.route('/pending-matches', methods=['POST'])
+@api.route('/events', methods=['GET'])
+@jwt_required()
+def event_stream():
+    user_key = get_jwt_identity()
+    
+    # One long-lived connection per client instead of polling every conversation
+    return Response(
+        stream_with_context(events.stream(event_bus, user_key)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/pending-matches', methods=['POST'])
 @jwt_required()
 def get_pending_matches():
     try:
@@ -866,61 +1151,7 @@ def get_pending_matches():
         user_key = get_jwt_identity()
         
         # Find users who liked the current user, but current user hasn't liked them back yet
-        aql = """
-        WITH matches, users
-        LET users_who_liked_me = (
-            FOR m IN matches
-                FILTER m.target_user_id == @user_key AND m.liked == true
-                RETURN m.user_id
-        )
-        
-        LET users_i_liked = (
-            FOR m IN matches
-                FILTER m.user_id == @user_key AND m.liked == true
-                RETURN m.target_user_id
-        )
-        
-        // Find users who liked me but I haven't liked back
-        LET pending_user_ids = MINUS(users_who_liked_me, users_i_liked)
-        
-        // Get user info and match percentage for each pending match
-        LET pending_matches = (
-            FOR pending_id IN pending_user_ids
-                // Calculate match score for frontend display
-                LET pending_user = DOCUMENT(CONCAT('users/', pending_id))
-                
-                // Get the user's skills and goals
-                LET my_skills = (
-                    FOR skill IN OUTBOUND CONCAT('users/', @user_key) has_skill
-                        RETURN skill._id
-                )
-                LET my_goals = (
-                    FOR goal IN OUTBOUND CONCAT('users/', @user_key) wants_to_learn
-                        RETURN goal._id
-                )
-                LET other_skills = (
-                    FOR skill IN OUTBOUND CONCAT('users/', pending_id) has_skill
-                        RETURN skill._id
-                )
-                LET other_goals = (
-                    FOR goal IN OUTBOUND CONCAT('users/', pending_id) wants_to_learn
-                        RETURN goal._id
-                )
-                
-                // Calculate match score
-                LET skill_match = LENGTH(INTERSECTION(my_skills, other_goals))
-                LET goal_match = LENGTH(INTERSECTION(my_goals, other_skills))
-                LET match_score = skill_match + goal_match
-                
-                RETURN {
-                    user_id: pending_id,
-                    username: pending_user.username,
-                    match_percentage: CEIL(match_score * 20)
-                }
-        )
-        
-        RETURN pending_matches
-        """
+        aql = queries.GET_PENDING_MATCHES
         
         cursor = db.aql.execute(aql, bind_vars={'user_key': user_key})
         pending_matches = next(cursor, [])
@@ -932,13 +1163,68 @@ def get_pending_matches():
         logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to load pending matches. Please try again."}), 500
 
-@app.route('/health', methods=['GET'])
+@api.route('/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    try:
+        if not db_connected:
+            return jsonify({"error": "Database connection not available"}), 503
+            
+        user_key = get_jwt_identity()
+        
+        # Matches, pending matches and the precomputed candidates in one AQL
+        # round-trip, sharing a single computation of the user's skills/goals
+        aql = queries.GET_DASHBOARD
+        
+        cursor = db.aql.execute(aql, bind_vars={'user_key': user_key})
+        dashboard = next(cursor)
+        
+        return jsonify({
+            "matches": dashboard['matches'],
+            "pending_matches": dashboard['pending_matches'],
+            "predictions": feed_candidates(
+                user_key, dashboard['feed'],
+                seen=seen_sets.get(db, user_key),
+                precomputed=dashboard['precomputed']
+            )
+        })
+        
+    except Exception as e:
+        logger.error(f"Error loading dashboard: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Failed to load dashboard. Please try again."}), 500
+
+@api.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy",
-        "database": "connected" if db_connected else "disconnected"
+        "database": "connected" if db_connected else "disconnected",
+        "cache": cache.stats(),
+        "password_hashing": password_hasher.stats(),
+        "swipes": swipe_ingest.stats() if swipe_ingest else None
     })
 
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(instrumentation.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/ready', methods=['GET'])
+def readiness_check():
+    # Unlike /health, only ready once the database answers and the indexes are loaded
+    if ensure_db():
+        try:
+            db.version()
+        except Exception as e:
+            mark_disconnected(e)
+    ready = db_connected and warmed_up
+    return jsonify({
+        "status": "ready" if ready else "starting" if db_connected else "unavailable",
+        "database": "connected" if db_connected else "disconnected",
+        "indexes_loaded": warmed_up
+    }), 200 if ready else 503
+
+app = create_app()
+
 if __name__ == "__main__":
     port = int(os.getenv('PORT', 8088))
     debug = os.getenv('FLASK_ENV') == 'development'
@@ -0,0 +1,82 @@
+from urllib.parse import quote
+import httpx
+
+
+class AsyncArangoError(Exception):
+    def __init__(self, status_code, error_num=None, message=''):
+        super().__init__(f"[HTTP {status_code}][ERR {error_num}] {message}")
+        self.status_code = status_code
+        self.error_num = error_num
+
+
+class AsyncArangoClient:
+    """Minimal asyncio client for the ArangoDB HTTP API.
+
+    Covers what the async server needs (AQL cursors and single-document
+    reads/writes) over one pooled, keep-alive httpx connection pool.
+    """
+
+    def __init__(self, url, db_name, username, password, max_connections=100, timeout=30.0):
+        self._client = httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/_db/{quote(db_name)}",
+            auth=(username or '', password or ''),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            timeout=timeout
+        )
+
+    @staticmethod
+    def _check(response):
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            raise AsyncArangoError(
+                response.status_code, body.get('errorNum'), body.get('errorMessage', response.text)
+            )
+        return response.json() if response.content else {}
+
+    @staticmethod
+    def _document_path(collection, key=None):
+        path = f"/_api/document/{quote(collection, safe='')}"
+        if key is not None:
+            path += f"/{quote(key, safe='')}"
+        return path
+
+    async def query(self, aql, bind_vars=None, batch_size=1000):
+        """Run an AQL statement and return all results, following the cursor."""
+        body = self._check(await self._client.post('/_api/cursor', json={
+            'query': aql,
+            'bindVars': bind_vars or {},
+            'batchSize': batch_size
+        }))
+        results = list(body.get('result', []))
+        while body.get('hasMore'):
+            body = self._check(await self._client.put(f"/_api/cursor/{body['id']}"))
+            results.extend(body.get('result', []))
+        return results
+
+    async def get(self, collection, key):
+        response = await self._client.get(self._document_path(collection, key))
+        if response.status_code == 404:
+            return None
+        return self._check(response)
+
+    async def has(self, collection, key):
+        response = await self._client.head(self._document_path(collection, key))
+        if response.status_code == 404:
+            return False
+        self._check(response)
+        return True
+
+    async def insert(self, collection, document, overwrite_mode=None):
+        params = {'overwriteMode': overwrite_mode} if overwrite_mode else None
+        return self._check(await self._client.post(
+            self._document_path(collection), json=document, params=params
+        ))
+
+    async def close(self):
+        await self._client.aclose()
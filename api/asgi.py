@@ -0,0 +1,357 @@
+import os
+import asyncio
+import logging
+import traceback
+import contextlib
+from functools import wraps
+import jwt
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from arango_async import AsyncArangoClient
+import app as flask_api
+import conversations
+import events
+import feeds
+import hashing
+import mutual_matches
+import queries
+import transport
+
+logger = logging.getLogger(__name__)
+
+# Set in lifespan(), one pooled client per worker process
+arango = None
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    global arango
+    arango = AsyncArangoClient(
+        os.getenv("ARANGO_URL"),
+        os.getenv("ARANGO_DB_NAME"),
+        os.getenv("ARANGO_USERNAME"),
+        os.getenv("ARANGO_PASSWORD"),
+        max_connections=int(os.getenv("ASYNC_DB_MAX_CONNECTIONS", 100))
+    )
+    try:
+        yield
+    finally:
+        await arango.close()
+
+
+def jwt_required(handler):
+    """Async equivalent of flask_jwt_extended's jwt_required for the same tokens."""
+    @wraps(handler)
+    async def wrapper(request):
+        header = request.headers.get('Authorization', '')
+        token = header[7:] if header.startswith('Bearer ') else request.query_params.get('jwt')
+        if not token:
+            return JSONResponse({"msg": "Missing Authorization Header"}, status_code=401)
+        try:
+            claims = jwt.decode(token, flask_api.app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        except jwt.PyJWTError as e:
+            return JSONResponse({"msg": str(e)}, status_code=422)
+        request.state.user_key = claims['sub']
+        return await handler(request)
+    return wrapper
+
+
+async def load_seen(user_key):
+    seen = flask_api.seen_sets.cached(user_key)
+    if seen is None:
+        pending = flask_api.seen_sets.unwritten(user_key)
+        seen = flask_api.seen_sets.store(
+            user_key, await arango.query(queries.GET_SWIPED_USER_IDS, {'user_key': user_key}), pending
+        )
+    return seen
+
+
+async def db_ready():
+    # ensure_db() blocks while it connects, so only leave the event loop when it has to
+    return flask_api.db_connected or await run_in_threadpool(flask_api.ensure_db)
+
+
+def db_unavailable():
+    return JSONResponse({"error": "Database connection not available"}, status_code=503)
+
+
+async def register(request):
+    try:
+        if not await db_ready():
+            return db_unavailable()
+
+        data = await request.json()
+        if not data or not data.get('username') or not data.get('email') or not data.get('password'):
+            return JSONResponse({"error": "Missing required fields"}, status_code=400)
+
+        # Check first, so a taken username never costs a slot in the hashing pool
+        existing = await arango.query(queries.FIND_USER_BY_USERNAME, {'username': data['username']})
+        if existing:
+            return JSONResponse({"error": "Username already exists"}, status_code=400)
+        password_hash = await asyncio.wrap_future(flask_api.password_hasher.submit_hash(data['password']))
+
+        user = {
+            'username': data['username'],
+            'email': data['email'],
+            'password': password_hash,
+            'primary_skill': data.get('primary_skill', ''),
+            'secondary_skill': data.get('secondary_skill', ''),
+            'learning_goal': data.get('learning_goal', '')
+        }
+
+        meta = await arango.insert('users', user)
+        user_key = meta['_key']
+        flask_api.match_index.add_user(user_key, user['username'])
+
+        links = []
+        if data.get('primary_skill'):
+            links.append(('has_skill', 'teaching', data['primary_skill'], {'proficiency': 5}))
+        if data.get('learning_goal'):
+            links.append(('wants_to_learn', 'learning', data['learning_goal'], {}))
+
+        # Known skills resolve from the in-memory catalog without a round-trip
+        skill_ids = [
+            await run_in_threadpool(flask_api.resolve_skill, name)
+            for _, _, name, _ in links
+        ]
+        await asyncio.gather(*(
+            arango.insert(collection, {
+                '_from': f'users/{user_key}',
+                '_to': f'skills/{skill_id}',
+                **extra
+            })
+            for skill_id, (collection, _, _, extra) in zip(skill_ids, links)
+        ))
+        for skill_id, (_, kind, _, _) in zip(skill_ids, links):
+            flask_api.match_index.add_skill(user_key, f'skills/{skill_id}', kind)
+
+        return JSONResponse({"message": "User created successfully", "user_id": user_key}, status_code=201)
+
+    except hashing.PoolSaturated as e:
+        return JSONResponse(
+            {"error": "Too many sign-in requests right now. Please try again shortly."},
+            status_code=429, headers={'Retry-After': str(e.retry_after)}
+        )
+    except Exception as e:
+        logger.error(f"Error in registration: {e}")
+        return JSONResponse({"error": "Registration failed. Please try again."}, status_code=500)
+
+
+@jwt_required
+async def get_profile(request):
+    try:
+        if not await db_ready():
+            return db_unavailable()
+
+        user_key = request.state.user_key
+        cache_key = flask_api.profile_cache_key(user_key)
+
+        profile = flask_api.cache.get(cache_key)
+        if profile is None:
+            rows = await arango.query(queries.GET_PROFILE, {'user_key': user_key})
+            if not rows:
+                return JSONResponse({"error": "User not found"}, status_code=404)
+            profile = rows[0]
+            flask_api.cache.set(cache_key, profile, ttl=flask_api.PROFILE_CACHE_TTL)
+
+        return JSONResponse(profile)
+
+    except Exception as e:
+        logger.error(f"Error fetching profile: {e}")
+        return JSONResponse({"error": "Could not retrieve profile"}, status_code=500)
+
+
+@jwt_required
+async def predict(request):
+    try:
+        if not await db_ready():
+            return db_unavailable()
+
+        user_key = request.state.user_key
+        mode = request.query_params.get('mode', 'complementary')
+        if mode not in flask_api.RANK_FIELDS:
+            return JSONResponse({"error": f"Invalid mode: {mode}"}, status_code=400)
+
+        try:
+            limit, after = flask_api.page_args(request.query_params)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        seen = await load_seen(user_key)
+
+        # The helpers may rebuild the in-memory indexes, so keep them off the event loop
+        if mode == 'similar':
+            similar = await arango.query(queries.GET_SIMILAR_USERS, {
+                'user_key': user_key,
+                'limit': flask_api.SIMILAR_FETCH_LIMIT
+            })
+            matches = await run_in_threadpool(flask_api.similar_candidates, user_key, similar, limit, seen, after)
+        elif mode == 'fuzzy':
+            matches = await run_in_threadpool(flask_api.fuzzy_candidates, user_key, limit, seen, after)
+        else:
+            feed = await arango.get(feeds.COLLECTION, user_key)
+            matches = await run_in_threadpool(flask_api.feed_candidates, user_key, feed, limit, seen, after)
+
+        return JSONResponse({"matches": matches, "cursor": flask_api.page_cursor(matches, limit, mode)})
+
+    except Exception as e:
+        logger.error(f"Error predicting matches: {e}")
+        logger.error(traceback.format_exc())
+        return JSONResponse({"error": "Failed to find matches. Please try again."}, status_code=500)
+
+
+@jwt_required
+async def get_matches(request):
+    try:
+        if not await db_ready():
+            return db_unavailable()
+
+        matches_list = await arango.query(queries.GET_MATCHES, {'user_key': request.state.user_key})
+        return JSONResponse({"matches": matches_list})
+
+    except Exception as e:
+        logger.error(f"Error fetching matches: {e}")
+        logger.error(traceback.format_exc())
+        return JSONResponse({"error": "Failed to load matches. Please try again."}, status_code=500)
+
+
+@jwt_required
+async def get_pending_matches(request):
+    try:
+        if not await db_ready():
+            return db_unavailable()
+
+        result = await arango.query(queries.GET_PENDING_MATCHES, {'user_key': request.state.user_key})
+        return JSONResponse({"pending_matches": result[0] if result else []})
+
+    except Exception as e:
+        logger.error(f"Error fetching pending matches: {e}")
+        logger.error(traceback.format_exc())
+        return JSONResponse({"error": "Failed to load pending matches. Please try again."}, status_code=500)
+
+
+@jwt_required
+async def get_dashboard(request):
+    try:
+        if not await db_ready():
+            return db_unavailable()
+
+        user_key = request.state.user_key
+        dashboard, seen = await asyncio.gather(
+            arango.query(queries.GET_DASHBOARD, {'user_key': user_key}),
+            load_seen(user_key)
+        )
+        dashboard = dashboard[0]
+        predictions = await run_in_threadpool(
+            flask_api.feed_candidates, user_key, dashboard['feed'], 5, seen, None, dashboard['precomputed']
+        )
+
+        return JSONResponse({
+            "matches": dashboard['matches'],
+            "pending_matches": dashboard['pending_matches'],
+            "predictions": predictions
+        })
+
+    except Exception as e:
+        logger.error(f"Error loading dashboard: {e}")
+        logger.error(traceback.format_exc())
+        return JSONResponse({"error": "Failed to load dashboard. Please try again."}, status_code=500)
+
+
+@jwt_required
+async def get_messages(request):
+    try:
+        if not await db_ready():
+            return db_unavailable()
+
+        user_key = request.state.user_key
+        match_id = request.path_params['match_id']
+
+        since = request.query_params.get('since')
+        since_position = None
+        if since:
+            try:
+                since_position = conversations.decode_cursor(since)
+            except ValueError:
+                return JSONResponse({"error": "Invalid cursor"}, status_code=400)
+
+        conversation = await arango.get(conversations.COLLECTION, mutual_matches.pair_key(user_key, match_id))
+        if conversation is not None:
+            is_valid_match = conversation.get('active', False) and user_key in conversation['participants']
+        else:
+            is_valid_match = await arango.has(mutual_matches.EDGE_COLLECTION, mutual_matches.pair_key(user_key, match_id))
+
+        if not is_valid_match:
+            return JSONResponse({"error": "Invalid match or unauthorized access"}, status_code=403)
+
+        if since_position and conversation is not None:
+            latest = conversations.latest_cursor(conversation)
+            if latest is None or latest == since:
+                if request.headers.get('If-None-Match', '').strip('"') == since:
+                    return Response(status_code=304)
+                return JSONResponse({"messages": [], "cursor": since}, headers={'ETag': f'"{since}"'})
+
+        if since_position:
+            messages_list = await arango.query(queries.GET_MESSAGES_SINCE, {
+                'user_key': user_key,
+                'match_id': match_id,
+                'since_at': since_position[0],
+                'since_key': since_position[1]
+            })
+        else:
+            messages_list = await arango.query(queries.GET_MESSAGES, {'user_key': user_key, 'match_id': match_id})
+
+        if messages_list:
+            next_cursor = conversations.encode_cursor(messages_list[-1]['timestamp'], messages_list[-1]['id'])
+        else:
+            next_cursor = since or conversations.latest_cursor(conversation)
+
+        headers = {'ETag': f'"{next_cursor}"'} if next_cursor else None
+        return JSONResponse({"messages": messages_list, "cursor": next_cursor}, headers=headers)
+
+    except Exception as e:
+        logger.error(f"Error fetching messages: {e}")
+        logger.error(traceback.format_exc())
+        return JSONResponse({"error": "Failed to load messages. Please try again."}, status_code=500)
+
+
+@jwt_required
+async def event_stream(request):
+    # Served on the event loop: through the WSGI mount every open stream
+    # would hold one of its threads for as long as the client stays connected
+    return StreamingResponse(
+        events.async_stream(flask_api.event_bus, request.state.user_key),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+routes = [
+    Route('/register', register, methods=['POST']),
+    Route('/profile', get_profile, methods=['GET']),
+    Route('/predict', predict, methods=['POST']),
+    Route('/matches', get_matches, methods=['GET']),
+    Route('/pending-matches', get_pending_matches, methods=['POST']),
+    Route('/dashboard', get_dashboard, methods=['GET']),
+    Route('/messages/{match_id}', get_messages, methods=['GET']),
+    Route('/events', event_stream, methods=['GET']),
+    # Everything else (writes, health) is served by the Flask app, on at most
+    # WORKER_THREADS requests at a time per process
+    Mount('/', app=WSGIMiddleware(flask_api.app, workers=transport.WORKER_THREADS)),
+]
+
+middleware = [
+    Middleware(
+        CORSMiddleware,
+        allow_origins=['*'],
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=['*']
+    )
+]
+
+app = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import sparse
+from arango import ArangoClient
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Matrices shared with worker processes, set once by _init_worker
+_teach = None
+_learn = None
+
+
+def _init_worker(teach, learn):
+    global _teach, _learn
+    _teach = teach
+    _learn = learn
+
+
+def _score_chunk(bounds):
+    """Score rows [start, stop) against every user and keep each row's top N.
+
+    score(u, v) = |teach(u) & learn(v)| + |learn(u) & teach(v)|, i.e. the rows
+    of T·Lᵀ + L·Tᵀ restricted to this chunk.
+    """
+    start, stop, top_n = bounds
+    scores = (_teach[start:stop] @ _learn.T + _learn[start:stop] @ _teach.T).tocsr()
+
+    results = []
+    for offset in range(stop - start):
+        row = start + offset
+        begin, end = scores.indptr[offset], scores.indptr[offset + 1]
+        cols = scores.indices[begin:end]
+        vals = scores.data[begin:end]
+
+        keep = (cols != row) & (vals > 0)
+        cols, vals = cols[keep], vals[keep]
+        if len(vals) > top_n:
+            top = np.argpartition(-vals, top_n - 1)[:top_n]
+            cols, vals = cols[top], vals[top]
+        order = np.lexsort((cols, -vals))
+        results.append((row, cols[order].tolist(), vals[order].astype(int).tolist()))
+    return results
+
+
+def load_matrices(db):
+    """Load users and skill edges into two sparse user x skill matrices."""
+    user_keys = []
+    usernames = []
+    for user in db.aql.execute(
+        "FOR u IN users SORT u._key RETURN { key: u._key, username: u.username }",
+        batch_size=10000, stream=True
+    ):
+        user_keys.append(user['key'])
+        usernames.append(user.get('username'))
+    user_index = {key: i for i, key in enumerate(user_keys)}
+
+    skill_ids = []
+    skill_index = {}
+    matrices = {}
+    for name, collection in (('teach', 'has_skill'), ('learn', 'wants_to_learn')):
+        rows, cols = [], []
+        for edge in db.aql.execute(
+            f"FOR e IN {collection} RETURN [e._from, e._to]",
+            batch_size=10000, stream=True
+        ):
+            row = user_index.get(edge[0].split('/', 1)[1])
+            if row is None:
+                continue
+            if edge[1] not in skill_index:
+                skill_index[edge[1]] = len(skill_ids)
+                skill_ids.append(edge[1])
+            rows.append(row)
+            cols.append(skill_index[edge[1]])
+        matrices[name] = (rows, cols)
+
+    shape = (len(user_keys), len(skill_ids))
+    teach, learn = (
+        sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape
+        )
+        for rows, cols in (matrices['teach'], matrices['learn'])
+    )
+    # Duplicate edges would otherwise count twice
+    teach.data[:] = 1
+    learn.data[:] = 1
+
+    return user_keys, usernames, np.array(skill_ids, dtype=object), teach, learn
+
+
+def row_sets(matrix, skill_ids):
+    """Skill id sets for every row, so payloads don't re-slice the matrix per candidate."""
+    return [
+        frozenset(skill_ids[matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]]])
+        for i in range(matrix.shape[0])
+    ]
+
+
+def build_candidates(row, cols, vals, usernames, user_keys, skill_sets, goal_sets):
+    """Assemble the /predict payload for one user's precomputed top list."""
+    my_skills, my_goals = skill_sets[row], goal_sets[row]
+
+    candidates = []
+    for col, score in zip(cols, vals):
+        other_skills, other_goals = skill_sets[col], goal_sets[col]
+        candidates.append({
+            'user_id': user_keys[col],
+            'username': usernames[col],
+            'match_score': score,
+            'matching_skills': sorted(my_goals & other_skills),
+            'matching_goals': sorted(my_skills & other_goals),
+            'all_skills': sorted(other_skills),
+            'all_goals': sorted(other_goals),
+            'match_percentage': score * 20
+        })
+    return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute top-N match candidates for every user")
+    parser.add_argument('--top-n', type=int, default=int(os.getenv('MATCH_CANDIDATES_TOP_N', 50)))
+    parser.add_argument('--chunk-size', type=int, default=250, help="Rows scored per task")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Scoring processes")
+    parser.add_argument('--write-batch', type=int, default=1000, help="Documents per import_bulk call")
+    args = parser.parse_args()
+
+    client = ArangoClient(hosts=os.getenv("ARANGO_URL"))
+    db = client.db(
+        os.getenv("ARANGO_DB_NAME"),
+        username=os.getenv("ARANGO_USERNAME"),
+        password=os.getenv("ARANGO_PASSWORD")
+    )
+
+    if not db.has_collection('match_candidates'):
+        db.create_collection('match_candidates')
+    match_candidates = db.collection('match_candidates')
+
+    started = time.time()
+    user_keys, usernames, skill_ids, teach, learn = load_matrices(db)
+    logger.info(
+        f"Loaded {teach.shape[0]} users, {teach.shape[1]} skills, "
+        f"{teach.nnz} teaching and {learn.nnz} learning edges in {time.time() - started:.1f}s"
+    )
+
+    skill_sets = row_sets(teach, skill_ids)
+    goal_sets = row_sets(learn, skill_ids)
+
+    computed_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    chunks = [
+        (start, min(start + args.chunk_size, len(user_keys)), args.top_n)
+        for start in range(0, len(user_keys), args.chunk_size)
+    ]
+
+    scored = 0
+    batch = []
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(teach, learn)
+    ) as pool:
+        for results in pool.map(_score_chunk, chunks):
+            for row, cols, vals in results:
+                batch.append({
+                    '_key': user_keys[row],
+                    'candidates': build_candidates(
+                        row, cols, vals, usernames, user_keys, skill_sets, goal_sets
+                    ),
+                    'computed_at': computed_at
+                })
+                if len(batch) >= args.write_batch:
+                    match_candidates.import_bulk(batch, on_duplicate='replace')
+                    scored += len(batch)
+                    batch = []
+            logger.info(f"Scored {scored + len(batch)}/{len(user_keys)} users")
+
+    if batch:
+        match_candidates.import_bulk(batch, on_duplicate='replace')
+        scored += len(batch)
+
+    # Drop lists for users that no longer exist
+    db.aql.execute(
+        """
+        FOR c IN match_candidates
+            FILTER c.computed_at != @computed_at
+            REMOVE c IN match_candidates
+        """,
+        bind_vars={'computed_at': computed_at}
+    )
+
+    logger.info(f"Wrote match candidates for {scored} users in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Compare the Dashboard's three separate calls with the composite /dashboard.
+
+Runs in-process against the database configured in .env and counts the
+HTTP round-trips python-arango makes for each page view.
+
+    cd api && python -m bench.dashboard --username alex_dev --password password123
+"""
+import time
+import argparse
+import statistics
+import requests
+import app as api
+
+round_trips = 0
+_session_request = requests.Session.request
+
+
+def _counting_request(self, *args, **kwargs):
+    global round_trips
+    round_trips += 1
+    return _session_request(self, *args, **kwargs)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def measure(client, headers, calls, iterations, warmup):
+    global round_trips
+    latencies = []
+    trips = []
+    for i in range(warmup + iterations):
+        round_trips = 0
+        started = time.perf_counter()
+        for method, path in calls:
+            response = client.open(path, method=method, headers=headers)
+            if response.status_code != 200:
+                raise SystemExit(f"{method} {path} returned {response.status_code}: {response.get_data(as_text=True)}")
+        elapsed = (time.perf_counter() - started) * 1000
+        if i >= warmup:
+            latencies.append(elapsed)
+            trips.append(round_trips)
+    return latencies, trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--username', default='alex_dev')
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    args = parser.parse_args()
+
+    requests.Session.request = _counting_request
+    client = api.app.test_client()
+
+    login = client.post('/login', json={'username': args.username, 'password': args.password})
+    if login.status_code != 200:
+        raise SystemExit(f"Login failed: {login.get_data(as_text=True)}")
+    headers = {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+    scenarios = [
+        ('separate calls', [('GET', '/matches'), ('POST', '/pending-matches'), ('POST', '/predict')]),
+        ('/dashboard', [('GET', '/dashboard')]),
+    ]
+
+    print(f"{'scenario':<16} {'round-trips':>12} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, calls in scenarios:
+        latencies, trips = measure(client, headers, calls, args.iterations, args.warmup)
+        print(
+            f"{name:<16} {statistics.mean(trips):>12.1f} {percentile(latencies, 50):>9.2f} "
+            f"{percentile(latencies, 95):>9.2f} {max(latencies):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""Load-test the API at several data sizes and report per-endpoint latency.
+
+For each size the harness creates a database ``knowz_bench_<size>``, lets
+the app create its schema, seeds synthetic users from the SKILLS taxonomy
+in populate_db.py, restarts the app so its in-memory indexes load the new
+data, and then drives a mix of /login, /predict, /swipe, /matches and
+message polling from concurrent virtual users over HTTP.
+
+Against an ArangoDB you already run (credentials from .env):
+
+    cd api && python -m bench.load --sizes 1000 10000 100000
+
+Or let the harness start a throwaway server:
+
+    cd api && python -m bench.load --docker
+    cd api && python -m bench.load --arangod /usr/sbin/arangod
+
+Seeded databases are kept, so later runs at the same size skip seeding
+(``--reseed`` to start over). ``--server-cmd`` runs another server, e.g.
+``--server-cmd "uvicorn asgi:app --port {port} --workers 4"``.
+"""
+import os
+import sys
+import time
+import json
+import shlex
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+import requests
+from arango import ArangoClient
+from dotenv import load_dotenv
+import populate_db
+
+# Share of operations each virtual user performs; message polling only
+# happens once the user has a match, otherwise it lists matches instead
+DEFAULT_MIX = {
+    'predict': 35,
+    'swipe': 20,
+    'matches': 15,
+    'poll': 25,
+    'login': 5,
+}
+
+DOCKER_IMAGE = 'arangodb/arangodb:3.11'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def wait_for(url, timeout, check=lambda response: response.ok, auth=None, process=None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"Process serving {url} exited with code {process.returncode}")
+        try:
+            if check(requests.get(url, auth=auth, timeout=2)):
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Timed out after {timeout}s waiting for {url}")
+
+
+class ArangoServer:
+    """An ArangoDB for the benchmark: an existing one, a docker container or a local arangod."""
+
+    def __init__(self, args):
+        self.args = args
+        self.process = None
+        self.container = None
+        self.directory = None
+        self.url = args.arango_url
+        self.username = args.arango_username
+        self.password = args.arango_password
+
+    def start(self):
+        if self.args.docker:
+            self.url = f'http://127.0.0.1:{self.args.arango_port}'
+            self.username, self.password = 'root', 'knowz-bench'
+            self.container = subprocess.check_output([
+                'docker', 'run', '-d', '--rm', '-p', f'{self.args.arango_port}:8529',
+                '-e', f'ARANGO_ROOT_PASSWORD={self.password}', DOCKER_IMAGE
+            ], text=True).strip()
+        elif self.args.arangod:
+            self.url = f'http://127.0.0.1:{self.args.arango_port}'
+            self.username, self.password = 'root', ''
+            self.directory = tempfile.mkdtemp(prefix='knowz-bench-arangodb-')
+            self.process = subprocess.Popen([
+                self.args.arangod,
+                '--server.endpoint', f'tcp://127.0.0.1:{self.args.arango_port}',
+                '--server.authentication', 'false',
+                '--database.directory', os.path.join(self.directory, 'data'),
+                '--javascript.app-path', os.path.join(self.directory, 'apps'),
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not self.url:
+            raise SystemExit("Set ARANGO_URL, pass --arango-url, or use --docker / --arangod")
+        wait_for(f'{self.url}/_api/version', 120, auth=(self.username, self.password or ''), process=self.process)
+
+    def stop(self):
+        if self.container:
+            subprocess.run(['docker', 'stop', self.container], stdout=subprocess.DEVNULL)
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def system_db(self):
+        return ArangoClient(hosts=self.url).db('_system', username=self.username, password=self.password)
+
+    def db(self, name):
+        return ArangoClient(hosts=self.url).db(name, username=self.username, password=self.password)
+
+
+class AppServer:
+    """The API under test, run as a subprocess pointed at one benchmark database."""
+
+    def __init__(self, args, arango, db_name):
+        self.args = args
+        self.url = f'http://127.0.0.1:{args.port}'
+        self.env = dict(
+            os.environ,
+            ARANGO_URL=arango.url,
+            ARANGO_DB_NAME=db_name,
+            ARANGO_USERNAME=arango.username or '',
+            ARANGO_PASSWORD=arango.password or '',
+            PORT=str(args.port),
+            FLASK_ENV='production'
+        )
+        self.process = None
+
+    def start(self):
+        command = self.args.server_cmd.format(port=self.args.port) if self.args.server_cmd else f'{sys.executable} app.py'
+        self.process = subprocess.Popen(shlex.split(command), env=self.env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # /health doesn't touch the database; /ready connects (bootstrapping the
+        # schema on first use) and answers 200 once the indexes are loaded
+        wait_for(f'{self.url}/ready', 600, process=self.process)
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+
+def seed(arango, db_name, size, args):
+    db = arango.db(db_name)
+    users = db.collection('users').count()
+    if users >= size and not args.reseed:
+        print(f"  {db_name} already has {users} users, skipping seeding")
+        return
+    if users:
+        populate_db.clear(db)
+    started = time.time()
+    populate_db.bulk_load(
+        db,
+        populate_db.generate_users(size, args.skills_per_user, args.skills_per_user, args.password, seed=size),
+        batch_size=args.batch_size,
+        seed=size
+    )
+    print(f"  seeded {size} users in {time.time() - started:.1f}s")
+
+
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = False
+
+    def record(self, endpoint, elapsed_ms, ok):
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[endpoint].append(elapsed_ms)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+class VirtualUser:
+    """One synthetic user working through the mix; users 2k and 2k+1 are matched with each other."""
+
+    def __init__(self, base_url, index, size, password, results, rng):
+        self.base_url = base_url
+        self.username = f'synth_user_{index}'
+        self.partner = populate_db.user_key_for(f'synth_user_{index ^ 1}') if (index ^ 1) < size else None
+        self.password = password
+        self.results = results
+        self.rng = rng
+        self.session = requests.Session()
+        self.candidates = []
+        self.matches = []
+        self.cursors = {}
+
+    def call(self, endpoint, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=60, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.results.record(endpoint, (time.perf_counter() - started) * 1000, ok)
+        return response if ok else None
+
+    def login(self):
+        response = self.call('/login', 'POST', '/login', json={'username': self.username, 'password': self.password})
+        if response is not None:
+            self.session.headers['Authorization'] = f"Bearer {response.json()['access_token']}"
+        return response is not None
+
+    def match_partner(self):
+        # Not recorded: happens before the measured window
+        if self.partner:
+            self.call('/swipe', 'POST', '/swipe', json={'target_user_id': self.partner, 'liked': True})
+
+    def predict(self):
+        response = self.call('/predict', 'POST', '/predict?limit=10')
+        if response is not None:
+            self.candidates = [match['user_id'] for match in response.json()['matches']]
+
+    def swipe(self):
+        if not self.candidates:
+            return self.predict()
+        target = self.candidates.pop(0)
+        self.call('/swipe', 'POST', '/swipe', json={'target_user_id': target, 'liked': self.rng.random() < 0.3})
+
+    def list_matches(self):
+        response = self.call('/matches', 'GET', '/matches')
+        if response is not None:
+            self.matches = [match['id'] for match in response.json()['matches']]
+
+    def poll(self):
+        if not self.matches:
+            return self.list_matches()
+        match_id = self.rng.choice(self.matches)
+        params = {'since': self.cursors[match_id]} if self.cursors.get(match_id) else None
+        response = self.call('/messages/<match_id>', 'GET', f'/messages/{match_id}', params=params)
+        if response is not None and response.status_code == 200:
+            self.cursors[match_id] = response.json().get('cursor')
+
+    def run(self, mix, stop):
+        operations = {
+            'predict': self.predict,
+            'swipe': self.swipe,
+            'matches': self.list_matches,
+            'poll': self.poll,
+            'login': self.login,
+        }
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while not stop.is_set():
+            operations[self.rng.choices(names, weights)[0]]()
+
+
+def run_load(base_url, size, args):
+    results = Results()
+    rng = random.Random(size)
+    users = [
+        VirtualUser(base_url, index, size, args.password, results, random.Random(rng.random()))
+        for index in range(min(args.concurrency, size))
+    ]
+
+    for user in users:
+        if not user.login():
+            raise SystemExit(f"Login failed for {user.username}")
+    for user in users:
+        user.match_partner()
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=user.run, args=(args.mix, stop), daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    results.recording = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    results.recording = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return results, elapsed
+
+
+def report(size, results, elapsed):
+    rows = []
+    print(f"\n{size} users, {elapsed:.0f}s")
+    print(f"{'endpoint':<22} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    total = 0
+    for endpoint, latencies in sorted(results.latencies.items()):
+        total += len(latencies)
+        row = {
+            'users': size,
+            'endpoint': endpoint,
+            'requests': len(latencies),
+            'errors': results.errors[endpoint],
+            'throughput': len(latencies) / elapsed,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99)
+        }
+        rows.append(row)
+        print(
+            f"{endpoint:<22} {row['requests']:>9} {row['errors']:>7} {row['throughput']:>8.1f} "
+            f"{row['p50']:>9.2f} {row['p95']:>9.2f} {row['p99']:>9.2f}"
+        )
+    print(f"{'total':<22} {total:>9} {sum(results.errors.values()):>7} {total / elapsed:>8.1f}")
+    return rows
+
+
+def parse_mix(value):
+    mix = dict(DEFAULT_MIX)
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name}; expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="Users to seed per run")
+    parser.add_argument('--skills-per-user', type=int, default=3, help="Teaching skills and learning goals per user")
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--reseed', action='store_true', help="Reseed databases that already have enough users")
+    parser.add_argument('--concurrency', type=int, default=32, help="Virtual users")
+    parser.add_argument('--duration', type=float, default=60, help="Measured seconds per size")
+    parser.add_argument('--warmup', type=float, default=10, help="Unmeasured seconds before each run")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help="Operation weights, e.g. predict=50,poll=10 (others keep their defaults)")
+    parser.add_argument('--port', type=int, default=8099, help="Port for the app under test")
+    parser.add_argument('--server-cmd', help="Command starting the app; {port} is substituted")
+    parser.add_argument('--arango-url', default=os.getenv('ARANGO_URL'))
+    parser.add_argument('--arango-username', default=os.getenv('ARANGO_USERNAME', 'root'))
+    parser.add_argument('--arango-password', default=os.getenv('ARANGO_PASSWORD', ''))
+    parser.add_argument('--arango-port', type=int, default=8529, help="Port for --docker / --arangod")
+    parser.add_argument('--docker', action='store_true', help=f"Start a throwaway {DOCKER_IMAGE} container")
+    parser.add_argument('--arangod', help="Path to an arangod binary to start with a temporary data directory")
+    parser.add_argument('--output', help="Write the results as JSON for comparing runs")
+    args = parser.parse_args()
+
+    arango = ArangoServer(args)
+    arango.start()
+    rows = []
+    try:
+        for size in args.sizes:
+            db_name = f'knowz_bench_{size}'
+            print(f"== {size} users ({db_name})")
+            if not arango.system_db().has_database(db_name):
+                arango.system_db().create_database(db_name)
+
+            app = AppServer(args, arango, db_name)
+            # The app creates its collections, graph and indexes when it first
+            # connects, which start() triggers by waiting for /ready
+            app.start()
+            app.stop()
+            seed(arango, db_name, size, args)
+
+            app.start()
+            try:
+                results, elapsed = run_load(app.url, size, args)
+            finally:
+                app.stop()
+            rows += report(size, results, elapsed)
+    finally:
+        arango.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare editing skills one request at a time with a single /skills/batch.
+
+Each iteration adds N existing skills the user doesn't have yet (half
+teaching, half learning) and then removes them again, so the profile ends
+up unchanged. Runs in-process against the database configured in .env and
+counts the HTTP round-trips python-arango makes.
+
+    cd api && python -m bench.skills_batch --username alex_dev --password password123 --skills 10
+"""
+import time
+import argparse
+import statistics
+import requests
+import app as api
+from bench.dashboard import _counting_request, percentile
+import bench.dashboard as counter
+
+
+def check(response, path):
+    if response.status_code != 200:
+        raise SystemExit(f"{path} returned {response.status_code}: {response.get_data(as_text=True)}")
+    return response
+
+
+def loop_edit(client, headers, edits):
+    for kind, skill in edits:
+        check(client.post('/add-skill', headers=headers, json={'skill_name': skill['name'], 'skill_type': kind}), '/add-skill')
+    for kind, skill in edits:
+        check(client.post('/remove-skill', headers=headers, json={'skill_id': skill['id'], 'skill_type': kind}), '/remove-skill')
+
+
+def batch_edit(client, headers, edits):
+    for action, field in (('add', 'name'), ('remove', 'id')):
+        body = {kind: {action: [skill[field] for k, skill in edits if k == kind]} for kind in ('teaching', 'learning')}
+        check(client.post('/skills/batch', headers=headers, json=body), '/skills/batch')
+
+
+def measure(client, headers, edit, edits, iterations, warmup):
+    latencies = []
+    trips = []
+    for i in range(warmup + iterations):
+        counter.round_trips = 0
+        started = time.perf_counter()
+        edit(client, headers, edits)
+        elapsed = (time.perf_counter() - started) * 1000
+        if i >= warmup:
+            latencies.append(elapsed)
+            trips.append(counter.round_trips)
+    return latencies, trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--username', default='alex_dev')
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--skills', type=int, default=10, help="Skills added and removed per iteration")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    args = parser.parse_args()
+
+    requests.Session.request = _counting_request
+    client = api.app.test_client()
+
+    login = client.post('/login', json={'username': args.username, 'password': args.password})
+    if login.status_code != 200:
+        raise SystemExit(f"Login failed: {login.get_data(as_text=True)}")
+    headers = {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+    profile = check(client.get('/profile', headers=headers), '/profile').get_json()
+    owned = {skill['id'] for skill in profile['skills'] + profile['learning_goals']}
+    available = [
+        skill for skill in check(client.get('/skills', headers=headers), '/skills').get_json()['skills']
+        if skill['id'] not in owned
+    ]
+    if len(available) < args.skills:
+        raise SystemExit(f"Only {len(available)} skills the user doesn't already have; seed more with populate_db.py")
+    edits = [('teaching' if i % 2 == 0 else 'learning', skill) for i, skill in enumerate(available[:args.skills])]
+
+    scenarios = [
+        ('separate calls', loop_edit),
+        ('/skills/batch', batch_edit),
+    ]
+
+    print(f"{'scenario':<16} {'round-trips':>12} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, edit in scenarios:
+        latencies, trips = measure(client, headers, edit, edits, args.iterations, args.warmup)
+        print(
+            f"{name:<16} {statistics.mean(trips):>12.1f} {percentile(latencies, 50):>9.2f} "
+            f"{percentile(latencies, 95):>9.2f} {max(latencies):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
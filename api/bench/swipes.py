@@ -0,0 +1,88 @@
+"""Compare sustained /swipe throughput with per-request inserts and with write-behind group commits.
+
+Each scenario sends --swipes swipes from --threads threads, every one from
+a random user to a random other user, and stops the clock only once every
+swipe has been written, so queued writes count against write-behind.
+Runs in-process against the database configured in .env and writes real
+swipe records, so point it at a bench database such as one seeded by
+bench.load rather than at production data.
+
+    cd api && python -m bench.swipes --swipes 20000 --threads 16
+"""
+import time
+import random
+import argparse
+import threading
+from flask_jwt_extended import create_access_token
+import app as api
+from bench.dashboard import percentile
+from swipe_ingest import SwipeIngest
+
+
+def swipe_worker(client, tokens, user_keys, count, latencies, errors):
+    rng = random.Random()
+    for _ in range(count):
+        user_key = rng.choice(user_keys)
+        target = rng.choice(user_keys)
+        if target == user_key:
+            continue
+        started = time.perf_counter()
+        response = client.post('/swipe', headers={'Authorization': f"Bearer {tokens[user_key]}"},
+                               json={'target_user_id': target, 'liked': rng.random() < 0.5})
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+def run(client, tokens, user_keys, swipes, threads, write_behind):
+    ingest = SwipeIngest(api.db, on_mutual=api.link_mutual_match, on_unlinked=api.close_mutual_match,
+                         write_behind=write_behind)
+    if write_behind:
+        ingest.start()
+    api.swipe_ingest = ingest
+    api.seen_sets.pending = ingest.pending_targets
+
+    latencies = []
+    errors = []
+    workers = [
+        threading.Thread(target=swipe_worker, args=(client, tokens, user_keys, swipes // threads, latencies, errors))
+        for _ in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # Wait for the last group commit before stopping the clock
+    ingest.close()
+    return time.perf_counter() - started, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--swipes', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--users', type=int, default=1000, help="Users swiping and being swiped on")
+    args = parser.parse_args()
+
+    api.ensure_db()
+    user_keys = [key for key in api.db.aql.execute(
+        'FOR u IN users LIMIT @limit RETURN u._key', bind_vars={'limit': args.users}
+    )]
+    if len(user_keys) < 2:
+        raise SystemExit("Need at least two users; seed some with populate_db.py or bench.load")
+    with api.app.app_context():
+        tokens = {key: create_access_token(identity=key) for key in user_keys}
+    client = api.app.test_client()
+
+    print(f"{'scenario':<14} {'swipes/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, write_behind in (('insert', False), ('write-behind', True)):
+        elapsed, latencies, errors = run(client, tokens, user_keys, args.swipes, args.threads, write_behind)
+        print(
+            f"{name:<14} {len(latencies) / elapsed:>10.0f} {percentile(latencies, 50):>9.2f} "
+            f"{percentile(latencies, 95):>9.2f} {percentile(latencies, 99):>9.2f} {len(errors):>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
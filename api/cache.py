@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """In-process LRU cache whose entries expire after a TTL.
+
+    Keys are namespaced as ``<namespace>:<id>`` (``profile:123``) and
+    hit/miss counters are kept per namespace. None is never cached, so a
+    None from get() always means a miss.
+    """
+
+    backend = 'memory'
+
+    def __init__(self, max_entries=None, default_ttl=None):
+        self.max_entries = max_entries or int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+        self.default_ttl = default_ttl or int(os.getenv('CACHE_TTL_SECONDS', 300))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._counters = defaultdict(lambda: {'hits': 0, 'misses': 0, 'invalidations': 0})
+
+    def _count(self, key, counter, amount=1):
+        with self._lock:
+            self._counters[key.split(':', 1)[0]][counter] += amount
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def get(self, key):
+        value = self._get(key)
+        self._count(key, 'misses' if value is None else 'hits')
+        return value
+
+    def set(self, key, value, ttl=None):
+        if value is not None:
+            self._set(key, value, ttl or self.default_ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._delete(keys)
+            for key in keys:
+                self._count(key, 'invalidations')
+
+    def get_or_load(self, key, loader, ttl=None):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            namespaces = {
+                namespace: dict(
+                    counters,
+                    hit_rate=round(counters['hits'] / (counters['hits'] + counters['misses']), 3)
+                    if counters['hits'] + counters['misses'] else None
+                )
+                for namespace, counters in self._counters.items()
+            }
+        return {'backend': self.backend, 'size': self.size(), 'namespaces': namespaces}
+
+
+class RedisCache(TTLCache):
+    """Same interface backed by Redis, so every worker shares entries and invalidations.
+
+    Counters stay per process. Redis errors are logged and treated as misses.
+    """
+
+    backend = 'redis'
+
+    def __init__(self, url, default_ttl=None, key_prefix='knowz:cache:'):
+        import redis
+
+        super().__init__(default_ttl=default_ttl)
+        self.key_prefix = key_prefix
+        self._redis = redis.Redis.from_url(url)
+        self._redis.ping()
+
+    def _get(self, key):
+        try:
+            raw = self._redis.get(self.key_prefix + key)
+        except Exception as e:
+            logger.error(f"Cache read failed for {key}: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def _set(self, key, value, ttl):
+        try:
+            self._redis.set(self.key_prefix + key, json.dumps(value), ex=ttl)
+        except Exception as e:
+            logger.error(f"Cache write failed for {key}: {e}")
+
+    def _delete(self, keys):
+        try:
+            self._redis.delete(*(self.key_prefix + key for key in keys))
+        except Exception as e:
+            logger.error(f"Cache invalidation failed for {', '.join(keys)}: {e}")
+
+    def size(self):
+        try:
+            return self._redis.dbsize()
+        except Exception:
+            return None
+
+
+def create_cache():
+    url = os.getenv('CACHE_URL')
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            cache = RedisCache(url)
+            logger.info("Caching responses in Redis")
+            return cache
+        except Exception as e:
+            logger.error(f"Could not connect cache to {url}, using in-process cache: {e}")
+    return TTLCache()
@@ -0,0 +1,124 @@
+"""Deduplicate the swipe log so each user's swipe on a target is stored once.
+
+Swipes used to be inserted under random keys, one document per swipe. This
+keeps each user's latest decision on every target under its deterministic
+key (swipe_ingest.swipe_key), gives old rejections a rejected_at so the TTL
+index expires them, deletes the rest and reports the space and query time
+saved. Users are compacted in parallel batches; it's safe to re-run and to
+run while the API is up, since a swipe already stored under its key is
+never overwritten.
+
+    cd api && python compact_swipes.py --workers 8 --batch-users 100
+"""
+import sys
+import time
+import random
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import queries
+import schema
+
+logger = logging.getLogger(__name__)
+
+
+def collection_size(matches):
+    stats = matches.statistics()
+    return matches.count(), stats.get('documents_size')
+
+
+def time_queries(db, sample):
+    """Total time of the swipe-log queries the API runs for each sampled user, in ms."""
+    started = time.perf_counter()
+    for user_key in sample:
+        list(db.aql.execute(queries.GET_PENDING_MATCHES, bind_vars={'user_key': user_key}))
+        list(db.aql.execute(queries.GET_SWIPED_USER_IDS, bind_vars={'user_key': user_key}, stream=True))
+    return (time.perf_counter() - started) * 1000
+
+
+def compact_batch(db, user_keys, dry_run=False):
+    """Compact the swipes of user_keys and return (swipes rewritten, documents deleted)."""
+    matches = db.collection('matches')
+    cursor = db.aql.execute(
+        queries.FIND_UNCOMPACTED_SWIPES, bind_vars={'user_keys': user_keys}, batch_size=1000, stream=True
+    )
+    rewritten = []
+    stale = []
+    for row in cursor:
+        rewritten.append(row['swipe'])
+        stale += row['stale']
+    if dry_run:
+        return len(rewritten), len(stale)
+
+    # Write the keyed swipe before deleting the old ones, so an interrupted
+    # run never loses a decision
+    for start in range(0, len(rewritten), 1000):
+        matches.import_bulk(rewritten[start:start + 1000], on_duplicate='ignore', halt_on_error=False)
+    for start in range(0, len(stale), 1000):
+        matches.delete_many([{'_key': key} for key in stale[start:start + 1000]], silent=True)
+    return len(rewritten), len(stale)
+
+
+def format_size(size):
+    return f"{size / 1024 / 1024:.1f} MiB" if size is not None else "n/a"
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Deduplicate the swipe log under deterministic keys")
+    parser.add_argument('--workers', type=int, default=8, help="Batches compacted in parallel")
+    parser.add_argument('--batch-users', type=int, default=100, help="Users whose swipes are compacted per batch")
+    parser.add_argument('--sample', type=int, default=50, help="Users whose queries are timed before and after")
+    parser.add_argument('--dry-run', action='store_true', help="Only count what would be rewritten and deleted")
+    args = parser.parse_args()
+
+    db = schema.connect()
+    schema.bootstrap(db)
+    matches = db.collection('matches')
+
+    swipers = list(db.aql.execute(queries.LIST_SWIPERS, batch_size=10000, stream=True))
+    sample = random.sample(swipers, min(args.sample, len(swipers)))
+    count_before, size_before = collection_size(matches)
+    # The first pass warms the cache so both timings compare like with like
+    time_queries(db, sample)
+    ms_before = time_queries(db, sample)
+    logger.info(f"{len(swipers)} users have swiped; {count_before} swipe documents, {format_size(size_before)}")
+
+    batches = [swipers[i:i + args.batch_users] for i in range(0, len(swipers), args.batch_users)]
+    rewritten = deleted = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(compact_batch, db, batch, args.dry_run) for batch in batches]
+        for done, future in enumerate(as_completed(futures), 1):
+            batch_rewritten, batch_deleted = future.result()
+            rewritten += batch_rewritten
+            deleted += batch_deleted
+            if done % 50 == 0 or done == len(futures):
+                logger.info(f"Compacted {done}/{len(futures)} batches")
+    elapsed = time.perf_counter() - started
+
+    if args.dry_run:
+        print(f"Would rewrite {rewritten} swipes under their own key and delete {deleted} documents")
+        return 0
+
+    try:
+        # Reclaims the space of deleted documents now rather than whenever RocksDB compacts on its own
+        matches.compact()
+    except Exception as e:
+        logger.warning(f"Could not compact the matches collection: {e}")
+
+    count_after, size_after = collection_size(matches)
+    time_queries(db, sample)
+    ms_after = time_queries(db, sample)
+
+    print(f"Rewrote {rewritten} swipes and deleted {deleted} documents in {elapsed:.1f}s")
+    print(f"documents: {count_before} -> {count_after}")
+    print(f"size:      {format_size(size_before)} -> {format_size(size_after)}")
+    print(f"queries:   {ms_before:.1f}ms -> {ms_after:.1f}ms for {len(sample)} users "
+          f"(GET_PENDING_MATCHES and GET_SWIPED_USER_IDS)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import sys
+import json
+import base64
+import logging
+from datetime import datetime
+import queries
+from mutual_matches import pair_key
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'conversations'
+
+# Message limit per match for the MVP
+MAX_MESSAGES = 5
+
+
+def open_conversation(db, user_a, user_b):
+    """Create (or reactivate) the summary document for a new mutual match."""
+    db.aql.execute(queries.OPEN_CONVERSATION, bind_vars={
+        'conversation_key': pair_key(user_a, user_b),
+        'participants': sorted([user_a, user_b])
+    })
+
+
+def close_conversation(db, user_a, user_b):
+    db.aql.execute(queries.CLOSE_CONVERSATION, bind_vars={
+        'conversation_key': pair_key(user_a, user_b)
+    })
+
+
+def get(db, user_a, user_b):
+    return db.collection(COLLECTION).get(pair_key(user_a, user_b))
+
+
+def encode_cursor(created_at, key):
+    """Opaque position of a message in a conversation (created_at, then _key)."""
+    raw = json.dumps([created_at, key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        created_at, key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(created_at, str) or not isinstance(key, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return created_at, key
+
+
+def latest_cursor(conversation):
+    if not conversation or not conversation.get('last_key'):
+        return None
+    return encode_cursor(conversation['last_at'], conversation['last_key'])
+
+
+def mark_read(db, reader_id, other_id):
+    """Mark every message from other_id to reader_id as read. Safe to repeat."""
+    cursor = db.aql.execute(queries.MARK_MESSAGES_READ, bind_vars={
+        'user_key': reader_id,
+        'match_id': other_id,
+        'conversation_key': pair_key(reader_id, other_id)
+    })
+    return next(cursor, 0)
+
+
+def send(db, sender_id, receiver_id, text):
+    """Insert a message and update the conversation summary in one statement.
+
+    Returns the stored message, or None when the conversation already holds
+    MAX_MESSAGES messages.
+    """
+    message = {
+        'sender_id': sender_id,
+        'receiver_id': receiver_id,
+        'text': text,
+        'is_read': False,
+        'created_at': datetime.now().isoformat()
+    }
+    cursor = db.aql.execute(queries.SEND_MESSAGE, bind_vars={
+        'conversation_key': pair_key(sender_id, receiver_id),
+        'participants': sorted([sender_id, receiver_id]),
+        'sender_id': sender_id,
+        'receiver_id': receiver_id,
+        'message': message,
+        'max_messages': MAX_MESSAGES
+    })
+    return next(cursor, None)
+
+
+def backfill(db):
+    """Build a summary document for every mutual match from the message history."""
+    cursor = db.aql.execute(queries.BACKFILL_CONVERSATIONS, stream=True)
+    return sum(1 for _ in cursor)
+
+
+if __name__ == "__main__":
+    import schema
+
+    logging.basicConfig(level=logging.INFO)
+    db = schema.connect()
+    if not db.has_collection(COLLECTION):
+        db.create_collection(COLLECTION)
+    schema.ensure_indexes(db)
+    created = backfill(db)
+    logger.info(f"Backfilled {created} conversations from message history")
+    sys.exit(0)
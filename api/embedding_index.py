@@ -0,0 +1,220 @@
+import os
+import math
+import time
+import zlib
+import logging
+import threading
+import numpy as np
+from match_index import after_cursor
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', 128))
+
+
+def skill_text(skill_id):
+    # Skill keys are the lowercased name with spaces replaced by underscores
+    return skill_id.split('/', 1)[-1].replace('_', ' ').lower()
+
+
+def embed_text(text, dim=EMBEDDING_DIM):
+    """Unit vector for a skill name from signed hashing of its words and character trigrams.
+
+    Names that share most of their trigrams ("react" / "react native") end up
+    close together, which exact key matching can't see.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    padded = f' {text} '
+    features = [f'w:{word}' for word in text.split()]
+    features += [f'c:{padded[i:i + 3]}' for i in range(len(padded) - 2)]
+    for feature in features:
+        # crc32 rather than hash(), which is salted per process
+        h = zlib.crc32(feature.encode())
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class IVFIndex:
+    """Inverted-file index for maximum inner product search on NumPy.
+
+    Vectors are clustered with spherical k-means into about sqrt(n) lists.
+    A search scores the centroids and then only the vectors in the nprobe
+    closest lists, so it touches O(sqrt(n)) vectors instead of all n.
+    """
+
+    def __init__(self, vectors, ids, nlist=None, iterations=10, sample_size=20000, seed=1, chunk_size=10000):
+        rng = np.random.default_rng(seed)
+        n = len(ids)
+        nlist = min(n, nlist or max(1, int(math.sqrt(n))))
+
+        train = vectors[rng.choice(n, min(n, sample_size), replace=False)]
+        centroids = train[rng.choice(len(train), min(nlist, len(train)), replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train)
+            filled = np.bincount(assign, minlength=len(centroids)) > 0
+            norms = np.linalg.norm(sums[filled], axis=1, keepdims=True)
+            centroids[filled] = sums[filled] / np.maximum(norms, 1e-12)
+
+        assign = np.concatenate([
+            np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+            for start in range(0, n, chunk_size)
+        ])
+        order = np.argsort(assign, kind='stable')
+
+        self.centroids = centroids
+        self.vectors = vectors[order]
+        self.ids = [ids[i] for i in order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=len(centroids)))])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, k, nprobe=8):
+        """Return (ids, scores) of up to k vectors with the largest inner product with query."""
+        nprobe = min(nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in lists])
+        if len(rows) == 0:
+            return [], []
+
+        scores = self.vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.ids[rows[i]] for i in top], scores[top].tolist()
+
+
+class EmbeddingIndex:
+    """Fuzzy complementary-skill retrieval on top of a MatchIndex.
+
+    Each user is embedded as [teaching vector, learning vector]. Querying with
+    [my learning vector, my teaching vector] makes the inner product the fuzzy
+    version of the MatchIndex score: what they teach against what I want to
+    learn, plus what they want to learn against what I teach.
+    """
+
+    def __init__(self, match_index, dim=EMBEDDING_DIM, nprobe=None, oversample=10):
+        self.match_index = match_index
+        self.dim = dim
+        self.nprobe = nprobe or int(os.getenv('EMBEDDING_NPROBE', 8))
+        self.oversample = oversample
+        self._lock = threading.Lock()
+        # Held while the ANN index is rebuilding, so only one rebuild runs at a time
+        self._build_lock = threading.Lock()
+        self._skill_vectors = {}
+        self._ivf = None
+        # MatchIndex.loaded_at the ANN index was built from
+        self.built_from = None
+
+    def skill_vector(self, skill_id):
+        vector = self._skill_vectors.get(skill_id)
+        if vector is None:
+            vector = self._skill_vectors[skill_id] = embed_text(skill_text(skill_id), self.dim)
+        return vector
+
+    def profile_vector(self, skill_ids):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for skill_id in skill_ids:
+            vector += self.skill_vector(skill_id)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def user_vector(self, user_key):
+        skills, goals = self.match_index.profile(user_key)
+        return np.concatenate([self.profile_vector(skills), self.profile_vector(goals)])
+
+    def query_vector(self, user_key):
+        skills, goals = self.match_index.profile(user_key)
+        return np.concatenate([self.profile_vector(goals), self.profile_vector(skills)])
+
+    def build(self):
+        with self._build_lock:
+            self._build()
+
+    def _build(self):
+        started = time.time()
+        loaded_at = self.match_index.loaded_at
+
+        keys, rows = [], []
+        for user_key, skills, goals in self.match_index.profiles():
+            if not skills and not goals:
+                continue
+            keys.append(user_key)
+            rows.append(np.concatenate([self.profile_vector(skills), self.profile_vector(goals)]))
+
+        ivf = IVFIndex(np.vstack(rows), keys) if rows else None
+        with self._lock:
+            self._ivf = ivf
+            self.built_from = loaded_at
+
+        logger.info(
+            f"Embedding index built for {len(keys)} users in "
+            f"{len(ivf.centroids) if ivf else 0} lists in {time.time() - started:.2f}s"
+        )
+
+    def ensure_fresh(self):
+        # Rebuilt whenever the MatchIndex reloads; in between, rescoring uses
+        # the live skill sets so only recall lags behind profile edits. Only
+        # the first build blocks; later ones run in the background while the
+        # old index keeps serving.
+        if self.built_from is None:
+            with self._build_lock:
+                if self.built_from is None:
+                    self._build()
+        elif self.built_from != self.match_index.loaded_at:
+            self.rebuild_in_background()
+
+    def rebuild_in_background(self):
+        if not self._build_lock.acquire(blocking=False):
+            return
+
+        def rebuild():
+            try:
+                self._build()
+            except Exception as e:
+                logger.error(f"Error rebuilding embedding index: {e}")
+            finally:
+                self._build_lock.release()
+
+        threading.Thread(target=rebuild, name='embedding-index-rebuild', daemon=True).start()
+
+    def top_matches(self, user_key, limit=5, exclude=(), after=None):
+        """Return [(other_key, fuzzy_score)] for user_key, best first.
+
+        exclude and after work as in MatchIndex.top_matches, with the
+        cursor score being the rounded fuzzy score. Returns None when there
+        is nothing to search with (no index yet, or a user without skills).
+
+        Later pages skip everything ranked before the cursor, so the search
+        is widened (more candidates, more lists) until a full page is found
+        or every list has been searched.
+        """
+        ivf = self._ivf
+        query = self.query_vector(user_key)
+        if ivf is None or not query.any():
+            return None
+
+        k = (limit + len(exclude)) * self.oversample + 1
+        nprobe = self.nprobe
+        scores = {}
+        while True:
+            candidates, _ = ivf.search(query, k, nprobe)
+            rescored = []
+            for other in candidates:
+                if other == user_key or other in exclude:
+                    continue
+                fuzzy = scores.get(other)
+                if fuzzy is None:
+                    fuzzy = scores[other] = round(float(query @ self.user_vector(other)), 4)
+                if after_cursor(fuzzy, other, after):
+                    rescored.append((-fuzzy, other))
+            searched_all = nprobe >= len(ivf.centroids) and len(candidates) < k
+            if len(rescored) >= limit or searched_all:
+                break
+            k *= 2
+            nprobe *= 2
+        rescored.sort()
+        return [(other, -fuzzy) for fuzzy, other in rescored[:limit]]
@@ -0,0 +1,150 @@
+import os
+import json
+import queue
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_CREATED = 'message.created'
+MESSAGE_READ = 'message.read'
+MATCH_MUTUAL = 'match.mutual'
+
+HEARTBEAT_SECONDS = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+
+
+class LocalEventBus:
+    """In-process pub/sub: one bounded queue per open event stream.
+
+    Only reaches subscribers connected to the same process; use
+    RedisEventBus when the API runs as several workers.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_key, q=None):
+        q = q or queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers[user_key].add(q)
+        return q
+
+    def unsubscribe(self, user_key, q):
+        with self._lock:
+            self._subscribers[user_key].discard(q)
+            if not self._subscribers[user_key]:
+                del self._subscribers[user_key]
+
+    def publish(self, user_key, event_type, data):
+        self._deliver(user_key, {'type': event_type, 'data': data})
+
+    def _deliver(self, user_key, event):
+        with self._lock:
+            targets = list(self._subscribers.get(user_key, ()))
+        for q in targets:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                logger.warning(f"Dropping {event['type']} event for slow subscriber of {user_key}")
+
+
+class RedisEventBus(LocalEventBus):
+    """Fans events out through Redis pub/sub so every worker sees them."""
+
+    def __init__(self, url, max_queue=100, channel_prefix='knowz:events:'):
+        import redis
+
+        super().__init__(max_queue=max_queue)
+        self.channel_prefix = channel_prefix
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(f'{channel_prefix}*')
+        self._listener = threading.Thread(target=self._listen, name='event-bus-listener', daemon=True)
+        self._listener.start()
+
+    def publish(self, user_key, event_type, data):
+        self._redis.publish(
+            f'{self.channel_prefix}{user_key}',
+            json.dumps({'type': event_type, 'data': data})
+        )
+
+    def _listen(self):
+        for message in self._pubsub.listen():
+            try:
+                channel = message['channel'].decode()
+                self._deliver(channel[len(self.channel_prefix):], json.loads(message['data']))
+            except Exception as e:
+                logger.error(f"Error dispatching event from Redis: {e}")
+
+
+class LoopQueue:
+    """Subscriber queue read on an asyncio event loop; events may be published from any thread."""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put_nowait(self, event):
+        if self.queue.full():
+            raise queue.Full
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"Dropping {event['type']} event for slow subscriber")
+
+
+def create_event_bus():
+    url = os.getenv('EVENT_BUS_URL')
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            bus = RedisEventBus(url)
+            logger.info("Publishing events through Redis")
+            return bus
+        except Exception as e:
+            logger.error(f"Could not connect event bus to {url}, using in-process bus: {e}")
+    return LocalEventBus()
+
+
+def stream(bus, user_key, heartbeat=HEARTBEAT_SECONDS):
+    """Yield server-sent event frames for user_key until the client disconnects."""
+    q = bus.subscribe(user_key)
+    try:
+        yield ': connected\n\n'
+        while True:
+            try:
+                event = q.get(timeout=heartbeat)
+            except queue.Empty:
+                # Comment frames keep proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        bus.unsubscribe(user_key, q)
+
+
+async def async_stream(bus, user_key, heartbeat=HEARTBEAT_SECONDS):
+    """stream() for ASGI servers: waits on the event loop instead of holding a thread per client."""
+    q = LoopQueue(asyncio.get_running_loop(), bus.max_queue)
+    bus.subscribe(user_key, q)
+    try:
+        yield ': connected\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(q.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        bus.unsubscribe(user_key, q)
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
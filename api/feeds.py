@@ -0,0 +1,116 @@
+import os
+import time
+import queue
+import bisect
+import logging
+import threading
+import queries
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'candidate_feeds'
+
+# Ranked candidates kept per user
+FEED_SIZE = int(os.getenv('CANDIDATE_FEED_SIZE', 200))
+
+# Feeds older than this are served once more and rebuilt in the background
+FEED_MAX_AGE_SECONDS = int(os.getenv('CANDIDATE_FEED_MAX_AGE_SECONDS', 3600))
+
+
+def is_stale(feed):
+    return feed is None or time.time() - feed.get('built_at', 0) > FEED_MAX_AGE_SECONDS
+
+
+class FeedBuilder:
+    """Builds and repairs per-user candidate feeds on a background thread.
+
+    A feed document holds parallel ``ids`` and ``scores`` arrays ordered by
+    score descending, then user key, the same order MatchIndex ranks in.
+    """
+
+    def __init__(self, db, match_index, seen_sets, size=FEED_SIZE):
+        self.db = db
+        self.match_index = match_index
+        self.seen_sets = seen_sets
+        self.size = size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='feed-builder', daemon=True)
+            self._thread.start()
+
+    def _enqueue(self, task):
+        # Collapse repeated requests for the same user while one is queued
+        with self._lock:
+            if task in self._pending:
+                return
+            self._pending.add(task)
+        self._queue.put(task)
+
+    def request_rebuild(self, user_key):
+        self._enqueue(('rebuild', user_key))
+
+    def profile_changed(self, user_key):
+        """The user's skills changed: rebuild their feed and rescore them in everyone else's."""
+        self._enqueue(('rebuild', user_key))
+        self._enqueue(('rescore', user_key))
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            with self._lock:
+                self._pending.discard(task)
+            kind, user_key = task
+            try:
+                if kind == 'rebuild':
+                    self.build(user_key)
+                else:
+                    self.rescore_candidate(user_key)
+            except Exception as e:
+                logger.error(f"Error in candidate feed {kind} for {user_key}: {e}")
+
+    def build(self, user_key):
+        self.match_index.ensure_fresh(self.db)
+        ranked = self.match_index.ranked(
+            user_key, limit=self.size, exclude=self.seen_sets.get(self.db, user_key)
+        )
+        self.db.collection(COLLECTION).insert({
+            '_key': user_key,
+            'ids': [other for _, other in ranked],
+            'scores': [score for score, _ in ranked],
+            'built_at': time.time()
+        }, overwrite=True)
+
+    def rescore_candidate(self, candidate_key):
+        """Move candidate_key to its new position in every feed that lists it."""
+        self.match_index.ensure_fresh(self.db)
+        feeds = self.db.collection(COLLECTION)
+        repaired = 0
+        for feed in self.db.aql.execute(
+            queries.FIND_FEEDS_WITH_CANDIDATE,
+            bind_vars={'user_key': candidate_key},
+            batch_size=1000,
+            stream=True
+        ):
+            ids, scores = feed['ids'], feed['scores']
+            was_full = len(ids) >= self.size
+            position = ids.index(candidate_key)
+            del ids[position]
+            del scores[position]
+
+            score = self.match_index.score(feed['_key'], candidate_key)
+            ranking = [(-s, other) for s, other in zip(scores, ids)]
+            position = bisect.bisect_left(ranking, (-score, candidate_key))
+            # At the end of a full feed, users that were never listed may outrank it
+            if position < len(ids) or not was_full:
+                ids.insert(position, candidate_key)
+                scores.insert(position, score)
+
+            feeds.update({'_key': feed['_key'], 'ids': ids, 'scores': scores})
+            repaired += 1
+        if repaired:
+            logger.info(f"Rescored {candidate_key} in {repaired} candidate feeds")
@@ -0,0 +1,161 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+# Hashes stored by register and by rehash-on-login, spelled out in full the
+# way werkzeug writes it into the hash (scrypt:32768:8:1, not scrypt)
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+# Worker processes for KDF work; 0 hashes on the calling thread
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', os.cpu_count() or 1))
+
+# Requests allowed to wait for a worker before new ones are turned away
+HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', max(HASH_WORKERS, 1) * 4))
+
+HASH_TIMEOUT_SECONDS = float(os.getenv('HASH_TIMEOUT_SECONDS', 30))
+
+
+class PoolSaturated(Exception):
+    """Every worker is busy and the queue is full; the caller should answer 429."""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+def hash_password(password, method):
+    # Runs in a worker process; this module doesn't import the app, so the
+    # forkserver can preload it and workers start without loading Flask routes
+    return generate_password_hash(password, method)
+
+
+def verify_password(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+def hash_method(pwhash):
+    """The method prefix of a werkzeug hash, e.g. 'pbkdf2:sha256:600000'."""
+    return pwhash.split('$', 1)[0] if pwhash else ''
+
+
+class HashPool:
+    """Runs password hashing and verification in a bounded process pool.
+
+    The KDF is deliberately slow and holds the GIL, so running it on request
+    threads lets a login burst starve every other endpoint. Work is sent to
+    worker processes instead, and once more than ``queue_limit`` requests
+    are waiting new ones fail fast with PoolSaturated.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT, method=PASSWORD_HASH_METHOD):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.method = method
+        self._lock = threading.Lock()
+        self._executor = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _pool(self):
+        # Created on first use, so importing the app doesn't start workers. By
+        # then the app has background threads, and forking a threaded process
+        # can leave a child stuck on a lock copied mid-acquire, so workers
+        # come from a forkserver (spawn where that's unavailable).
+        with self._lock:
+            if self._executor is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                if context.get_start_method() == 'forkserver':
+                    # Imported once in the server, so each forked worker starts warm
+                    context.set_forkserver_preload(['hashing'])
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._executor
+
+    def _submit(self, operation, fn, *args):
+        if self.workers <= 0:
+            future = Future()
+            started = time.perf_counter()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            metrics.observe('knowz_hash_seconds', {'operation': operation}, time.perf_counter() - started)
+            return future
+
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                metrics.inc('knowz_hash_rejected_total', {'operation': operation})
+                raise PoolSaturated()
+            self.in_flight += 1
+            metrics.set('knowz_hash_in_flight', {}, self.in_flight)
+
+        started = time.perf_counter()
+
+        def done(_future):
+            with self._lock:
+                self.in_flight -= 1
+                metrics.set('knowz_hash_in_flight', {}, self.in_flight)
+            # Includes time spent queued behind other requests
+            metrics.observe('knowz_hash_seconds', {'operation': operation}, time.perf_counter() - started)
+
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            done(None)
+            raise
+        future.add_done_callback(done)
+        return future
+
+    def submit_hash(self, password):
+        return self._submit('hash', hash_password, password, self.method)
+
+    def submit_verify(self, pwhash, password):
+        return self._submit('verify', verify_password, pwhash, password)
+
+    def hash(self, password):
+        return self.submit_hash(password).result(timeout=HASH_TIMEOUT_SECONDS)
+
+    def verify(self, pwhash, password):
+        return self.submit_verify(pwhash, password).result(timeout=HASH_TIMEOUT_SECONDS)
+
+    def needs_rehash(self, pwhash):
+        """True if pwhash was made with a different algorithm or cost than configured."""
+        return hash_method(pwhash) != self.method
+
+    def rehash_later(self, password, save):
+        """Hash password with the configured method and pass the result to save().
+
+        Used after a successful login with a legacy hash. Skipped when the
+        pool is busy; the next login tries again.
+        """
+        try:
+            future = self.submit_hash(password)
+        except PoolSaturated:
+            return
+
+        def store(future):
+            try:
+                save(future.result())
+            except Exception as e:
+                logger.error(f"Error upgrading password hash: {e}")
+
+        future.add_done_callback(store)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'in_flight': self.in_flight,
+                'queued': max(0, self.in_flight - self.workers),
+                'rejected': self.rejected,
+                'method': self.method
+            }
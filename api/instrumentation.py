@@ -0,0 +1,248 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from collections import defaultdict
+from flask import g, request
+from arango.aql import AQL
+from arango.cursor import Cursor
+import queries
+
+logger = logging.getLogger(__name__)
+
+# AQL statements slower than this are logged with their text and bind-var shapes
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+
+# Adds X-DB-Time (milliseconds) and X-DB-Round-Trips to every response
+DB_TIME_HEADER = os.getenv('DB_TIME_HEADER', '').lower() in ('1', 'true', 'yes')
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HELP = {
+    'knowz_http_requests_total': ('counter', "HTTP requests by endpoint and status"),
+    'knowz_http_request_seconds': ('histogram', "HTTP request latency"),
+    'knowz_http_db_round_trips': ('histogram', "ArangoDB round-trips made while serving one HTTP request"),
+    'knowz_http_db_seconds': ('histogram', "Time spent waiting on ArangoDB while serving one HTTP request"),
+    'knowz_db_requests_total': ('counter', "ArangoDB HTTP round-trips by method"),
+    'knowz_db_request_seconds': ('histogram', "ArangoDB HTTP round-trip latency"),
+    'knowz_aql_queries_total': ('counter', "AQL statements executed, by queries.py name"),
+    'knowz_aql_seconds': ('histogram', "AQL latency seen by the client, first batch included"),
+    'knowz_aql_execution_seconds_total': ('counter', "AQL execution time reported by the server"),
+    'knowz_aql_documents_scanned_total': ('counter', "Documents read from collections and indexes by AQL"),
+    'knowz_aql_documents_returned_total': ('counter', "Documents AQL returned in its first batch"),
+    'knowz_aql_slow_queries_total': ('counter', "AQL statements slower than SLOW_QUERY_MS"),
+    'knowz_db_pool_size': ('gauge', "Connections each coordinator's pool may open"),
+    'knowz_db_pool_in_use': ('gauge', "Connections currently checked out per coordinator"),
+    'knowz_db_pool_wait_seconds': ('histogram', "Time spent waiting for a free pooled connection"),
+    'knowz_db_retries_total': ('counter', "Idempotent ArangoDB requests retried after a connection error or 5xx"),
+    'knowz_hash_in_flight': ('gauge', "Password hashing requests running or queued"),
+    'knowz_hash_seconds': ('histogram', "Password hashing latency, queueing included"),
+    'knowz_hash_rejected_total': ('counter', "Password hashing requests turned away because the pool was full"),
+    'knowz_swipe_queue_depth': ('gauge', "Swipes buffered and not yet written to ArangoDB"),
+    'knowz_swipe_batch_size': ('histogram', "Swipes written per group commit"),
+    'knowz_swipes_rejected_total': ('counter', "Swipes turned away because the write-behind queue was full"),
+    'knowz_swipes_spooled_total': ('counter', "Swipes written to the local spool file instead of ArangoDB"),
+    'knowz_swipes_failed_total': ('counter', "Swipes ArangoDB still failed or rejected after every retry"),
+}
+
+# Statement text -> constant name in queries.py, used as the metric label
+QUERY_NAMES = {
+    value: name for name, value in vars(queries).items()
+    if name.isupper() and isinstance(value, str)
+}
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Counters and histograms rendered in the Prometheus text format.
+
+    Values are kept per process; with several workers each one exposes
+    its own /metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._counters[name, tuple(sorted(labels.items()))] += amount
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._counters[name, tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, labels, value, buckets=SECONDS_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, counts=list(value['counts'])) for key, value in self._histograms.items()}
+
+        lines = []
+        for metric, (kind, text) in HELP.items():
+            lines.append(f"# HELP {metric} {text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            if kind in ('counter', 'gauge'):
+                for (name, labels), value in sorted(counters.items()):
+                    if name == metric:
+                        lines.append(f"{name}{self._labels(labels)} {value:g}")
+                continue
+            for (name, labels), histogram in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                for bound, count in zip(histogram['buckets'], histogram['counts']):
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', f'{bound:g}')])} {count}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{self._labels(labels)} {histogram['sum']:g}")
+                lines.append(f"{name}_count{self._labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class RequestStats:
+    """Database work done on behalf of the current HTTP request."""
+
+    def __init__(self):
+        self.round_trips = 0
+        self.db_seconds = 0.0
+        self.queries = 0
+
+
+_current = contextvars.ContextVar('db_request_stats', default=None)
+
+
+def record_round_trip(method, elapsed):
+    """Called by the HTTP client in transport.py for every ArangoDB request."""
+    metrics.inc('knowz_db_requests_total', {'method': method.upper()})
+    metrics.observe('knowz_db_request_seconds', {'method': method.upper()}, elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.round_trips += 1
+        stats.db_seconds += elapsed
+
+
+def bind_var_shapes(bind_vars):
+    # Types and sizes only; values can be usernames, emails or message text
+    shapes = {}
+    for name, value in (bind_vars or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            shapes[name] = f"list[{len(value)}]"
+        elif isinstance(value, dict):
+            shapes[name] = f"object[{len(value)}]"
+        else:
+            shapes[name] = type(value).__name__
+    return shapes
+
+
+def record_query(query, bind_vars, cursor, elapsed):
+    name = QUERY_NAMES.get(query, 'other')
+    labels = {'query': name}
+    metrics.inc('knowz_aql_queries_total', labels)
+    metrics.observe('knowz_aql_seconds', labels, elapsed)
+
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+
+    execution_time = scanned = returned = None
+    if isinstance(cursor, Cursor):
+        query_stats = cursor.statistics() or {}
+        execution_time = query_stats.get('execution_time')
+        scanned = query_stats.get('scanned_full', 0) + query_stats.get('scanned_index', 0)
+        # Later batches are fetched lazily; most statements fit in the first one
+        returned = len(cursor.batch())
+        if execution_time is not None:
+            metrics.inc('knowz_aql_execution_seconds_total', labels, execution_time)
+        metrics.inc('knowz_aql_documents_scanned_total', labels, scanned)
+        metrics.inc('knowz_aql_documents_returned_total', labels, returned)
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        metrics.inc('knowz_aql_slow_queries_total', labels)
+        server = f"{execution_time * 1000:.1f}ms" if execution_time is not None else "n/a"
+        logger.warning(
+            f"Slow query {name} took {elapsed * 1000:.1f}ms (server {server}, scanned {scanned}, "
+            f"returned {returned}), bind vars {bind_var_shapes(bind_vars)}: {' '.join(query.split())}"
+        )
+
+
+def instrument_aql():
+    """Time every AQL.execute call and record its cursor statistics."""
+    if getattr(AQL.execute, 'instrumented', False):
+        return
+    execute = AQL.execute
+
+    def timed_execute(self, query, *args, **kwargs):
+        started = time.perf_counter()
+        cursor = execute(self, query, *args, **kwargs)
+        try:
+            record_query(query, kwargs.get('bind_vars'), cursor, time.perf_counter() - started)
+        except Exception as e:
+            logger.error(f"Error recording query metrics: {e}")
+        return cursor
+
+    timed_execute.instrumented = True
+    AQL.execute = timed_execute
+
+
+def init_app(app):
+    """Collect per-request database statistics for every Flask request."""
+    instrument_aql()
+
+    @app.before_request
+    def start_request_stats():
+        g.db_stats_token = _current.set(RequestStats())
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = _current.get()
+        if stats is None or 'request_started' not in g:
+            return response
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.inc('knowz_http_requests_total', {
+            'method': request.method, 'endpoint': endpoint, 'status': response.status_code
+        })
+        labels = {'endpoint': endpoint}
+        metrics.observe('knowz_http_request_seconds', labels, time.perf_counter() - g.request_started)
+        metrics.observe('knowz_http_db_round_trips', labels, stats.round_trips, buckets=ROUND_TRIP_BUCKETS)
+        metrics.observe('knowz_http_db_seconds', labels, stats.db_seconds)
+        if DB_TIME_HEADER:
+            response.headers['X-DB-Time'] = f"{stats.db_seconds * 1000:.1f}"
+            response.headers['X-DB-Round-Trips'] = str(stats.round_trips)
+        return response
+
+    @app.teardown_request
+    def reset_request_stats(_error):
+        token = g.pop('db_stats_token', None)
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:
+                # Streamed responses can finish in another context
+                _current.set(None)
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import math
+import heapq
+import bisect
+import base64
+import logging
+import threading
+from collections import defaultdict
+import queries
+
+logger = logging.getLogger(__name__)
+
+SKILL_KINDS = ('teaching', 'learning')
+
+
+def encode_cursor(score, user_key):
+    """Opaque position in a ranking ordered by score descending, then user key."""
+    raw = json.dumps([score, user_key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        score, user_key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(score, (int, float)) or not isinstance(user_key, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return score, user_key
+
+
+def after_cursor(score, user_key, after):
+    """True if (score, user_key) ranks strictly after the cursor position."""
+    return after is None or (-score, user_key) > (-after[0], after[1])
+
+
+class MatchIndex:
+    """In-process inverted index of who teaches and who wants to learn each skill.
+
+    Scores are the same complementarity score the AQL in /predict used:
+    how many of my skills the other user wants to learn plus how many of my
+    goals the other user can teach. Skills are stored as document ids
+    (``skills/<key>``) so payloads match the traversal results.
+    """
+
+    def __init__(self, refresh_seconds=None):
+        self._lock = threading.RLock()
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else \
+            int(os.getenv('MATCH_INDEX_REFRESH_SECONDS', 300))
+        self.loaded_at = None
+        # Held while a snapshot is loading, so concurrent requests never start a second one
+        self._load_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.usernames = {}
+        # Every user key in sorted order, so padding a page starts at the cursor
+        self.user_order = []
+        self.teachers = defaultdict(set)
+        self.learners = defaultdict(set)
+        self.user_skills = defaultdict(set)
+        self.user_goals = defaultdict(set)
+
+    def _postings(self, kind):
+        if kind == 'teaching':
+            return self.user_skills, self.teachers
+        if kind == 'learning':
+            return self.user_goals, self.learners
+        raise ValueError(f"Invalid skill kind: {kind}")
+
+    def load(self, db):
+        with self._load_lock:
+            self._load(db)
+
+    def _load(self, db):
+        started = time.time()
+        fresh = MatchIndex(refresh_seconds=self.refresh_seconds)
+
+        for user in db.aql.execute(queries.LOAD_USERS, batch_size=10000, stream=True):
+            fresh.usernames[user['key']] = user.get('username')
+        fresh.user_order = sorted(fresh.usernames)
+
+        for kind, aql in (('teaching', queries.LOAD_TEACHING_EDGES),
+                          ('learning', queries.LOAD_LEARNING_EDGES)):
+            by_user, by_skill = fresh._postings(kind)
+            for edge in db.aql.execute(aql, batch_size=10000, stream=True):
+                user_key = edge[0].split('/', 1)[1]
+                by_user[user_key].add(edge[1])
+                by_skill[edge[1]].add(user_key)
+
+        with self._lock:
+            self.usernames = fresh.usernames
+            self.user_order = fresh.user_order
+            self.teachers = fresh.teachers
+            self.learners = fresh.learners
+            self.user_skills = fresh.user_skills
+            self.user_goals = fresh.user_goals
+            self.loaded_at = time.time()
+
+        logger.info(
+            f"Match index loaded {len(self.usernames)} users and "
+            f"{len(set(self.teachers) | set(self.learners))} skills in {time.time() - started:.2f}s"
+        )
+
+    def ensure_fresh(self, db):
+        # Other worker processes write to the same database, so the index is
+        # periodically rebuilt to pick up their changes. Only the very first
+        # load blocks; after that the old snapshot is served while a
+        # background thread loads the next one.
+        if self.loaded_at is None:
+            with self._load_lock:
+                if self.loaded_at is None:
+                    self._load(db)
+        elif self.refresh_seconds > 0 and time.time() - self.loaded_at > self.refresh_seconds:
+            self.refresh_in_background(db)
+
+    def refresh_in_background(self, db):
+        if not self._load_lock.acquire(blocking=False):
+            return
+
+        def refresh():
+            try:
+                self._load(db)
+            except Exception as e:
+                logger.error(f"Error refreshing match index: {e}")
+            finally:
+                self._load_lock.release()
+
+        threading.Thread(target=refresh, name='match-index-refresh', daemon=True).start()
+
+    def add_user(self, user_key, username):
+        with self._lock:
+            if user_key not in self.usernames:
+                bisect.insort(self.user_order, user_key)
+            self.usernames[user_key] = username
+
+    def rename_user(self, user_key, username):
+        with self._lock:
+            if user_key in self.usernames:
+                self.usernames[user_key] = username
+
+    def add_skill(self, user_key, skill_id, kind):
+        by_user, by_skill = self._postings(kind)
+        with self._lock:
+            by_user[user_key].add(skill_id)
+            by_skill[skill_id].add(user_key)
+
+    def remove_skill(self, user_key, skill_id, kind):
+        by_user, by_skill = self._postings(kind)
+        with self._lock:
+            by_user[user_key].discard(skill_id)
+            by_skill[skill_id].discard(user_key)
+
+    def set_skills(self, user_key, skill_ids, kind):
+        by_user, by_skill = self._postings(kind)
+        with self._lock:
+            for skill_id in by_user[user_key]:
+                by_skill[skill_id].discard(user_key)
+            by_user[user_key] = set(skill_ids)
+            for skill_id in by_user[user_key]:
+                by_skill[skill_id].add(user_key)
+
+    def profile(self, user_key):
+        """(teaching skill ids, learning goal ids) of one user."""
+        with self._lock:
+            return set(self.user_skills.get(user_key, ())), set(self.user_goals.get(user_key, ()))
+
+    def profiles(self):
+        """Snapshot of (user_key, skills, goals) for every known user."""
+        with self._lock:
+            return [
+                (user_key, frozenset(self.user_skills.get(user_key, ())), frozenset(self.user_goals.get(user_key, ())))
+                for user_key in self.usernames
+            ]
+
+    def holders(self, skill_id):
+        """Users who teach or want to learn skill_id."""
+        with self._lock:
+            return set(self.teachers.get(skill_id, ())) | set(self.learners.get(skill_id, ()))
+
+    def score(self, user_key, other_key):
+        with self._lock:
+            return (len(self.user_skills[user_key] & self.user_goals[other_key]) +
+                    len(self.user_goals[user_key] & self.user_skills[other_key]))
+
+    def candidate_scores(self, user_key):
+        """Complementarity score of every user sharing at least one posting list with user_key."""
+        scores = defaultdict(int)
+        with self._lock:
+            for skill_id in self.user_skills.get(user_key, ()):
+                for other in self.learners.get(skill_id, ()):
+                    scores[other] += 1
+            for skill_id in self.user_goals.get(user_key, ()):
+                for other in self.teachers.get(skill_id, ()):
+                    scores[other] += 1
+        scores.pop(user_key, None)
+        return scores
+
+    def ranked(self, user_key, limit=5, exclude=(), after=None):
+        """[(score, other_key)] ordered by score descending, then user key.
+
+        exclude holds user keys to skip (already swiped); after is a decoded
+        cursor, and only candidates ranked past it are returned.
+        """
+        with self._lock:
+            if user_key not in self.usernames:
+                return []
+
+            scores = self.candidate_scores(user_key)
+            ranked = heapq.nsmallest(limit, (
+                (-score, other) for other, score in scores.items()
+                if other in self.usernames and other not in exclude and after_cursor(score, other, after)
+            ))
+
+            # The full-scan query always filled the page, so pad with
+            # zero-score users when there aren't enough complementary ones.
+            # They rank by key, so the walk starts at the cursor and stops
+            # once the page is full.
+            if len(ranked) < limit and (after is None or after[0] >= 0):
+                start = bisect.bisect_right(self.user_order, after[1]) if after and after[0] == 0 else 0
+                order = self.user_order
+                for i in range(start, len(order)):
+                    if len(ranked) == limit:
+                        break
+                    other = order[i]
+                    if other != user_key and other not in scores and other not in exclude:
+                        ranked.append((0, other))
+
+            return [(-score, other) for score, other in ranked]
+
+    def top_matches(self, user_key, limit=5, exclude=(), after=None):
+        """One page of /predict payloads; see ranked() for the arguments."""
+        with self._lock:
+            return [
+                self.payload(user_key, other, score)
+                for score, other in self.ranked(user_key, limit, exclude, after)
+            ]
+
+    def payload(self, user_key, other_key, score=None):
+        with self._lock:
+            my_skills = self.user_skills.get(user_key, set())
+            my_goals = self.user_goals.get(user_key, set())
+            other_skills = self.user_skills.get(other_key, set())
+            other_goals = self.user_goals.get(other_key, set())
+            if score is None:
+                score = len(my_skills & other_goals) + len(my_goals & other_skills)
+            return {
+                'user_id': other_key,
+                'username': self.usernames.get(other_key),
+                'match_score': score,
+                'matching_skills': sorted(my_goals & other_skills),
+                'matching_goals': sorted(my_skills & other_goals),
+                'all_skills': sorted(other_skills),
+                'all_goals': sorted(other_goals),
+                'match_percentage': math.ceil(score * 20)
+            }
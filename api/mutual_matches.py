@@ -0,0 +1,60 @@
+import sys
+import logging
+from datetime import datetime
+import queries
+
+logger = logging.getLogger(__name__)
+
+EDGE_COLLECTION = 'mutual_match'
+
+
+def pair_key(user_a, user_b):
+    """Deterministic key for an unordered user pair, so each match is stored once."""
+    low, high = sorted([user_a, user_b])
+    return f"{low}_{high}"
+
+
+def ensure_edge_definition(graph):
+    if not graph.has_edge_definition(EDGE_COLLECTION):
+        graph.create_edge_definition(
+            edge_collection=EDGE_COLLECTION,
+            from_vertex_collections=['users'],
+            to_vertex_collections=['users']
+        )
+        logger.info(f"Created '{EDGE_COLLECTION}' edge definition")
+    return graph.edge_collection(EDGE_COLLECTION)
+
+
+def link(edges, user_a, user_b):
+    low, high = sorted([user_a, user_b])
+    edges.insert({
+        '_key': pair_key(low, high),
+        '_from': f'users/{low}',
+        '_to': f'users/{high}',
+        'created_at': datetime.now().isoformat()
+    }, overwrite_mode='ignore')
+
+
+def unlink(edges, user_a, user_b):
+    return edges.delete(pair_key(user_a, user_b), ignore_missing=True)
+
+
+def is_mutual(edges, user_a, user_b):
+    return edges.has(pair_key(user_a, user_b))
+
+
+def backfill(db):
+    """Create mutual_match edges for every pair whose latest swipes are both likes."""
+    cursor = db.aql.execute(queries.BACKFILL_MUTUAL_MATCHES, stream=True)
+    return sum(1 for _ in cursor)
+
+
+if __name__ == "__main__":
+    import schema
+
+    logging.basicConfig(level=logging.INFO)
+    db = schema.connect()
+    ensure_edge_definition(db.graph('skill_graph'))
+    created = backfill(db)
+    logger.info(f"Backfilled {created} mutual_match edges from swipe history")
+    sys.exit(0)
@@ -1,8 +1,15 @@
 import os
+import sys
+import json
+import time
+import hashlib
 import logging
+import argparse
+from itertools import islice
 from arango import ArangoClient
 from werkzeug.security import generate_password_hash
 from dotenv import load_dotenv
+from skill_catalog import ALIASES, normalize
 import random
 
 # Configure logging
@@ -12,34 +19,6 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Get ArangoDB credentials
-ARANGO_URL = os.getenv("ARANGO_URL")
-ARANGO_DB_NAME = os.getenv("ARANGO_DB_NAME")
-ARANGO_USERNAME = os.getenv("ARANGO_USERNAME")
-ARANGO_PASSWORD = os.getenv("ARANGO_PASSWORD")
-
-# Initialize the ArangoDB client
-client = ArangoClient(hosts=ARANGO_URL)
-db = client.db(ARANGO_DB_NAME, username=ARANGO_USERNAME, password=ARANGO_PASSWORD)
-
-# Get collections
-users = db.collection('users')
-skills = db.collection('skills')
-graph = db.graph('skill_graph')
-has_skill = graph.edge_collection('has_skill')
-wants_to_learn = graph.edge_collection('wants_to_learn')
-
-# Check if we should clear existing data
-clear_data = input("Clear existing data? (y/n): ").lower() == 'y'
-
-if clear_data:
-    logger.info("Clearing existing data...")
-    has_skill.truncate()
-    wants_to_learn.truncate()
-    users.truncate()
-    skills.truncate()
-    logger.info("Data cleared successfully")
-
 # Define skill categories and levels
 SKILL_LEVELS = ['Beginner', 'Intermediate', 'Advanced', 'Expert']
 
@@ -76,31 +55,6 @@ SKILLS = {
     ]
 }
 
-# Flatten skills to a list
-all_skills = []
-for category, skills_list in SKILLS.items():
-    for skill_name in skills_list:
-        all_skills.append((skill_name, category))
-
-logger.info(f"Adding {len(all_skills)} skills...")
-
-# Add skills
-skill_docs = {}
-for skill_name, category in all_skills:
-    skill_id = skill_name.replace(" ", "_").lower()
-    if not skills.has(skill_id):
-        doc = {
-            '_key': skill_id,
-            'name': skill_name,
-            'category': category
-        }
-        skills.insert(doc)
-        skill_docs[skill_name] = skill_id
-        logger.info(f"Added skill: {skill_name} ({category})")
-    else:
-        logger.info(f"Skill already exists: {skill_name}")
-        skill_docs[skill_name] = skill_id
-
 # Define users with their teaching and learning skills
 USERS = [
     {
@@ -185,79 +139,299 @@ USERS = [
     }
 ]
 
-logger.info(f"Adding {len(USERS)} users with their skills...")
-
-# Add users and their relationships
-for user_data in USERS:
-    # Skip if user already exists
-    existing = users.find({'username': user_data['username']})
-    if next(existing, None):
-        logger.info(f"User already exists: {user_data['username']}")
-        continue
-    
-    # Create user
-    user = {
-        'username': user_data['username'],
-        'email': user_data['email'],
-        'password': generate_password_hash(user_data['password']),
-        'bio': user_data['bio']
-    }
-    
-    meta = users.insert(user)
-    user_key = meta['_key']
-    logger.info(f"Added user: {user_data['username']} with key {user_key}")
-    
-    # Add teaching skills
-    for skill_name in user_data['teaching_skills']:
-        if skill_name in skill_docs:
-            skill_id = skill_docs[skill_name]
-            level = random.choice(SKILL_LEVELS)
-            
-            # Check if the relationship already exists
-            existing_edge = has_skill.find({
-                '_from': f'users/{user_key}',
-                '_to': f'skills/{skill_id}'
-            })
-            
-            if not next(existing_edge, None):
-                has_skill.insert({
+
+def connect():
+    # Get ArangoDB credentials
+    ARANGO_URL = os.getenv("ARANGO_URL")
+    ARANGO_DB_NAME = os.getenv("ARANGO_DB_NAME")
+    ARANGO_USERNAME = os.getenv("ARANGO_USERNAME")
+    ARANGO_PASSWORD = os.getenv("ARANGO_PASSWORD")
+
+    # Initialize the ArangoDB client
+    client = ArangoClient(hosts=ARANGO_URL)
+    return client.db(ARANGO_DB_NAME, username=ARANGO_USERNAME, password=ARANGO_PASSWORD)
+
+
+def skill_key(skill_name):
+    # Same keys the API assigns (SkillCatalog.key_for), so seeded skills resolve on registration
+    normalized = normalize(skill_name)
+    return ALIASES.get(normalized, normalized)
+
+
+def user_key_for(username):
+    # Deterministic, so re-running an import updates or skips instead of duplicating
+    return hashlib.sha1(username.encode()).hexdigest()[:20]
+
+
+def clear(db):
+    logger.info("Clearing existing data...")
+    graph = db.graph('skill_graph')
+    graph.edge_collection('has_skill').truncate()
+    graph.edge_collection('wants_to_learn').truncate()
+    db.collection('users').truncate()
+    db.collection('skills').truncate()
+    logger.info("Data cleared successfully")
+
+
+def add_skills(skills):
+    # Flatten skills to a list
+    all_skills = []
+    for category, skills_list in SKILLS.items():
+        for skill_name in skills_list:
+            all_skills.append((skill_name, category))
+
+    logger.info(f"Adding {len(all_skills)} skills...")
+
+    # Add skills
+    skill_docs = {}
+    for skill_name, category in all_skills:
+        skill_id = skill_key(skill_name)
+        if not skills.has(skill_id):
+            doc = {
+                '_key': skill_id,
+                'name': skill_name,
+                'category': category
+            }
+            skills.insert(doc)
+            skill_docs[skill_name] = skill_id
+            logger.info(f"Added skill: {skill_name} ({category})")
+        else:
+            logger.info(f"Skill already exists: {skill_name}")
+            skill_docs[skill_name] = skill_id
+    return skill_docs
+
+
+def add_demo_users(users, has_skill, wants_to_learn, skill_docs):
+    logger.info(f"Adding {len(USERS)} users with their skills...")
+
+    # Add users and their relationships
+    for user_data in USERS:
+        # Skip if user already exists
+        existing = users.find({'username': user_data['username']})
+        if next(existing, None):
+            logger.info(f"User already exists: {user_data['username']}")
+            continue
+
+        # Create user
+        user = {
+            'username': user_data['username'],
+            'email': user_data['email'],
+            'password': generate_password_hash(user_data['password']),
+            'bio': user_data['bio']
+        }
+
+        meta = users.insert(user)
+        user_key = meta['_key']
+        logger.info(f"Added user: {user_data['username']} with key {user_key}")
+
+        # Add teaching skills
+        for skill_name in user_data['teaching_skills']:
+            if skill_name in skill_docs:
+                skill_id = skill_docs[skill_name]
+                level = random.choice(SKILL_LEVELS)
+
+                # Check if the relationship already exists
+                existing_edge = has_skill.find({
                     '_from': f'users/{user_key}',
-                    '_to': f'skills/{skill_id}',
-                    'proficiency': random.randint(3, 5)
+                    '_to': f'skills/{skill_id}'
                 })
-                logger.info(f"  Added teaching skill: {skill_name} ({level})")
-    
-    # Add learning skills
-    for skill_name in user_data['learning_skills']:
-        if skill_name in skill_docs:
-            skill_id = skill_docs[skill_name]
-            
-            # Check if the relationship already exists
-            existing_edge = wants_to_learn.find({
-                '_from': f'users/{user_key}',
-                '_to': f'skills/{skill_id}'
-            })
-            
-            if not next(existing_edge, None):
-                wants_to_learn.insert({
+
+                if not next(existing_edge, None):
+                    has_skill.insert({
+                        '_from': f'users/{user_key}',
+                        '_to': f'skills/{skill_id}',
+                        'proficiency': random.randint(3, 5)
+                    })
+                    logger.info(f"  Added teaching skill: {skill_name} ({level})")
+
+        # Add learning skills
+        for skill_name in user_data['learning_skills']:
+            if skill_name in skill_docs:
+                skill_id = skill_docs[skill_name]
+
+                # Check if the relationship already exists
+                existing_edge = wants_to_learn.find({
                     '_from': f'users/{user_key}',
                     '_to': f'skills/{skill_id}'
                 })
-                logger.info(f"  Added learning skill: {skill_name}")
-
-logger.info("Data population complete!")
-
-# Print summary
-users_count = len(list(users.all()))
-skills_count = len(list(skills.all()))
-teaching_count = len(list(has_skill.all()))
-learning_count = len(list(wants_to_learn.all()))
-
-print("\n=== Database Population Summary ===")
-print(f"Users: {users_count}")
-print(f"Skills: {skills_count}")
-print(f"Teaching relationships: {teaching_count}")
-print(f"Learning relationships: {learning_count}")
-print("\nYou can now log in with any of these accounts:")
-for user in USERS:
-    print(f"- Username: {user['username']}, Password: {user['password']}")
\ No newline at end of file
+
+                if not next(existing_edge, None):
+                    wants_to_learn.insert({
+                        '_from': f'users/{user_key}',
+                        '_to': f'skills/{skill_id}'
+                    })
+                    logger.info(f"  Added learning skill: {skill_name}")
+
+    logger.info("Data population complete!")
+
+
+def generate_users(count, teaching_per_user=3, learning_per_user=3, password='password123', seed=None, start=0):
+    """Yield synthetic users whose skills are drawn from the SKILLS taxonomy."""
+    rng = random.Random(seed)
+    categories = list(SKILLS)
+    skill_names = [name for names in SKILLS.values() for name in names]
+    for i in range(start, start + count):
+        picks = rng.sample(skill_names, teaching_per_user + learning_per_user)
+        yield {
+            'username': f'synth_user_{i}',
+            'email': f'synth_user_{i}@example.com',
+            'password': password,
+            'bio': f'Synthetic {rng.choice(categories)} learner #{i}',
+            'teaching_skills': picks[:teaching_per_user],
+            'learning_skills': picks[teaching_per_user:]
+        }
+
+
+def read_users(path):
+    """Yield users from a JSON Lines file shaped like the entries of USERS."""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_load(db, user_rows, batch_size=5000, on_duplicate='ignore', seed=None):
+    """Stream users, skills and edges into the database with import_bulk.
+
+    Keys are derived from usernames and (user, skill) pairs, so reruns skip
+    or update existing documents instead of looking them up first.
+    """
+    rng = random.Random(seed)
+    graph = db.graph('skill_graph')
+    collections = {
+        'users': db.collection('users'),
+        'skills': db.collection('skills'),
+        'has_skill': graph.edge_collection('has_skill'),
+        'wants_to_learn': graph.edge_collection('wants_to_learn')
+    }
+    categories = {name: category for category, names in SKILLS.items() for name in names}
+    totals = {name: {'created': 0, 'updated': 0, 'ignored': 0, 'errors': 0} for name in collections}
+    password_hashes = {}
+    known_skills = set()
+    loaded = 0
+    started = time.time()
+
+    for batch in batched(user_rows, batch_size):
+        docs = {name: [] for name in collections}
+        for row in batch:
+            user_key = row.get('key') or user_key_for(row['username'])
+            password = row.get('password', 'password123')
+            # Hashing is deliberately slow; synthetic users share one password
+            if password not in password_hashes:
+                password_hashes[password] = generate_password_hash(password)
+            docs['users'].append({
+                '_key': user_key,
+                'username': row['username'],
+                'email': row.get('email', ''),
+                'password': password_hashes[password],
+                'bio': row.get('bio', '')
+            })
+
+            for collection, field in (('has_skill', 'teaching_skills'), ('wants_to_learn', 'learning_skills')):
+                for skill_name in row.get(field, []):
+                    skill_id = skill_key(skill_name)
+                    if skill_id not in known_skills:
+                        known_skills.add(skill_id)
+                        docs['skills'].append({
+                            '_key': skill_id,
+                            'name': skill_name,
+                            'category': categories.get(skill_name, 'Technical')
+                        })
+                    edge = {
+                        '_key': f'{user_key}-{skill_id}',
+                        '_from': f'users/{user_key}',
+                        '_to': f'skills/{skill_id}'
+                    }
+                    if collection == 'has_skill':
+                        edge['proficiency'] = rng.randint(3, 5)
+                    docs[collection].append(edge)
+
+        # Vertices first so edges never point at documents that don't exist yet
+        for name in ('skills', 'users', 'has_skill', 'wants_to_learn'):
+            if not docs[name]:
+                continue
+            result = collections[name].import_bulk(docs[name], on_duplicate=on_duplicate, halt_on_error=False)
+            for field in totals[name]:
+                totals[name][field] += result.get(field, 0)
+
+        loaded += len(batch)
+        elapsed = time.time() - started
+        logger.info(f"Loaded {loaded} users ({loaded / elapsed:.0f} users/s)")
+
+    for name, counts in totals.items():
+        logger.info(
+            f"{name}: {counts['created']} created, {counts['updated']} updated, "
+            f"{counts['ignored']} ignored, {counts['errors']} errors"
+        )
+    return totals
+
+
+def print_summary(db, show_logins):
+    graph = db.graph('skill_graph')
+    print("\n=== Database Population Summary ===")
+    print(f"Users: {db.collection('users').count()}")
+    print(f"Skills: {db.collection('skills').count()}")
+    print(f"Teaching relationships: {graph.edge_collection('has_skill').count()}")
+    print(f"Learning relationships: {graph.edge_collection('wants_to_learn').count()}")
+    if show_logins:
+        print("\nYou can now log in with any of these accounts:")
+        for user in USERS:
+            print(f"- Username: {user['username']}, Password: {user['password']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the KnowZ database")
+    parser.add_argument('--clear', action='store_true', help="Truncate users, skills and skill edges first")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Bulk-load synthetic users (or --input) with import_bulk instead of the demo users")
+    parser.add_argument('--users', type=int, default=1000, help="Synthetic users to generate in bulk mode")
+    parser.add_argument('--teaching-per-user', type=int, default=3)
+    parser.add_argument('--learning-per-user', type=int, default=3)
+    parser.add_argument('--input', help="JSON Lines file of users to load instead of generating them")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Users per import_bulk batch")
+    parser.add_argument('--on-duplicate', default='ignore', choices=['error', 'update', 'replace', 'ignore'])
+    parser.add_argument('--password', default='password123', help="Password for synthetic users")
+    parser.add_argument('--seed', type=int, help="Random seed for reproducible synthetic data")
+    args = parser.parse_args()
+
+    db = connect()
+
+    if args.clear:
+        clear(db)
+
+    if not args.bulk:
+        graph = db.graph('skill_graph')
+        skill_docs = add_skills(db.collection('skills'))
+        add_demo_users(
+            db.collection('users'),
+            graph.edge_collection('has_skill'),
+            graph.edge_collection('wants_to_learn'),
+            skill_docs
+        )
+        print_summary(db, show_logins=True)
+        return 0
+
+    if args.input:
+        rows = read_users(args.input)
+    else:
+        rows = generate_users(
+            args.users, args.teaching_per_user, args.learning_per_user,
+            password=args.password, seed=args.seed
+        )
+    totals = bulk_load(db, rows, batch_size=args.batch_size, on_duplicate=args.on_duplicate, seed=args.seed)
+    print_summary(db, show_logins=False)
+    return 1 if any(counts['errors'] for counts in totals.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
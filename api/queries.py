@@ -0,0 +1,491 @@
+# AQL statements used by the API, kept in one place so schema.py can
+# explain every one of them against the live database.
+
+LOAD_USERS = """
+FOR u IN users
+    RETURN { key: u._key, username: u.username }
+"""
+
+LOAD_TEACHING_EDGES = """
+FOR e IN has_skill
+    RETURN [e._from, e._to]
+"""
+
+LOAD_LEARNING_EDGES = """
+FOR e IN wants_to_learn
+    RETURN [e._from, e._to]
+"""
+
+FIND_USER_BY_USERNAME = """
+FOR u IN users
+    FILTER u.username == @username
+    LIMIT 1
+    RETURN u._key
+"""
+
+GET_PROFILE = """
+WITH users, skills, has_skill, wants_to_learn
+LET user = DOCUMENT('users', @user_key)
+FILTER user != null
+
+LET user_skills = (
+    FOR skill IN OUTBOUND CONCAT('users/', @user_key) has_skill
+    RETURN {
+        id: skill._key,
+        name: skill.name,
+        category: skill.category
+    }
+)
+
+LET learning_goals = (
+    FOR skill IN OUTBOUND CONCAT('users/', @user_key) wants_to_learn
+    RETURN {
+        id: skill._key,
+        name: skill.name,
+        category: skill.category
+    }
+)
+
+RETURN {
+    user: UNSET(user, 'password'),
+    skills: user_skills,
+    learning_goals: learning_goals
+}
+"""
+
+REMOVE_ALL_TEACHING_SKILLS = """
+FOR edge IN has_skill
+    FILTER edge._from == @user_doc
+    REMOVE edge IN has_skill
+"""
+
+REMOVE_ALL_LEARNING_GOALS = """
+FOR edge IN wants_to_learn
+    FILTER edge._from == @user_doc
+    REMOVE edge IN wants_to_learn
+"""
+
+# Batch skill edits; the unique (_from, _to) indexes make the UPSERTs index lookups
+ADD_TEACHING_EDGES = """
+FOR skill_doc IN @skill_docs
+    UPSERT { _from: @user_doc, _to: skill_doc }
+    INSERT { _from: @user_doc, _to: skill_doc, proficiency: 5 }
+    UPDATE {}
+    IN has_skill
+    RETURN { skill_doc: skill_doc, created: OLD == null }
+"""
+
+ADD_LEARNING_EDGES = """
+FOR skill_doc IN @skill_docs
+    UPSERT { _from: @user_doc, _to: skill_doc }
+    INSERT { _from: @user_doc, _to: skill_doc }
+    UPDATE {}
+    IN wants_to_learn
+    RETURN { skill_doc: skill_doc, created: OLD == null }
+"""
+
+REMOVE_TEACHING_EDGES = """
+FOR edge IN has_skill
+    FILTER edge._from == @user_doc AND edge._to IN @skill_docs
+    REMOVE edge IN has_skill
+    RETURN OLD._to
+"""
+
+REMOVE_LEARNING_EDGES = """
+FOR edge IN wants_to_learn
+    FILTER edge._from == @user_doc AND edge._to IN @skill_docs
+    REMOVE edge IN wants_to_learn
+    RETURN OLD._to
+"""
+
+FIND_TEACHING_EDGE = """
+WITH users, skills, has_skill
+FOR edge IN has_skill
+    FILTER edge._from == @user_doc AND edge._to == @skill_doc
+    RETURN edge
+"""
+
+FIND_LEARNING_EDGE = """
+WITH users, skills, wants_to_learn
+FOR edge IN wants_to_learn
+    FILTER edge._from == @user_doc AND edge._to == @skill_doc
+    RETURN edge
+"""
+
+REMOVE_TEACHING_EDGE = """
+WITH users, skills, has_skill
+FOR edge IN has_skill
+    FILTER edge._from == @user_doc AND edge._to == @skill_doc
+    REMOVE edge IN has_skill
+"""
+
+REMOVE_LEARNING_EDGE = """
+WITH users, skills, wants_to_learn
+FOR edge IN wants_to_learn
+    FILTER edge._from == @user_doc AND edge._to == @skill_doc
+    REMOVE edge IN wants_to_learn
+"""
+
+GET_MATCHES = """
+WITH users, conversations
+FOR c IN conversations
+    FILTER @user_key IN c.participants[*] AND c.active == true
+    LET user_id = FIRST(REMOVE_VALUE(c.participants, @user_key))
+    LET user = DOCUMENT('users', user_id)
+    RETURN {
+        id: user_id,
+        username: user.username,
+        last_message: c.last_message,
+        message_count: c.message_count,
+        unread_count: c.unread[@user_key] || 0,
+        max_messages: 5  // Message limit for MVP
+    }
+"""
+
+GET_MESSAGES = """
+WITH messages
+FOR msg IN messages
+    FILTER (msg.sender_id == @user_key AND msg.receiver_id == @match_id) OR
+           (msg.sender_id == @match_id AND msg.receiver_id == @user_key)
+    SORT msg.created_at ASC, msg._key ASC
+    RETURN {
+        id: msg._key,
+        senderId: msg.sender_id,
+        text: msg.text,
+        timestamp: msg.created_at,
+        isRead: msg.is_read
+    }
+"""
+
+GET_MESSAGES_SINCE = """
+WITH messages
+FOR msg IN messages
+    FILTER (msg.sender_id == @user_key AND msg.receiver_id == @match_id) OR
+           (msg.sender_id == @match_id AND msg.receiver_id == @user_key)
+    FILTER msg.created_at >= @since_at
+    FILTER msg.created_at > @since_at OR msg._key > @since_key
+    SORT msg.created_at ASC, msg._key ASC
+    RETURN {
+        id: msg._key,
+        senderId: msg.sender_id,
+        text: msg.text,
+        timestamp: msg.created_at,
+        isRead: msg.is_read
+    }
+"""
+
+MARK_MESSAGES_READ = """
+WITH messages, conversations
+LET marked = (
+    FOR msg IN messages
+        FILTER msg.sender_id == @match_id AND msg.receiver_id == @user_key AND msg.is_read == false
+        UPDATE msg WITH { is_read: true } IN messages
+        RETURN 1
+)
+
+LET reset = (
+    FOR c IN conversations
+        FILTER c._key == @conversation_key AND c.unread[@user_key] != 0
+        UPDATE c WITH { unread: { [@user_key]: 0 } } IN conversations
+        RETURN 1
+)
+
+RETURN LENGTH(marked)
+"""
+
+GET_PENDING_MATCHES = """
+WITH matches, users
+LET users_who_liked_me = (
+    FOR m IN matches
+        FILTER m.target_user_id == @user_key AND m.liked == true
+        RETURN m.user_id
+)
+
+LET users_i_liked = (
+    FOR m IN matches
+        FILTER m.user_id == @user_key AND m.liked == true
+        RETURN m.target_user_id
+)
+
+// Find users who liked me but I haven't liked back
+LET pending_user_ids = MINUS(users_who_liked_me, users_i_liked)
+
+// Get user info and match percentage for each pending match
+LET pending_matches = (
+    FOR pending_id IN pending_user_ids
+        // Calculate match score for frontend display
+        LET pending_user = DOCUMENT(CONCAT('users/', pending_id))
+
+        // Get the user's skills and goals
+        LET my_skills = (
+            FOR skill IN OUTBOUND CONCAT('users/', @user_key) has_skill
+                RETURN skill._id
+        )
+        LET my_goals = (
+            FOR goal IN OUTBOUND CONCAT('users/', @user_key) wants_to_learn
+                RETURN goal._id
+        )
+        LET other_skills = (
+            FOR skill IN OUTBOUND CONCAT('users/', pending_id) has_skill
+                RETURN skill._id
+        )
+        LET other_goals = (
+            FOR goal IN OUTBOUND CONCAT('users/', pending_id) wants_to_learn
+                RETURN goal._id
+        )
+
+        // Calculate match score
+        LET skill_match = LENGTH(INTERSECTION(my_skills, other_goals))
+        LET goal_match = LENGTH(INTERSECTION(my_goals, other_skills))
+        LET match_score = skill_match + goal_match
+
+        RETURN {
+            user_id: pending_id,
+            username: pending_user.username,
+            match_percentage: CEIL(match_score * 20)
+        }
+)
+
+RETURN pending_matches
+"""
+
+BACKFILL_MUTUAL_MATCHES = """
+FOR m IN matches
+    COLLECT user_id = m.user_id, target_id = m.target_user_id INTO swipes = m
+    FILTER user_id < target_id
+    LET liked = FIRST(FOR s IN swipes SORT s.created_at DESC LIMIT 1 RETURN s.liked)
+    FILTER liked == true
+    LET liked_back = FIRST(
+        FOR r IN matches
+            FILTER r.user_id == target_id AND r.target_user_id == user_id
+            SORT r.created_at DESC
+            LIMIT 1
+            RETURN r.liked
+    )
+    FILTER liked_back == true
+    INSERT {
+        _key: CONCAT(user_id, '_', target_id),
+        _from: CONCAT('users/', user_id),
+        _to: CONCAT('users/', target_id),
+        created_at: DATE_ISO8601(DATE_NOW())
+    } INTO mutual_match OPTIONS { overwriteMode: 'ignore' }
+    RETURN 1
+"""
+
+OPEN_CONVERSATION = """
+UPSERT { _key: @conversation_key }
+    INSERT {
+        _key: @conversation_key,
+        participants: @participants,
+        message_count: 0,
+        unread: {},
+        last_message: null,
+        last_at: null,
+        active: true
+    }
+    UPDATE { active: true }
+    IN conversations
+"""
+
+CLOSE_CONVERSATION = """
+FOR c IN conversations
+    FILTER c._key == @conversation_key
+    UPDATE c WITH { active: false } IN conversations
+"""
+
+SEND_MESSAGE = """
+LET conversation = DOCUMENT('conversations', @conversation_key)
+FILTER conversation == null OR conversation.message_count < @max_messages
+INSERT @message INTO messages
+LET msg = NEW
+UPSERT { _key: @conversation_key }
+    INSERT {
+        _key: @conversation_key,
+        participants: @participants,
+        message_count: 1,
+        unread: { [@receiver_id]: 1 },
+        last_message: msg.text,
+        last_at: msg.created_at,
+        last_key: msg._key,
+        active: true
+    }
+    UPDATE {
+        message_count: OLD.message_count + 1,
+        unread: MERGE(OLD.unread, { [@receiver_id]: (OLD.unread[@receiver_id] || 0) + 1 }),
+        last_message: msg.text,
+        last_at: msg.created_at,
+        last_key: msg._key
+    }
+    IN conversations
+RETURN msg
+"""
+
+BACKFILL_CONVERSATIONS = """
+FOR e IN mutual_match
+    LET a = PARSE_IDENTIFIER(e._from).key
+    LET b = PARSE_IDENTIFIER(e._to).key
+    LET msgs = (
+        FOR msg IN messages
+            FILTER (msg.sender_id == a AND msg.receiver_id == b) OR
+                   (msg.sender_id == b AND msg.receiver_id == a)
+            SORT msg.created_at ASC
+            RETURN msg
+    )
+    LET last = LAST(msgs)
+    LET summary = {
+        _key: e._key,
+        participants: [a, b],
+        message_count: LENGTH(msgs),
+        unread: {
+            [a]: LENGTH(FOR msg IN msgs FILTER msg.receiver_id == a AND msg.is_read == false RETURN 1),
+            [b]: LENGTH(FOR msg IN msgs FILTER msg.receiver_id == b AND msg.is_read == false RETURN 1)
+        },
+        last_message: last.text,
+        last_at: last.created_at,
+        last_key: last._key,
+        active: true
+    }
+    UPSERT { _key: e._key } INSERT summary REPLACE summary IN conversations
+    RETURN 1
+"""
+
+GET_DASHBOARD = """
+WITH users, skills, has_skill, wants_to_learn, matches, conversations
+// Computed once and shared by every section below
+LET my_skills = (
+    FOR skill IN OUTBOUND CONCAT('users/', @user_key) has_skill
+        RETURN skill._id
+)
+LET my_goals = (
+    FOR goal IN OUTBOUND CONCAT('users/', @user_key) wants_to_learn
+        RETURN goal._id
+)
+
+LET mutual_matches = (
+    FOR c IN conversations
+        FILTER @user_key IN c.participants[*] AND c.active == true
+        LET user_id = FIRST(REMOVE_VALUE(c.participants, @user_key))
+        LET user = DOCUMENT('users', user_id)
+        RETURN {
+            id: user_id,
+            username: user.username,
+            last_message: c.last_message,
+            message_count: c.message_count,
+            unread_count: c.unread[@user_key] || 0,
+            max_messages: 5  // Message limit for MVP
+        }
+)
+
+LET users_who_liked_me = (
+    FOR m IN matches
+        FILTER m.target_user_id == @user_key AND m.liked == true
+        RETURN m.user_id
+)
+LET users_i_liked = (
+    FOR m IN matches
+        FILTER m.user_id == @user_key AND m.liked == true
+        RETURN m.target_user_id
+)
+LET pending_matches = (
+    FOR pending_id IN MINUS(users_who_liked_me, users_i_liked)
+        LET pending_user = DOCUMENT(CONCAT('users/', pending_id))
+        LET other_skills = (
+            FOR skill IN OUTBOUND CONCAT('users/', pending_id) has_skill
+                RETURN skill._id
+        )
+        LET other_goals = (
+            FOR goal IN OUTBOUND CONCAT('users/', pending_id) wants_to_learn
+                RETURN goal._id
+        )
+        LET match_score = LENGTH(INTERSECTION(my_skills, other_goals)) +
+                          LENGTH(INTERSECTION(my_goals, other_skills))
+        RETURN {
+            user_id: pending_id,
+            username: pending_user.username,
+            match_percentage: CEIL(match_score * 20)
+        }
+)
+
+RETURN {
+    matches: mutual_matches,
+    pending_matches: pending_matches,
+    precomputed: DOCUMENT('match_candidates', @user_key),
+    feed: DOCUMENT('candidate_feeds', @user_key)
+}
+"""
+
+GET_SIMILAR_USERS = """
+WITH users
+FOR other, e IN 1..1 OUTBOUND CONCAT('users/', @user_key) user_similarity
+    SORT e.similarity DESC, other._key
+    LIMIT @limit
+    RETURN { user_id: other._key, similarity: e.similarity }
+"""
+
+GET_SWIPED_USER_IDS = """
+FOR m IN matches
+    FILTER m.user_id == @user_key
+    RETURN DISTINCT m.target_user_id
+"""
+
+FIND_UNLINKED_MUTUAL_LIKES = """
+FOR p IN @like_pairs
+    FILTER DOCUMENT('matches', p.reverse_key).liked == true
+    FILTER DOCUMENT('mutual_match', p.pair_key) == null
+    RETURN {user: p.user, target: p.target}
+"""
+
+UNLINK_MUTUAL_MATCHES = """
+FOR pair_key IN @pair_keys
+    REMOVE pair_key IN mutual_match OPTIONS { ignoreErrors: true }
+    RETURN OLD
+"""
+
+LIST_SWIPERS = """
+FOR m IN matches
+    RETURN DISTINCT m.user_id
+"""
+
+# Swipes of @user_keys that aren't stored once under their deterministic
+# key yet: the latest decision per target and the keys to delete
+FIND_UNCOMPACTED_SWIPES = """
+FOR m IN matches
+    FILTER m.user_id IN @user_keys
+    COLLECT user_id = m.user_id, target_user_id = m.target_user_id INTO swipes = m
+    LET key = CONCAT(user_id, '_', target_user_id)
+    FILTER LENGTH(swipes) > 1 OR swipes[0]._key != key
+    // COLLECT doesn't keep any order within a group
+    LET latest = FIRST(FOR s IN swipes SORT s.created_at DESC LIMIT 1 RETURN s)
+    RETURN {
+        swipe: MERGE(UNSET(latest, '_id', '_rev', 'rejected_at'), {_key: key}, latest.liked ? {} : {
+            rejected_at: HAS(latest, 'rejected_at') ? latest.rejected_at : FLOOR(DATE_TIMESTAMP(latest.created_at) / 1000)
+        }),
+        stale: swipes[* FILTER CURRENT._key != key]._key
+    }
+"""
+
+FIND_FEEDS_WITH_CANDIDATE = """
+FOR f IN candidate_feeds
+    FILTER @user_key IN f.ids[*]
+    RETURN f
+"""
+
+LOAD_SKILL_CATALOG = """
+FOR skill IN skills
+    RETURN {
+        id: skill._key,
+        name: skill.name,
+        category: skill.category,
+        aliases: skill.aliases
+    }
+"""
+
+LIST_SKILLS = """
+FOR skill IN skills
+    SORT skill.name
+    RETURN {
+        id: skill._key,
+        name: skill.name,
+        category: skill.category
+    }
+"""
@@ -0,0 +1,389 @@
+import os
+import re
+import sys
+import logging
+import argparse
+from arango import ArangoClient
+from arango.exceptions import DocumentGetError
+from dotenv import load_dotenv
+import queries
+import conversations
+import feeds
+import mutual_matches
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever COLLECTIONS, EDGE_DEFINITIONS or INDEXES change so deployed
+# databases get re-checked
+SCHEMA_VERSION = 7
+
+SCHEMA_COLLECTION = 'schema_meta'
+SCHEMA_MARKER = 'indexes'
+
+GRAPH = 'skill_graph'
+
+# Document collections outside the graph
+COLLECTIONS = [
+    'users',
+    'skills',
+    'matches',
+    'messages',
+    'match_candidates',
+    conversations.COLLECTION,
+    feeds.COLLECTION,
+    SCHEMA_COLLECTION,
+]
+
+# (edge collection, from, to) in skill_graph; user_similarity is filled in by similarity_scorer.py
+EDGE_DEFINITIONS = [
+    ('has_skill', 'users', 'skills'),
+    ('wants_to_learn', 'users', 'skills'),
+    (mutual_matches.EDGE_COLLECTION, 'users', 'users'),
+    ('user_similarity', 'users', 'users'),
+]
+
+# (collection, fields, unique)
+INDEXES = [
+    ('matches', ['user_id', 'target_user_id', 'liked'], False),
+    ('matches', ['target_user_id', 'liked'], False),
+    ('messages', ['sender_id', 'receiver_id', 'created_at'], False),
+    ('users', ['username'], True),
+    ('conversations', ['participants[*]'], False),
+    ('candidate_feeds', ['ids[*]'], False),
+    # One edge per user and skill, so batch edits can UPSERT on it
+    ('has_skill', ['_from', '_to'], True),
+    ('wants_to_learn', ['_from', '_to'], True),
+]
+
+# Rejected swipes expire this long after they're made, so those users can
+# come up again; likes are kept
+REJECTION_TTL_DAYS = int(os.getenv('REJECTION_TTL_DAYS', 30))
+
+# (collection, field, seconds after the field's timestamp)
+TTL_INDEXES = [
+    ('matches', 'rejected_at', REJECTION_TTL_DAYS * 86400),
+]
+
+
+# Keeps the first of each set of parallel edges, so a unique (_from, _to) index can be built
+DEDUPE_EDGES = """
+LET removed = (
+    FOR e IN @@edges
+        COLLECT from = e._from, to = e._to INTO group = e
+        FILTER LENGTH(group) > 1
+        FOR duplicate IN SLICE(group, 1)
+            REMOVE duplicate IN @@edges
+            RETURN 1
+)
+RETURN LENGTH(removed)
+"""
+
+
+def read_marker(db):
+    """The version marker written by ensure_indexes(), or None."""
+    try:
+        return db.collection(SCHEMA_COLLECTION).get(SCHEMA_MARKER)
+    except DocumentGetError:
+        return None
+
+
+def is_current(db, marker=None):
+    """One round-trip check of the version marker written by ensure_indexes().
+
+    False if the database or marker doesn't exist yet, or is from an older
+    SCHEMA_VERSION or TTL configuration. Indexes the marker lists as missing
+    don't make it stale; they're reported by bootstrap() instead of being
+    retried by every worker.
+    """
+    marker = marker or read_marker(db)
+    return bool(marker) and marker.get('version') == SCHEMA_VERSION and marker.get('ttl') == ttl_settings()
+
+
+def ensure_database(sys_db, name):
+    if not sys_db.has_database(name):
+        logger.info(f"Database {name} not found, creating it...")
+        sys_db.create_database(name)
+        logger.info(f"Database {name} created successfully")
+
+
+def ensure_collections(db):
+    """Create missing collections, the skill graph and its edge definitions."""
+    for name in COLLECTIONS:
+        if not db.has_collection(name):
+            db.create_collection(name)
+            logger.info(f"Created '{name}' collection")
+
+    if db.has_graph(GRAPH):
+        graph = db.graph(GRAPH)
+    else:
+        graph = db.create_graph(GRAPH)
+        logger.info(f"Created '{GRAPH}' graph")
+
+    for edge_collection, from_collection, to_collection in EDGE_DEFINITIONS:
+        if not graph.has_edge_definition(edge_collection):
+            graph.create_edge_definition(
+                edge_collection=edge_collection,
+                from_vertex_collections=[from_collection],
+                to_vertex_collections=[to_collection]
+            )
+            logger.info(f"Created '{edge_collection}' edge definition")
+    return graph
+
+
+def index_name(collection, fields, unique):
+    prefix = 'uniq' if unique else 'idx'
+    return f"{prefix}_{collection}_{'_'.join(field.replace('[*]', '') for field in fields)}"
+
+
+def missing_indexes(db):
+    """Return the INDEXES entries that don't exist as persistent indexes yet."""
+    existing = {}
+    missing = []
+    for collection, fields, unique in INDEXES:
+        if collection not in existing:
+            if not db.has_collection(collection):
+                existing[collection] = []
+            else:
+                existing[collection] = [
+                    (index['fields'], bool(index.get('unique')))
+                    for index in db.collection(collection).indexes()
+                    if index['type'] in ('persistent', 'hash', 'skiplist')
+                ]
+        if (fields, unique) not in existing[collection]:
+            missing.append((collection, fields, unique))
+    return missing
+
+
+def ttl_settings():
+    return {f"{collection}.{field}": expire_after for collection, field, expire_after in TTL_INDEXES}
+
+
+def missing_ttl_indexes(db):
+    """Return the TTL_INDEXES entries that don't exist with the configured expiry."""
+    missing = []
+    for collection, field, expire_after in TTL_INDEXES:
+        existing = []
+        if db.has_collection(collection):
+            existing = [
+                index.get('expiry_time') for index in db.collection(collection).indexes()
+                if index['type'] == 'ttl' and index['fields'] == [field]
+            ]
+        if expire_after not in existing:
+            missing.append((collection, field, expire_after))
+    return missing
+
+
+def ensure_ttl_indexes(db):
+    """Create missing TTL indexes, replacing any on the same field with another expiry."""
+    still_missing = []
+    for collection, field, expire_after in missing_ttl_indexes(db):
+        name = f"ttl_{collection}_{field}"
+        if not db.has_collection(collection):
+            db.create_collection(collection)
+        try:
+            # A collection can only have one TTL index
+            for index in db.collection(collection).indexes():
+                if index['type'] == 'ttl':
+                    db.collection(collection).delete_index(index['id'])
+            db.collection(collection).add_ttl_index(
+                fields=[field], expiry_time=expire_after, name=name, in_background=True
+            )
+            logger.info(f"Created TTL index {name} on {collection}({field}), expiring after {expire_after}s")
+        except Exception as e:
+            logger.error(f"Could not create TTL index {name}: {e}")
+            still_missing.append((collection, [field], False))
+    return still_missing
+
+
+def ensure_indexes(db):
+    """Create missing indexes and record the schema version.
+
+    Returns the indexes that are still missing afterwards (e.g. a unique
+    index that can't be built because of duplicate data).
+    """
+    still_missing = []
+    for collection, fields, unique in missing_indexes(db):
+        name = index_name(collection, fields, unique)
+        if not db.has_collection(collection):
+            db.create_collection(collection)
+        try:
+            db.collection(collection).add_persistent_index(
+                fields=fields, unique=unique, name=name, in_background=True
+            )
+            logger.info(f"Created index {name} on {collection}({', '.join(fields)})")
+        except Exception as e:
+            logger.error(f"Could not create index {name}: {e}")
+            still_missing.append((collection, fields, unique))
+    still_missing += ensure_ttl_indexes(db)
+
+    if not db.has_collection(SCHEMA_COLLECTION):
+        db.create_collection(SCHEMA_COLLECTION)
+    db.collection(SCHEMA_COLLECTION).insert(
+        {
+            '_key': SCHEMA_MARKER, 'version': SCHEMA_VERSION, 'ttl': ttl_settings(),
+            'missing': [[collection, fields, unique] for collection, fields, unique in still_missing]
+        },
+        overwrite=True
+    )
+    return still_missing
+
+
+def report_missing(missing):
+    for collection, fields, unique in missing:
+        hint = "queries on it will fall back to full collection scans"
+        if unique and fields == ['_from', '_to']:
+            hint = "run `python schema.py dedupe-edges` to remove the duplicate edges and build it"
+        logger.warning(
+            f"Missing {'unique ' if unique else ''}index on {collection}({', '.join(fields)}); {hint}"
+        )
+
+
+def bootstrap(db, sys_db=None, force=False):
+    """Startup hook: bring collections and indexes up to date and report anything missing.
+
+    A database whose marker is current costs a single round-trip, even if
+    it records indexes that couldn't be built; those are reported again
+    and left for `python schema.py apply` or `dedupe-edges`. sys_db, if
+    given, is used to create the database itself when it doesn't exist.
+    """
+    marker = read_marker(db)
+    if not force and is_current(db, marker):
+        missing = [tuple(entry) for entry in marker.get('missing') or []]
+        report_missing(missing)
+        logger.info(f"Schema version {SCHEMA_VERSION} is current")
+        return missing
+    if sys_db is not None:
+        ensure_database(sys_db, db.name)
+    ensure_collections(db)
+    missing = ensure_indexes(db)
+    report_missing(missing)
+    if not missing:
+        logger.info(f"Schema version {SCHEMA_VERSION}: all indexes present")
+    return missing
+
+
+def dedupe_edges(db):
+    """Remove parallel edges from collections that need a unique (_from, _to) index.
+
+    Returns {collection: edges removed}.
+    """
+    removed = {}
+    for collection, fields, unique in INDEXES:
+        if unique and fields == ['_from', '_to'] and db.has_collection(collection):
+            removed[collection] = next(db.aql.execute(DEDUPE_EDGES, bind_vars={'@edges': collection}))
+    return removed
+
+
+def app_queries():
+    return {
+        name: value for name, value in vars(queries).items()
+        if name.isupper() and isinstance(value, str)
+    }
+
+
+def sample_bind_vars(aql):
+    """Placeholder values for every bind parameter so a statement can be explained."""
+    bind_vars = {}
+    for name in re.findall(r'(?<![@\w])@(\w+)', aql):
+        # @user_doc -> 'users/0', @skill_docs -> ['skills/0'], @pair_keys -> ['0'],
+        # @like_pairs -> [{}], @limit -> 1, anything else a key
+        if name.endswith('_doc'):
+            bind_vars[name] = f"{name[:-4]}s/0"
+        elif name.endswith('_docs'):
+            bind_vars[name] = [f"{name[:-5]}s/0"]
+        elif name.endswith('_keys'):
+            bind_vars[name] = ['0']
+        elif name.endswith('_pairs'):
+            bind_vars[name] = [{}]
+        elif name == 'limit':
+            bind_vars[name] = 1
+        else:
+            bind_vars[name] = '0'
+    return bind_vars
+
+
+def explain_all(db, out=sys.stdout):
+    """Print the execution plan of every AQL statement in queries.py.
+
+    Returns the names of statements whose plan contains a full collection scan.
+    """
+    full_scans = []
+    for name, aql in sorted(app_queries().items()):
+        plan = db.aql.explain(aql, bind_vars=sample_bind_vars(aql))
+        nodes = plan.get('nodes', [])
+
+        print(f"== {name} (estimated cost {plan.get('estimatedCost', 0):.1f})", file=out)
+        for node in nodes:
+            detail = ''
+            if node['type'] == 'IndexNode':
+                detail = ', '.join(
+                    f"{index['type']}({', '.join(index['fields'])})" for index in node.get('indexes', [])
+                )
+            elif node['type'] in ('EnumerateCollectionNode', 'TraversalNode'):
+                detail = node.get('collection', '') or ', '.join(
+                    edge.get('name', '') if isinstance(edge, dict) else str(edge)
+                    for edge in node.get('edgeCollections', [])
+                )
+            print(f"   {node['type']:<28} {detail}", file=out)
+
+        scans = [node.get('collection') for node in nodes if node['type'] == 'EnumerateCollectionNode']
+        if scans:
+            full_scans.append(name)
+            print(f"   !! full collection scan on {', '.join(scans)}", file=out)
+        print(file=out)
+    return full_scans
+
+
+def connect():
+    load_dotenv()
+    client = ArangoClient(hosts=os.getenv("ARANGO_URL"))
+    return client.db(
+        os.getenv("ARANGO_DB_NAME"),
+        username=os.getenv("ARANGO_USERNAME"),
+        password=os.getenv("ARANGO_PASSWORD")
+    )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="KnowZ schema bootstrap and query plan checks")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('check', help="List missing indexes")
+    sub.add_parser('apply', help="Create missing indexes")
+    sub.add_parser('dedupe-edges', help="Remove duplicate skill edges, then create missing indexes")
+    explain = sub.add_parser('explain', help="Print the query plan of every AQL statement")
+    explain.add_argument('--fail-on-scan', action='store_true',
+                         help="Exit non-zero if any statement does a full collection scan")
+    args = parser.parse_args()
+
+    db = connect()
+
+    if args.command == 'check':
+        missing = missing_indexes(db)
+        for collection, fields, unique in missing:
+            print(f"missing: {index_name(collection, fields, unique)} on {collection}({', '.join(fields)})")
+        missing_ttl = missing_ttl_indexes(db)
+        for collection, field, expire_after in missing_ttl:
+            print(f"missing: ttl_{collection}_{field} on {collection}({field}), expiring after {expire_after}s")
+        missing += missing_ttl
+        if not missing:
+            print(f"Schema version {SCHEMA_VERSION}: all indexes present")
+        return 1 if missing else 0
+
+    if args.command == 'apply':
+        return 1 if bootstrap(db, force=True) else 0
+
+    if args.command == 'dedupe-edges':
+        for collection, count in dedupe_edges(db).items():
+            print(f"Removed {count} duplicate edges from {collection}")
+        return 1 if bootstrap(db, force=True) else 0
+
+    full_scans = explain_all(db)
+    if full_scans:
+        print(f"{len(full_scans)} statement(s) with full collection scans: {', '.join(full_scans)}")
+    return 1 if full_scans and args.fail_on_scan else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import queries
+
+
+class SeenSets:
+    """LRU cache of the user keys each user has already swiped on.
+
+    Loaded with one query on the matches(user_id, ...) index and kept up to
+    date by record_swipe in this process. Entries expire after ttl_seconds so
+    swipes handled by other workers are picked up. pending, if set, returns
+    the swipes this process has made but not written yet (see
+    SwipeIngest.pending_targets); they're merged into every set loaded from
+    the database, which can't see them.
+    """
+
+    def __init__(self, max_users=None, ttl_seconds=None):
+        self.max_users = max_users or int(os.getenv('SEEN_SET_CACHE_USERS', 10000))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else \
+            int(os.getenv('SEEN_SET_TTL_SECONDS', 60))
+        self.pending = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def cached(self, user_key):
+        """The cached seen-set, or None if it's missing or expired."""
+        with self._lock:
+            entry = self._cache.get(user_key)
+            if entry is None or time.time() - entry[0] > self.ttl_seconds:
+                return None
+            self._cache.move_to_end(user_key)
+            return entry[1]
+
+    def unwritten(self, user_key):
+        return self.pending(user_key) if self.pending else frozenset()
+
+    def store(self, user_key, target_keys, pending=frozenset()):
+        # Swipes written while the query ran may be missing from both
+        # target_keys and the pending set read after it, so the caller passes
+        # the pending set it read beforehand too
+        seen = frozenset(target_keys) | pending | self.unwritten(user_key)
+        with self._lock:
+            self._cache[user_key] = (time.time(), seen)
+            self._cache.move_to_end(user_key)
+            while len(self._cache) > self.max_users:
+                self._cache.popitem(last=False)
+        return seen
+
+    def get(self, db, user_key):
+        seen = self.cached(user_key)
+        if seen is None:
+            pending = self.unwritten(user_key)
+            seen = self.store(user_key, db.aql.execute(
+                queries.GET_SWIPED_USER_IDS,
+                bind_vars={'user_key': user_key},
+                batch_size=10000,
+                stream=True
+            ), pending)
+        return seen
+
+    def add(self, user_key, target_key):
+        # Sets are replaced rather than mutated, so readers never see one change
+        with self._lock:
+            entry = self._cache.get(user_key)
+            if entry is not None:
+                self._cache[user_key] = (entry[0], entry[1] | {target_key})
+
+    def discard(self, user_key):
+        with self._lock:
+            self._cache.pop(user_key, None)
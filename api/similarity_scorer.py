@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import numpy as np
+from scipy import sparse
+from arango import ArangoClient
+from dotenv import load_dotenv
+from batch_scorer import load_matrices
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+EDGE_COLLECTION = 'user_similarity'
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def minhash_signatures(features, num_perm=64, seed=1, chunk_size=10000):
+    """MinHash signature of every row's feature set, shape (users, num_perm).
+
+    Uses the universal hashes h(x) = (a*x + b) mod p; rows without features
+    keep the sentinel p in every position.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+    b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+
+    signatures = np.full((features.shape[0], num_perm), MERSENNE_PRIME, dtype=np.int64)
+    for start in range(0, features.shape[0], chunk_size):
+        block = features[start:start + chunk_size]
+        if block.nnz == 0:
+            continue
+        hashes = (np.outer(block.indices.astype(np.int64), a) + b) % MERSENNE_PRIME
+        nonempty = np.diff(block.indptr) > 0
+        signatures[start:start + block.shape[0]][nonempty] = np.minimum.reduceat(
+            hashes, block.indptr[:-1][nonempty], axis=0
+        )
+    return signatures
+
+
+def candidate_pairs(signatures, active, bands=16, max_bucket=1000, seed=1):
+    """Row pairs that share at least one LSH band, as (low, high) index arrays.
+
+    Buckets larger than max_bucket (very common skill combinations) are
+    skipped rather than expanded quadratically.
+    """
+    num_perm = signatures.shape[1]
+    rows_per_band = num_perm // bands
+    mixer = np.random.default_rng(seed).integers(1, MERSENNE_PRIME, size=rows_per_band, dtype=np.int64)
+    active_rows = np.flatnonzero(active)
+    n = signatures.shape[0]
+
+    codes = []
+    skipped = 0
+    for band in range(bands):
+        band_rows = signatures[active_rows, band * rows_per_band:(band + 1) * rows_per_band]
+        # Overflow just wraps; collisions are weeded out by the exact Jaccard
+        band_hash = (band_rows * mixer).sum(axis=1)
+        order = np.argsort(band_hash, kind='stable')
+        sorted_hash = band_hash[order]
+        bounds = np.flatnonzero(np.diff(sorted_hash)) + 1
+        for group in np.split(order, bounds):
+            if len(group) < 2:
+                continue
+            if len(group) > max_bucket:
+                skipped += 1
+                continue
+            members = np.sort(active_rows[group])
+            low, high = np.triu_indices(len(members), 1)
+            codes.append(members[low] * n + members[high])
+
+    if skipped:
+        logger.warning(f"Skipped {skipped} LSH buckets larger than {max_bucket} users")
+    if not codes:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty
+    unique = np.unique(np.concatenate(codes))
+    return unique // n, unique % n
+
+
+def jaccard(features, left, right, chunk_size=100000):
+    sizes = np.diff(features.indptr)
+    similarity = np.empty(len(left), dtype=np.float64)
+    for start in range(0, len(left), chunk_size):
+        i, j = left[start:start + chunk_size], right[start:start + chunk_size]
+        overlap = np.asarray(features[i].multiply(features[j]).sum(axis=1)).ravel()
+        similarity[start:start + len(i)] = overlap / (sizes[i] + sizes[j] - overlap)
+    return similarity
+
+
+def top_k_neighbours(left, right, similarity, top_k):
+    """Keep each user's top_k most similar users, both directions of every pair."""
+    src = np.concatenate([left, right])
+    dst = np.concatenate([right, left])
+    sims = np.concatenate([similarity, similarity])
+
+    order = np.lexsort((dst, -sims, src))
+    src, dst, sims = src[order], dst[order], sims[order]
+    if len(src) == 0:
+        return src, dst, sims
+    starts = np.r_[0, np.flatnonzero(np.diff(src)) + 1]
+    rank = np.arange(len(src)) - np.repeat(starts, np.diff(np.r_[starts, len(src)]))
+    keep = rank < top_k
+    return src[keep], dst[keep], sims[keep]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute top-K user_similarity edges with MinHash LSH")
+    parser.add_argument('--top-k', type=int, default=int(os.getenv('SIMILAR_USERS_TOP_K', 20)))
+    parser.add_argument('--num-perm', type=int, default=64, help="MinHash permutations")
+    parser.add_argument('--bands', type=int, default=16, help="LSH bands; must divide --num-perm")
+    parser.add_argument('--min-similarity', type=float, default=0.1, help="Drop pairs below this Jaccard")
+    parser.add_argument('--max-bucket', type=int, default=1000, help="Skip LSH buckets with more users")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--write-batch', type=int, default=1000, help="Edges per import_bulk call")
+    args = parser.parse_args()
+
+    if args.num_perm % args.bands:
+        parser.error("--bands must divide --num-perm")
+
+    client = ArangoClient(hosts=os.getenv("ARANGO_URL"))
+    db = client.db(
+        os.getenv("ARANGO_DB_NAME"),
+        username=os.getenv("ARANGO_USERNAME"),
+        password=os.getenv("ARANGO_PASSWORD")
+    )
+
+    graph = db.graph('skill_graph')
+    if not graph.has_edge_definition(EDGE_COLLECTION):
+        graph.create_edge_definition(
+            edge_collection=EDGE_COLLECTION,
+            from_vertex_collections=['users'],
+            to_vertex_collections=['users']
+        )
+    edges = graph.edge_collection(EDGE_COLLECTION)
+
+    started = time.time()
+    user_keys, _, _, teach, learn = load_matrices(db)
+    # Teaching and learning the same skill are different features
+    features = sparse.hstack([teach, learn], format='csr')
+    active = np.diff(features.indptr) > 0
+    logger.info(f"Loaded {features.shape[0]} users ({int(active.sum())} with skills) in {time.time() - started:.1f}s")
+
+    signatures = minhash_signatures(features, num_perm=args.num_perm, seed=args.seed)
+    left, right = candidate_pairs(signatures, active, bands=args.bands, max_bucket=args.max_bucket, seed=args.seed)
+    similarity = jaccard(features, left, right)
+    keep = similarity >= args.min_similarity
+    logger.info(f"{len(left)} candidate pairs, {int(keep.sum())} at or above {args.min_similarity}")
+
+    src, dst, sims = top_k_neighbours(left[keep], right[keep], similarity[keep], args.top_k)
+
+    computed_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    written = 0
+    for start in range(0, len(src), args.write_batch):
+        batch = [
+            {
+                '_key': f"{user_keys[s]}-{user_keys[d]}",
+                '_from': f"users/{user_keys[s]}",
+                '_to': f"users/{user_keys[d]}",
+                'similarity': round(float(sim), 4),
+                'computed_at': computed_at
+            }
+            for s, d, sim in zip(src[start:start + args.write_batch],
+                                 dst[start:start + args.write_batch],
+                                 sims[start:start + args.write_batch])
+        ]
+        edges.import_bulk(batch, on_duplicate='replace')
+        written += len(batch)
+
+    # Drop edges that fell out of a user's top K (or belong to deleted users)
+    db.aql.execute(
+        f"""
+        FOR e IN {EDGE_COLLECTION}
+            FILTER e.computed_at != @computed_at
+            REMOVE e IN {EDGE_COLLECTION}
+        """,
+        bind_vars={'computed_at': computed_at}
+    )
+
+    logger.info(f"Wrote {written} {EDGE_COLLECTION} edges in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import os
+import re
+import time
+import logging
+import threading
+import queries
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'skills'
+
+# How often the collection revision is checked for writes from other workers
+RELOAD_CHECK_SECONDS = int(os.getenv('SKILL_CATALOG_CHECK_SECONDS', 30))
+
+SUGGEST_LIMIT = 20
+
+# Common shorthands, normalized -> canonical key. Skill documents can add
+# their own through an ``aliases`` array.
+ALIASES = {
+    'js': 'javascript',
+    'ts': 'typescript',
+    'py': 'python',
+    'golang': 'go',
+    'cpp': 'c++',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vue': 'vue.js',
+    'vuejs': 'vue.js',
+    'node': 'node.js',
+    'nodejs': 'node.js',
+    'express': 'express.js',
+    'postgres': 'postgresql',
+    'mongo': 'mongodb',
+    'k8s': 'kubernetes',
+    'ml': 'machine_learning',
+    'dl': 'deep_learning',
+    'nlp': 'natural_language_processing',
+    'cv': 'computer_vision',
+    'ux': 'ux_design',
+    'ui': 'ui_design',
+    'pm': 'project_management',
+    'rest': 'rest_api',
+    'tf': 'tensorflow',
+}
+
+_ALIASES_BY_KEY = {}
+for _alias, _key in ALIASES.items():
+    _ALIASES_BY_KEY.setdefault(_key, []).append(_alias)
+
+# Characters ArangoDB accepts in a document _key
+_INVALID_KEY_CHARS = re.compile(r"[^A-Za-z0-9_\-:.@()+,=;$!*'%]")
+
+
+def normalize(name):
+    """Document key for a skill name: lowercased, words joined by underscores.
+
+    Matches the keys the app has always derived with
+    ``name.replace(" ", "_").lower()``, except that runs of whitespace
+    collapse and characters that aren't valid in a key become underscores.
+    """
+    return _INVALID_KEY_CHARS.sub('_', '_'.join(name.lower().split()))
+
+
+class SkillCatalog:
+    """Every skill document held in memory, with aliases and prefix suggestions.
+
+    Resolving a name to a key costs no database round-trip. The catalog
+    reloads itself when the collection's revision changes, which picks up
+    skills created by other workers.
+    """
+
+    def __init__(self, check_seconds=RELOAD_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self._lock = threading.RLock()
+        self.revision = None
+        self.checked_at = 0
+        self._reset()
+
+    def _reset(self):
+        self.skills = {}
+        self.lookup = dict(ALIASES)
+        self.trie = {}
+
+    def load(self, db):
+        started = time.time()
+        revision = db.collection(COLLECTION).revision()
+        rows = list(db.aql.execute(queries.LOAD_SKILL_CATALOG, batch_size=10000, stream=True))
+        with self._lock:
+            self._reset()
+            for skill in rows:
+                self._add(skill)
+            self.revision = revision
+            self.checked_at = time.time()
+        logger.info(f"Skill catalog loaded {len(rows)} skills in {time.time() - started:.2f}s")
+
+    def ensure_fresh(self, db):
+        if time.time() - self.checked_at < self.check_seconds:
+            return
+        self.checked_at = time.time()
+        if db.collection(COLLECTION).revision() != self.revision:
+            self.load(db)
+
+    def _add(self, skill):
+        key = skill['id']
+        self.skills[key] = skill
+        self.lookup[key] = key
+        self.lookup.setdefault(normalize(skill['name']), key)
+        aliases = list(skill.get('aliases') or ())
+        for alias in aliases:
+            self.lookup[normalize(alias)] = key
+
+        # Index the whole name, each word and every alias, so "nat" finds
+        # "React Native" and "js" finds "JavaScript"
+        words = skill['name'].lower().split()
+        prefixes = {' '.join(words[i:]) for i in range(len(words))}
+        prefixes.update(alias.lower() for alias in aliases + _ALIASES_BY_KEY.get(key, []))
+        rank = (len(skill['name']), skill['name'].lower())
+        for text in prefixes:
+            node = self.trie
+            for char in text:
+                node = node.setdefault(char, {})
+                # Each node keeps its best SUGGEST_LIMIT keys, so lookups don't walk the subtree
+                top = node.setdefault('', [])
+                if key not in (entry[1] for entry in top):
+                    top.append((rank, key))
+                    top.sort()
+                    del top[SUGGEST_LIMIT:]
+
+    def resolve(self, name):
+        """Key of an existing skill matching name or one of its aliases, else None."""
+        normalized = normalize(name)
+        with self._lock:
+            key = self.lookup.get(normalized)
+            return key if key in self.skills else None
+
+    def get(self, key):
+        with self._lock:
+            return self.skills.get(key)
+
+    def update(self, key, **fields):
+        with self._lock:
+            if key in self.skills:
+                self.skills[key] = dict(self.skills[key], **fields)
+
+    def ensure(self, db, name, category='Technical'):
+        """Resolve name to a skill key, creating the skill if it doesn't exist.
+
+        Returns (key, created). The insert is idempotent, so concurrent
+        requests for the same new skill can't fail or create duplicates;
+        created is True only for the request whose insert wrote the skill.
+        """
+        key = self.resolve(name)
+        if key is not None:
+            return key, False
+
+        key = self.key_for(name)
+        collection = db.collection(COLLECTION)
+        # An ignored insert returns no new document
+        result = collection.insert(self.document(key, name, category), overwrite_mode='ignore', return_new=True)
+        if result.get('new'):
+            self.remember(key, name, category)
+            return key, True
+
+        # Another worker created it first; keep its name, category and aliases
+        existing = collection.get(key)
+        if existing is None:
+            self.remember(key, name, category)
+        else:
+            with self._lock:
+                if key not in self.skills:
+                    self._add({
+                        'id': key, 'name': existing['name'], 'category': existing.get('category'),
+                        'aliases': existing.get('aliases')
+                    })
+        return key, False
+
+    def key_for(self, name):
+        """Key name resolves to, whether or not the skill exists yet."""
+        key = self.resolve(name)
+        if key is None:
+            normalized = normalize(name)
+            # An alias of a skill nobody has created yet becomes that skill
+            key = ALIASES.get(normalized, normalized)
+        return key
+
+    def document(self, key, name, category='Technical'):
+        return {'_key': key, 'name': name.strip(), 'category': category}
+
+    def remember(self, key, name, category='Technical'):
+        """Record a skill inserted by the caller."""
+        with self._lock:
+            if key not in self.skills:
+                self._add({'id': key, 'name': name.strip(), 'category': category})
+
+    def suggest(self, prefix, limit=10):
+        text = ' '.join(prefix.lower().split())
+        with self._lock:
+            node = self.trie
+            for char in text:
+                node = node.get(char)
+                if node is None:
+                    return []
+            keys = [key for _, key in node.get('', [])[:limit]] if text else []
+            return [self.skills[key] for key in keys]
@@ -0,0 +1,324 @@
+import os
+import re
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+import queries
+from instrumentation import metrics
+from mutual_matches import pair_key
+
+logger = logging.getLogger(__name__)
+
+# 0 writes every swipe with its own insert, as before
+SWIPE_WRITE_BEHIND = os.getenv('SWIPE_WRITE_BEHIND', '1').lower() not in ('0', 'false', 'no')
+
+# Swipes waiting to be written; once full, /swipe answers 429
+SWIPE_QUEUE_SIZE = int(os.getenv('SWIPE_QUEUE_SIZE', 10000))
+
+# A group commit is written when it reaches SWIPE_BATCH_SIZE swipes or
+# SWIPE_FLUSH_MS after its first swipe, whichever comes first
+SWIPE_BATCH_SIZE = int(os.getenv('SWIPE_BATCH_SIZE', 500))
+SWIPE_FLUSH_MS = int(os.getenv('SWIPE_FLUSH_MS', 50))
+
+# Batches that can't be written are appended here and replayed on the next start
+SWIPE_SPOOL_PATH = os.getenv('SWIPE_SPOOL_PATH', 'swipe_spool.jsonl')
+
+FLUSH_RETRIES = 3
+ENQUEUE_TIMEOUT_SECONDS = 0.5
+
+
+# Characters ArangoDB allows in a document key; keys are at most 254 bytes
+_VALID_KEY = re.compile(r"[A-Za-z0-9_\-:.@()+,=;$!*'%]+")
+MAX_KEY_LENGTH = 254
+
+
+def is_valid_target(user_key, target_key):
+    """True if target_key can be swiped on: a well-formed key other than user_key whose swipe key fits."""
+    return (
+        isinstance(target_key, str) and target_key != user_key and bool(_VALID_KEY.fullmatch(target_key))
+        and len(swipe_key(user_key, target_key)) <= MAX_KEY_LENGTH
+    )
+
+
+def swipe_key(user_key, target_key):
+    """Deterministic key for user_key's swipe on target_key; a later swipe replaces it."""
+    return f"{user_key}_{target_key}"
+
+
+def swipe_document(user_key, target_key, liked):
+    swipe = {
+        '_key': swipe_key(user_key, target_key),
+        'user_id': user_key,
+        'target_user_id': target_key,
+        'liked': liked,
+        'created_at': datetime.now().isoformat()
+    }
+    if not liked:
+        # Expired by the TTL index in schema.TTL_INDEXES
+        swipe['rejected_at'] = int(time.time())
+    return swipe
+
+
+def rejected_documents(documents, result):
+    """The documents an import_bulk(details=True) call reported as failed."""
+    if not result.get('errors'):
+        return []
+    positions = set()
+    for detail in result.get('details', []):
+        match = re.search(r'at position (\d+)', detail)
+        if match:
+            positions.add(int(match.group(1)))
+    if not positions:
+        # Can't tell which ones failed; rewriting the rest is harmless
+        return list(documents)
+    return [documents[i] for i in sorted(positions) if i < len(documents)]
+
+
+class Backlogged(Exception):
+    """The swipe queue is full; the caller should answer 429."""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Swipe queue is full")
+        self.retry_after = retry_after
+
+
+class SwipeIngest:
+    """Buffers swipe records and writes them to ``matches`` in group commits.
+
+    A background thread drains a bounded queue with import_bulk. After each
+    commit it settles what the request path couldn't see: likes that turned
+    out to be mutual because the other like was still buffered (here or in
+    another worker) are linked through on_mutual, and dislikes remove the
+    pair's mutual_match edge, closing its conversation through on_unlinked.
+    """
+
+    def __init__(self, db=None, on_mutual=None, on_unlinked=None, write_behind=SWIPE_WRITE_BEHIND,
+                 max_queue=SWIPE_QUEUE_SIZE, batch_size=SWIPE_BATCH_SIZE, flush_ms=SWIPE_FLUSH_MS,
+                 spool_path=SWIPE_SPOOL_PATH):
+        self.db = db
+        self.on_mutual = on_mutual
+        self.on_unlinked = on_unlinked
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.spool_path = spool_path
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        # swipe key -> [queued swipes, latest decision]
+        self._pending = {}
+        # user key -> targets with a swipe that isn't written yet
+        self._pending_targets = {}
+        self._closing = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.replay_spool()
+            self._thread = threading.Thread(target=self._run, name='swipe-ingest', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def submit(self, swipe):
+        """Queue a swipe record, or write it now when write-behind is off.
+
+        Raises Backlogged when the queue stays full for ENQUEUE_TIMEOUT_SECONDS.
+        """
+        if not self.write_behind:
+            self.db.collection('matches').insert(swipe, overwrite_mode='replace')
+            return
+
+        with self._lock:
+            entry = self._pending.setdefault(swipe['_key'], [0, swipe['liked']])
+            previous = entry[1]
+            entry[0] += 1
+            entry[1] = swipe['liked']
+            self._pending_targets.setdefault(swipe['user_id'], set()).add(swipe['target_user_id'])
+        try:
+            self._queue.put(swipe, timeout=ENQUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            self._release([swipe], restore=previous)
+            metrics.inc('knowz_swipes_rejected_total', {})
+            raise Backlogged()
+        metrics.set('knowz_swipe_queue_depth', {}, self._queue.qsize())
+
+    def pending(self, user_key, target_key):
+        """user_key's latest decision on target_key if it isn't written yet, else None."""
+        with self._lock:
+            entry = self._pending.get(swipe_key(user_key, target_key))
+            return entry[1] if entry else None
+
+    def pending_targets(self, user_key):
+        """Users user_key has swiped on in swipes that aren't written yet."""
+        with self._lock:
+            return frozenset(self._pending_targets.get(user_key, ()))
+
+    def _release(self, swipes, restore=None):
+        with self._lock:
+            for swipe in swipes:
+                entry = self._pending.get(swipe['_key'])
+                if entry is None:
+                    continue
+                entry[0] -= 1
+                if entry[0] <= 0:
+                    del self._pending[swipe['_key']]
+                    targets = self._pending_targets.get(swipe['user_id'])
+                    if targets is not None:
+                        targets.discard(swipe['target_user_id'])
+                        if not targets:
+                            del self._pending_targets[swipe['user_id']]
+                elif restore is not None:
+                    entry[1] = restore
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self.flush(batch)
+            elif self._closing.is_set():
+                return
+
+    def flush(self, batch, spool_path=None):
+        """Write batch; swipes still failing after FLUSH_RETRIES attempts are spooled to spool_path."""
+        # Only the last swipe on each key needs writing
+        unwritten = list({swipe['_key']: swipe for swipe in batch}.values())
+        for attempt in range(FLUSH_RETRIES):
+            try:
+                result = self.db.collection('matches').import_bulk(
+                    unwritten, on_duplicate='replace', halt_on_error=False, details=True
+                )
+            except Exception as e:
+                logger.error(f"Error writing {len(unwritten)} swipes (attempt {attempt + 1}): {e}")
+            else:
+                rejected = rejected_documents(unwritten, result)
+                if rejected:
+                    logger.error(
+                        f"{len(rejected)} of {len(unwritten)} swipes rejected (attempt {attempt + 1}): "
+                        f"{'; '.join(result.get('details', [])[:3])}"
+                    )
+                unwritten = rejected
+                if not unwritten:
+                    break
+            if attempt + 1 < FLUSH_RETRIES:
+                time.sleep(0.5 * 2 ** attempt)
+
+        if unwritten:
+            metrics.inc('knowz_swipes_failed_total', {}, len(unwritten))
+            self.spool(unwritten, spool_path)
+        failed = {swipe['_key'] for swipe in unwritten}
+        written = [swipe for swipe in batch if swipe['_key'] not in failed]
+        # Spooled swipes stay pending, so this process keeps treating them as
+        # made until a restart replays them
+        self._release(written)
+        metrics.set('knowz_swipe_queue_depth', {}, self._queue.qsize())
+        metrics.observe('knowz_swipe_batch_size', {}, len(batch), buckets=(1, 5, 10, 50, 100, 250, 500, 1000))
+
+        if written:
+            try:
+                self.settle(written)
+            except Exception as e:
+                logger.error(f"Error settling mutual matches for {len(written)} swipes: {e}")
+
+    def settle(self, batch):
+        # The last swipe on each pair in the batch decides whether it's linked or unlinked
+        latest = {}
+        for swipe in batch:
+            latest[swipe['user_id'], swipe['target_user_id']] = swipe['liked']
+
+        # Keyed by pair, so two likes of one pair in the same batch link it once
+        like_pairs = {
+            pair_key(user_key, target_key): {
+                'user': user_key, 'target': target_key,
+                'reverse_key': swipe_key(target_key, user_key), 'pair_key': pair_key(user_key, target_key)
+            }
+            for (user_key, target_key), liked in latest.items() if liked
+        }
+        like_pairs = list(like_pairs.values())
+        if like_pairs and self.on_mutual:
+            for row in self.db.aql.execute(queries.FIND_UNLINKED_MUTUAL_LIKES, bind_vars={'like_pairs': like_pairs}):
+                self.on_mutual(row['user'], row['target'])
+
+        unliked = {
+            pair_key(user_key, target_key): (user_key, target_key)
+            for (user_key, target_key), liked in latest.items() if not liked
+        }
+        if unliked:
+            removed = self.db.aql.execute(queries.UNLINK_MUTUAL_MATCHES, bind_vars={'pair_keys': sorted(unliked)})
+            for edge in removed:
+                if edge and self.on_unlinked:
+                    self.on_unlinked(*unliked[edge['_key']])
+
+    def spool(self, swipes, spool_path=None):
+        spool_path = spool_path or self.spool_path
+        with open(spool_path, 'a') as f:
+            for swipe in swipes:
+                f.write(json.dumps(swipe) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.inc('knowz_swipes_spooled_total', {}, len(swipes))
+        logger.warning(f"Spooled {len(swipes)} swipes to {spool_path}")
+
+    def replay_spool(self):
+        """Write swipes spooled by an earlier process, if any."""
+        # Renaming claims the file, so only one worker replays it
+        claimed = f"{self.spool_path}.{os.getpid()}"
+        try:
+            os.rename(self.spool_path, claimed)
+        except FileNotFoundError:
+            return
+        with open(claimed) as f:
+            swipes = [json.loads(line) for line in f if line.strip()]
+        for swipe in swipes:
+            # Spooled before swipes had deterministic keys
+            swipe.setdefault('_key', swipe_key(swipe['user_id'], swipe['target_user_id']))
+        logger.info(f"Replaying {len(swipes)} spooled swipes")
+        # Swipes the database rejects again are set aside for an operator
+        # rather than replayed on every start
+        for start in range(0, len(swipes), self.batch_size):
+            self.flush(swipes[start:start + self.batch_size], spool_path=f"{self.spool_path}.rejected")
+        os.remove(claimed)
+
+    def stats(self):
+        with self._lock:
+            pending_likes = sum(1 for _, liked in self._pending.values() if liked)
+        return {
+            'write_behind': self.write_behind,
+            'queued': self._queue.qsize(),
+            'queue_limit': self._queue.maxsize,
+            'pending_likes': pending_likes,
+            'batch_size': self.batch_size,
+            'flush_ms': self.flush_ms
+        }
+
+    def close(self, timeout=10):
+        """Flush what's queued; anything that can't be written is spooled."""
+        self._closing.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        remaining = []
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if remaining:
+            self.spool(remaining)
@@ -0,0 +1,178 @@
+import os
+import time
+import socket
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from arango.http import HTTPClient
+from arango.response import Response
+from instrumentation import metrics, record_round_trip
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated coordinator URLs; ARANGO_URL alone means a single server
+ARANGO_COORDINATORS = os.getenv('ARANGO_COORDINATORS', '')
+
+# Request threads per worker (gunicorn --threads); the pool adds a few
+# connections for the feed builder, warm-up and hashing callbacks
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', 16))
+ARANGO_POOL_SIZE = int(os.getenv('ARANGO_POOL_SIZE', WORKER_THREADS + 4))
+
+# 'least_pending' or 'round_robin'
+ARANGO_BALANCE = os.getenv('ARANGO_BALANCE', 'least_pending')
+
+ARANGO_RETRIES = int(os.getenv('ARANGO_RETRIES', 2))
+ARANGO_RETRY_BACKOFF_SECONDS = float(os.getenv('ARANGO_RETRY_BACKOFF_SECONDS', 0.1))
+ARANGO_REQUEST_TIMEOUT = float(os.getenv('ARANGO_REQUEST_TIMEOUT', 60))
+
+# Only these are retried; an AQL POST may have written before the connection dropped
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+RETRY_STATUSES = {502, 503, 504}
+
+
+def coordinator_urls():
+    urls = [url.strip().rstrip('/') for url in ARANGO_COORDINATORS.split(',') if url.strip()]
+    return urls or [os.getenv('ARANGO_URL', 'http://localhost:8529').rstrip('/')]
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose sockets send TCP keep-alives, so idle pooled connections aren't silently dropped."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+class Coordinator:
+    def __init__(self, url, pool_size):
+        self.url = url
+        self.pool_size = pool_size
+        self.slots = threading.BoundedSemaphore(pool_size)
+        self.pending = 0
+        self.in_use = 0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = KeepAliveAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+        metrics.set('knowz_db_pool_size', {'host': url}, pool_size)
+        metrics.set('knowz_db_pool_in_use', {'host': url}, 0)
+
+    def checkout(self):
+        """Wait for a free connection slot and return the time spent waiting."""
+        started = time.perf_counter()
+        self.slots.acquire()
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.in_use += 1
+            metrics.set('knowz_db_pool_in_use', {'host': self.url}, self.in_use)
+        metrics.observe('knowz_db_pool_wait_seconds', {'host': self.url}, waited)
+        return waited
+
+    def checkin(self):
+        with self._lock:
+            self.in_use -= 1
+            metrics.set('knowz_db_pool_in_use', {'host': self.url}, self.in_use)
+        self.slots.release()
+
+
+class PooledHTTPClient(HTTPClient):
+    """python-arango HTTP client with one tuned connection pool per coordinator.
+
+    ArangoClient is given only the first coordinator; each request is routed
+    here to the coordinator with the fewest requests in flight (or in turn,
+    with ARANGO_BALANCE=round_robin). Coordinators forward cursor and
+    transaction requests to the one that owns them, so any of them can
+    serve any request. Idempotent reads are retried on another coordinator
+    after a connection error or a 502/503/504.
+    """
+
+    def __init__(self, hosts=None, pool_size=ARANGO_POOL_SIZE, balance=ARANGO_BALANCE,
+                 retries=ARANGO_RETRIES, request_timeout=ARANGO_REQUEST_TIMEOUT):
+        if balance not in ('least_pending', 'round_robin'):
+            raise ValueError(f"Invalid ARANGO_BALANCE: {balance}")
+        self.hosts = [host.rstrip('/') for host in (hosts or coordinator_urls())]
+        self.balance = balance
+        self.retries = retries
+        self.request_timeout = request_timeout
+        self._lock = threading.Lock()
+        self._next = 0
+        self.coordinators = [Coordinator(host, pool_size) for host in self.hosts]
+
+    @property
+    def primary(self):
+        """The host to pass to ArangoClient."""
+        return self.hosts[0]
+
+    def create_session(self, host):
+        # Requests are routed in send_request; the primary session is what ArangoClient closes
+        return self.coordinators[0].session
+
+    def _choose(self, exclude):
+        with self._lock:
+            candidates = [c for c in self.coordinators if c not in exclude] or self.coordinators
+            if self.balance == 'round_robin':
+                chosen = candidates[self._next % len(candidates)]
+                self._next += 1
+            else:
+                # Rotate the starting point so ties don't all land on the first coordinator
+                start = self._next % len(candidates)
+                self._next += 1
+                rotated = candidates[start:] + candidates[:start]
+                chosen = min(rotated, key=lambda c: c.pending)
+            chosen.pending += 1
+            return chosen
+
+    def _release(self, coordinator):
+        with self._lock:
+            coordinator.pending -= 1
+
+    def send_request(self, session, method, url, headers=None, params=None, data=None, auth=None):
+        method = method.upper()
+        path = url[len(self.primary):] if url.startswith(self.primary) else None
+        attempts = 1 + (self.retries if method in IDEMPOTENT_METHODS else 0)
+        tried = set()
+
+        for attempt in range(attempts):
+            coordinator = self._choose(tried)
+            tried.add(coordinator)
+            target = coordinator.url + path if path is not None else url
+            started = time.perf_counter()
+            try:
+                coordinator.checkout()
+                try:
+                    response = coordinator.session.request(
+                        method, target, params=params, data=data, headers=headers, auth=auth,
+                        timeout=self.request_timeout
+                    )
+                finally:
+                    coordinator.checkin()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt + 1 >= attempts:
+                    raise
+                logger.warning(f"Retrying {method} on another coordinator after {coordinator.url} failed: {e}")
+                metrics.inc('knowz_db_retries_total', {'host': coordinator.url})
+                time.sleep(ARANGO_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                continue
+            finally:
+                self._release(coordinator)
+                record_round_trip(method, time.perf_counter() - started)
+
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                metrics.inc('knowz_db_retries_total', {'host': coordinator.url})
+                time.sleep(ARANGO_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                continue
+
+            return Response(
+                method=method,
+                url=response.url,
+                headers=response.headers,
+                status_code=response.status_code,
+                status_text=response.reason,
+                raw_body=response.text
+            )
@@ -37,27 +37,18 @@ const Dashboard: React.FC = () => {
         return;
       }
 
-      // Get matches (mutual likes)
-      const matchesRes = await axios.get('http://localhost:8088/matches', {
+      // Matches (mutual likes), pending matches (people who liked you) and
+      // potential matches in a single request
+      const dashboardRes = await axios.get('http://localhost:8088/dashboard', {
         headers: { Authorization: `Bearer ${token}` }
       });
 
-      // Get pending matches (people who liked you)
-      const pendingRes = await axios.post('http://localhost:8088/pending-matches', {}, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-
-      // Get potential matches
-      const potentialRes = await axios.post('http://localhost:8088/predict', {}, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-
-      setPendingMatches(pendingRes.data.pending_matches || []);
+      setPendingMatches(dashboardRes.data.pending_matches || []);
       
       setStats({
-        pendingMatches: pendingRes.data.pending_matches?.length || 0,
-        matchCount: matchesRes.data.matches?.length || 0,
-        messageCount: matchesRes.data.matches?.reduce(
+        pendingMatches: dashboardRes.data.pending_matches?.length || 0,
+        matchCount: dashboardRes.data.matches?.length || 0,
+        messageCount: dashboardRes.data.matches?.reduce(
           (sum: number, match: { message_count?: number }) => sum + (match.message_count || 0), 0
         ) || 0
       });
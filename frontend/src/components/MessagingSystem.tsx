@@ -31,22 +31,71 @@ const MessagingSystem: React.FC = () => {
   const [error, setError] = useState<string | null>(null);
   const [sendingMessage, setSendingMessage] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // Position of the newest message we have, so polls only fetch what's new
+  const cursorRef = useRef<string | null>(null);
+  const selectedMatchRef = useRef<string | null>(null);
+  const eventsConnectedRef = useRef(false);
   const navigate = useNavigate();
   const currentUserId = localStorage.getItem('user_id');
 
-  // Poll for new messages every 15 seconds
+  // Poll for new messages every 15 seconds, unless the push channel is connected
   useEffect(() => {
     fetchMatches();
     const interval = setInterval(() => {
-      if (selectedMatch) {
-        fetchMessages(selectedMatch);
+      if (selectedMatchRef.current && !eventsConnectedRef.current) {
+        pollMessages(selectedMatchRef.current);
       }
     }, 15000);
     
     return () => clearInterval(interval);
   }, []); // eslint-disable-line react-hooks/exhaustive-deps
 
+  // Server-sent events for new messages and matches
   useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token || typeof EventSource === 'undefined') return;
+
+    const source = new EventSource(`http://localhost:8088/events?jwt=${encodeURIComponent(token)}`);
+    source.onopen = () => {
+      eventsConnectedRef.current = true;
+    };
+    source.onerror = () => {
+      eventsConnectedRef.current = false;
+    };
+
+    source.addEventListener('message.created', (event) => {
+      const { match_id, message } = JSON.parse((event as MessageEvent).data);
+      if (match_id === selectedMatchRef.current) {
+        pollMessages(match_id);
+      } else {
+        setMatches(prevMatches =>
+          prevMatches.map(match =>
+            match.id === match_id
+              ? {
+                  ...match,
+                  message_count: match.message_count + 1,
+                  last_message: message.text,
+                  unread_count: match.unread_count + (message.senderId !== currentUserId ? 1 : 0)
+                }
+              : match
+          )
+        );
+      }
+    });
+
+    source.addEventListener('match.mutual', () => {
+      fetchMatches();
+    });
+
+    return () => {
+      eventsConnectedRef.current = false;
+      source.close();
+    };
+  }, []); // eslint-disable-line react-hooks/exhaustive-deps
+
+  useEffect(() => {
+    selectedMatchRef.current = selectedMatch;
+    cursorRef.current = null;
     if (selectedMatch) {
       fetchMessages(selectedMatch);
     }
@@ -109,7 +158,9 @@ const MessagingSystem: React.FC = () => {
       
       if (response.data.messages) {
         setMessages(response.data.messages);
+        cursorRef.current = response.data.cursor ?? null;
         console.log(`Loaded ${response.data.messages.length} messages`);
+        markAsRead(matchId);
         
         // Update match username and unread count
         const matchInfo = matches.find(m => m.id === matchId);
@@ -141,6 +192,55 @@ const MessagingSystem: React.FC = () => {
     }
   };
 
+  // Fetch only messages newer than the cursor; the API answers 304 when idle
+  const pollMessages = async (matchId: string) => {
+    if (!cursorRef.current) {
+      return fetchMessages(matchId);
+    }
+    try {
+      const token = localStorage.getItem('token');
+      if (!token) return;
+
+      const response = await axios.get(`http://localhost:8088/messages/${matchId}`, {
+        params: { since: cursorRef.current },
+        headers: {
+          Authorization: `Bearer ${token}`,
+          'If-None-Match': `"${cursorRef.current}"`
+        },
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+      });
+
+      if (response.status === 304 || selectedMatchRef.current !== matchId) return;
+
+      const newMessages: Message[] = response.data.messages || [];
+      cursorRef.current = response.data.cursor ?? cursorRef.current;
+      if (newMessages.length > 0) {
+        setMessages(prev => [
+          ...prev,
+          ...newMessages.filter(msg => !prev.some(existing => existing.id === msg.id))
+        ]);
+        if (newMessages.some(msg => msg.senderId !== currentUserId)) {
+          markAsRead(matchId);
+        }
+      }
+    } catch (err: unknown) {
+      console.error("Error polling messages:", err);
+    }
+  };
+
+  const markAsRead = async (matchId: string) => {
+    try {
+      const token = localStorage.getItem('token');
+      if (!token) return;
+
+      await axios.post(`http://localhost:8088/messages/${matchId}/read`, {}, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+    } catch (err: unknown) {
+      console.error("Error marking messages as read:", err);
+    }
+  };
+
   const handleSendMessage = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!newMessage.trim() || !selectedMatch) return;
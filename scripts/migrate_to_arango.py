@@ -1,7 +1,13 @@
 import os
 import sys
+import json
+import time
+import hashlib
 import logging
-import networkx as nx
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from arango import ArangoClient
 from dotenv import load_dotenv
 from tqdm import tqdm
@@ -20,140 +26,402 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv("../api/.env")
 
+GRAPHML_NS = '{http://graphml.graphdrawing.org/xmlns}'
+
+# Same conversions networkx.read_graphml applies to <data> values
+GRAPHML_TYPES = {
+    'boolean': lambda value: value.strip().lower() in ('true', '1'),
+    'int': int,
+    'long': int,
+    'float': float,
+    'double': float,
+    'string': str
+}
+
+
+def ensure_graph(db):
+    if not db.has_graph('skill_graph'):
+        logger.info("Creating skill_graph and collections")
+        graph = db.create_graph('skill_graph')
+        graph.create_vertex_collection('users')
+        graph.create_vertex_collection('skills')
+        graph.create_edge_definition(
+            edge_collection='has_skill',
+            from_vertex_collections=['users'],
+            to_vertex_collections=['skills']
+        )
+        graph.create_edge_definition(
+            edge_collection='wants_to_learn',
+            from_vertex_collections=['users'],
+            to_vertex_collections=['skills']
+        )
+        graph.create_edge_definition(
+            edge_collection='user_similarity',
+            from_vertex_collections=['users'],
+            to_vertex_collections=['users']
+        )
+    else:
+        logger.info("Using existing skill_graph")
+        graph = db.graph('skill_graph')
+    return graph
+
+
+def migrate_in_memory(db, graph, graph_path):
+    import networkx as nx
+
+    logger.info(f"Loading graph from {graph_path}")
+    G = nx.read_graphml(graph_path)
+    logger.info(f"Loaded graph with {len(G.nodes)} nodes and {len(G.edges)} edges")
+
+    # Get collections
+    users = db.collection('users')
+    skills = db.collection('skills')
+    has_skill = graph.edge_collection('has_skill')
+    wants_to_learn = graph.edge_collection('wants_to_learn')
+    user_similarity = graph.edge_collection('user_similarity')
+
+    # Migrate nodes with progress bar
+    logger.info("Migrating nodes")
+    user_count = 0
+    skill_count = 0
+
+    for node, attrs in tqdm(list(G.nodes(data=True)), desc="Migrating nodes"):
+        try:
+            if node.startswith('user_'):
+                # Insert user
+                user_doc = {'_key': node, **attrs}
+                try:
+                    users.insert(user_doc, overwrite=False)
+                    user_count += 1
+                except Exception as e:
+                    if "unique constraint violated" not in str(e).lower():
+                        logger.warning(f"Error inserting user {node}: {e}")
+
+            elif node.startswith('skill_'):
+                # Insert skill
+                skill_doc = {'_key': node, **attrs}
+                try:
+                    skills.insert(skill_doc, overwrite=False)
+                    skill_count += 1
+                except Exception as e:
+                    if "unique constraint violated" not in str(e).lower():
+                        logger.warning(f"Error inserting skill {node}: {e}")
+        except Exception as e:
+            logger.error(f"Error processing node {node}: {e}")
+
+    logger.info(f"Migrated {user_count} users and {skill_count} skills")
+
+    # Migrate edges with progress bar
+    logger.info("Migrating edges")
+    has_skill_count = 0
+    wants_to_learn_count = 0
+    user_similarity_count = 0
+
+    for u, v, attrs in tqdm(list(G.edges(data=True)), desc="Migrating edges"):
+        try:
+            if u.startswith('user_') and v.startswith('skill_'):
+                if attrs.get('edge_type') == 'has':
+                    try:
+                        has_skill.insert({
+                            '_from': f'users/{u}',
+                            '_to': f'skills/{v}',
+                            **attrs
+                        }, overwrite=False)
+                        has_skill_count += 1
+                    except Exception as e:
+                        if "unique constraint violated" not in str(e).lower():
+                            logger.warning(f"Error inserting has_skill edge {u}->{v}: {e}")
+
+                elif attrs.get('edge_type') == 'wants':
+                    try:
+                        wants_to_learn.insert({
+                            '_from': f'users/{u}',
+                            '_to': f'skills/{v}',
+                            **attrs
+                        }, overwrite=False)
+                        wants_to_learn_count += 1
+                    except Exception as e:
+                        if "unique constraint violated" not in str(e).lower():
+                            logger.warning(f"Error inserting wants_to_learn edge {u}->{v}: {e}")
+
+            elif u.startswith('user_') and v.startswith('user_'):
+                try:
+                    user_similarity.insert({
+                        '_from': f'users/{u}',
+                        '_to': f'users/{v}',
+                        **attrs
+                    }, overwrite=False)
+                    user_similarity_count += 1
+                except Exception as e:
+                    if "unique constraint violated" not in str(e).lower():
+                        logger.warning(f"Error inserting user_similarity edge {u}->{v}: {e}")
+        except Exception as e:
+            logger.error(f"Error processing edge {u}->{v}: {e}")
+
+    logger.info(f"Migrated {has_skill_count} has_skill edges, {wants_to_learn_count} wants_to_learn edges, and {user_similarity_count} user_similarity edges")
+
+
+def iter_graphml(path):
+    """Yield ('node', id, attrs) and ('edge', source, target, attrs) from a GraphML file.
+
+    Elements are discarded as soon as they are read, so memory stays flat
+    however large the file is.
+    """
+    keys = {}
+    defaults = {'node': {}, 'edge': {}}
+    directed = True
+    graph_elem = None
+
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        tag = elem.tag.replace(GRAPHML_NS, '')
+
+        if event == 'start':
+            if tag == 'graph' and graph_elem is None:
+                graph_elem = elem
+                directed = elem.get('edgedefault', 'directed') == 'directed'
+            continue
+
+        if tag == 'key':
+            cast = GRAPHML_TYPES.get(elem.get('attr.type', 'string'), str)
+            name = elem.get('attr.name', elem.get('id'))
+            keys[elem.get('id')] = (name, cast)
+            default = elem.find(f'{GRAPHML_NS}default')
+            if default is not None and default.text is not None:
+                for domain in ('node', 'edge'):
+                    if elem.get('for', 'all') in (domain, 'all'):
+                        defaults[domain][name] = cast(default.text)
+
+        elif tag in ('node', 'edge'):
+            attrs = dict(defaults[tag])
+            for data in elem.iter(f'{GRAPHML_NS}data'):
+                name, cast = keys.get(data.get('key'), (data.get('key'), str))
+                attrs[name] = cast(data.text or '')
+
+            if tag == 'node':
+                yield ('node', elem.get('id'), attrs)
+            else:
+                source, target = elem.get('source'), elem.get('target')
+                # Undirected files may list user-skill edges either way round
+                if not directed and source.startswith('skill_') and target.startswith('user_'):
+                    source, target = target, source
+                if elem.get('id'):
+                    attrs.setdefault('id', elem.get('id'))
+                yield ('edge', source, target, attrs)
+
+            elem.clear()
+            if graph_elem is not None:
+                graph_elem.clear()
+
+
+def to_document(item):
+    """Map a parsed GraphML item to (collection, document), or None to skip it."""
+    if item[0] == 'node':
+        _, node, attrs = item
+        if node.startswith('user_'):
+            return 'users', {'_key': node, **attrs}
+        if node.startswith('skill_'):
+            return 'skills', {'_key': node, **attrs}
+        return None
+
+    _, u, v, attrs = item
+    if u.startswith('user_') and v.startswith('skill_'):
+        collection = {'has': 'has_skill', 'wants': 'wants_to_learn'}.get(attrs.get('edge_type'))
+        to = f'skills/{v}'
+    elif u.startswith('user_') and v.startswith('user_'):
+        collection = 'user_similarity'
+        to = f'users/{v}'
+    else:
+        return None
+    if collection is None:
+        return None
+
+    # A stable key makes re-importing a batch after a crash a no-op
+    key = hashlib.sha1(f"{u}|{v}|{attrs.get('id', '')}".encode()).hexdigest()
+    return collection, {'_key': key, '_from': f'users/{u}', '_to': to, **attrs}
+
+
+def iter_batches(path, batch_size):
+    """Yield (collection, documents) batches in a deterministic order for a given file."""
+    buffers = {}
+    for item in iter_graphml(path):
+        routed = to_document(item)
+        if routed is None:
+            continue
+        collection, doc = routed
+        buffer = buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= batch_size:
+            yield collection, buffer
+            buffers[collection] = []
+    for collection, buffer in buffers.items():
+        if buffer:
+            yield collection, buffer
+
+
+class Checkpoint:
+    """Highest batch number below which every batch has been imported.
+
+    Batches finish out of order, so only the contiguous prefix is recorded;
+    a resumed run re-sends whatever completed past it, which the stable
+    keys turn into ignored duplicates.
+    """
+
+    def __init__(self, path, graph_path, batch_size):
+        self.path = path
+        stat = os.stat(graph_path)
+        self.source = {
+            'graph_path': os.path.abspath(graph_path),
+            'size': stat.st_size,
+            'mtime': int(stat.st_mtime),
+            'batch_size': batch_size
+        }
+        self.watermark = 0
+        self._done = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path) as f:
+            saved = json.load(f)
+        if saved.get('source') != self.source:
+            raise ValueError(
+                f"Checkpoint {self.path} was written for a different file or batch size; "
+                f"pass --restart to discard it"
+            )
+        self.watermark = saved['completed_batches']
+        return self
+
+    def mark_done(self, batch_number):
+        with self._lock:
+            self._done.add(batch_number)
+            advanced = False
+            while self.watermark + 1 in self._done:
+                self._done.remove(self.watermark + 1)
+                self.watermark += 1
+                advanced = True
+            if advanced:
+                self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'source': self.source, 'completed_batches': self.watermark}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def migrate_streaming(connect, graph_path, batch_size=10000, workers=4, checkpoint_path=None,
+                      on_duplicate='ignore', retries=3):
+    checkpoint = Checkpoint(checkpoint_path or f"{graph_path}.checkpoint", graph_path, batch_size).load()
+    if checkpoint.watermark:
+        logger.info(f"Resuming after batch {checkpoint.watermark}")
+
+    # python-arango sessions aren't shared between threads, so each worker gets its own
+    local = threading.local()
+    totals = {}
+    totals_lock = threading.Lock()
+
+    def import_batch(batch_number, collection, docs):
+        if not hasattr(local, 'db'):
+            local.db = connect()
+        for attempt in range(retries + 1):
+            try:
+                result = local.db.collection(collection).import_bulk(
+                    docs, on_duplicate=on_duplicate, halt_on_error=False, details=True
+                )
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"Batch {batch_number} ({collection}) failed, retrying: {e}")
+                time.sleep(2 ** attempt)
+        for detail in result.get('details', [])[:5]:
+            logger.warning(f"{collection}: {detail}")
+        with totals_lock:
+            counts = totals.setdefault(collection, {'created': 0, 'ignored': 0, 'errors': 0})
+            for field in counts:
+                counts[field] += result.get(field, 0)
+        checkpoint.mark_done(batch_number)
+        return len(docs)
+
+    # Cap in-flight batches so a slow database applies back-pressure to the parser
+    max_pending = workers * 2
+    pending = set()
+    progress = tqdm(desc="Migrating documents", unit='docs')
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch_number, (collection, docs) in enumerate(iter_batches(graph_path, batch_size), start=1):
+                if batch_number <= checkpoint.watermark:
+                    continue
+                if len(pending) >= max_pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        progress.update(future.result())
+                pending.add(executor.submit(import_batch, batch_number, collection, docs))
+            for future in pending:
+                progress.update(future.result())
+    finally:
+        progress.close()
+
+    for collection, counts in sorted(totals.items()):
+        logger.info(
+            f"{collection}: {counts['created']} created, {counts['ignored']} ignored, {counts['errors']} errors"
+        )
+    checkpoint.clear()
+    return totals
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Migrate a GraphML knowledge graph into ArangoDB")
+    parser.add_argument('--graph', default=os.getenv("GRAPH_PATH", "/Users/anshbhatt/Downloads/7331/data/knowledge_graph.graphml"))
+    parser.add_argument('--in-memory', action='store_true',
+                        help="Load the whole graph with networkx and insert one document at a time")
+    parser.add_argument('--batch-size', type=int, default=10000, help="Documents per import_bulk request")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent import_bulk requests")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: <graph>.checkpoint)")
+    parser.add_argument('--restart', action='store_true', help="Ignore any checkpoint and start from the beginning")
+    parser.add_argument('--on-duplicate', default='ignore', choices=['error', 'update', 'replace', 'ignore'])
+    args = parser.parse_args()
+
     try:
         # Get database credentials from environment variables
         arango_url = os.getenv("ARANGO_URL")
         arango_db = os.getenv("ARANGO_DB_NAME")
         arango_user = os.getenv("ARANGO_USERNAME")
         arango_pass = os.getenv("ARANGO_PASSWORD")
-        
+
         if not all([arango_url, arango_db, arango_user, arango_pass]):
             logger.error("Missing required environment variables. Please check your .env file.")
             return
-            
+
+        def connect():
+            return ArangoClient(hosts=arango_url).db(arango_db, username=arango_user, password=arango_pass)
+
         # Connect to ArangoDB
         logger.info(f"Connecting to ArangoDB at {arango_url}")
-        client = ArangoClient(hosts=arango_url)
-        db = client.db(arango_db, username=arango_user, password=arango_pass)
-        
-        # Load the existing graph
-        graph_path = os.getenv("GRAPH_PATH", "/Users/anshbhatt/Downloads/7331/data/knowledge_graph.graphml")
-        logger.info(f"Loading graph from {graph_path}")
-        G = nx.read_graphml(graph_path)
-        logger.info(f"Loaded graph with {len(G.nodes)} nodes and {len(G.edges)} edges")
-        
+        db = connect()
+
         # Set up collections
-        if not db.has_graph('skill_graph'):
-            logger.info("Creating skill_graph and collections")
-            graph = db.create_graph('skill_graph')
-            graph.create_vertex_collection('users')
-            graph.create_vertex_collection('skills')
-            graph.create_edge_definition(
-                edge_collection='has_skill',
-                from_vertex_collections=['users'],
-                to_vertex_collections=['skills']
-            )
-            graph.create_edge_definition(
-                edge_collection='wants_to_learn',
-                from_vertex_collections=['users'],
-                to_vertex_collections=['skills']
-            )
-            graph.create_edge_definition(
-                edge_collection='user_similarity',
-                from_vertex_collections=['users'],
-                to_vertex_collections=['users']
-            )
+        graph = ensure_graph(db)
+
+        if args.in_memory:
+            migrate_in_memory(db, graph, args.graph)
         else:
-            logger.info("Using existing skill_graph")
-            graph = db.graph('skill_graph')
-        
-        # Get collections
-        users = db.collection('users')
-        skills = db.collection('skills')
-        has_skill = graph.edge_collection('has_skill')
-        wants_to_learn = graph.edge_collection('wants_to_learn')
-        user_similarity = graph.edge_collection('user_similarity')
-        
-        # Migrate nodes with progress bar
-        logger.info("Migrating nodes")
-        user_count = 0
-        skill_count = 0
-        
-        for node, attrs in tqdm(list(G.nodes(data=True)), desc="Migrating nodes"):
-            try:
-                if node.startswith('user_'):
-                    # Insert user
-                    user_doc = {'_key': node, **attrs}
-                    try:
-                        users.insert(user_doc, overwrite=False)
-                        user_count += 1
-                    except Exception as e:
-                        if "unique constraint violated" not in str(e).lower():
-                            logger.warning(f"Error inserting user {node}: {e}")
-                
-                elif node.startswith('skill_'):
-                    # Insert skill
-                    skill_doc = {'_key': node, **attrs}
-                    try:
-                        skills.insert(skill_doc, overwrite=False)
-                        skill_count += 1
-                    except Exception as e:
-                        if "unique constraint violated" not in str(e).lower():
-                            logger.warning(f"Error inserting skill {node}: {e}")
-            except Exception as e:
-                logger.error(f"Error processing node {node}: {e}")
-        
-        logger.info(f"Migrated {user_count} users and {skill_count} skills")
-        
-        # Migrate edges with progress bar
-        logger.info("Migrating edges")
-        has_skill_count = 0
-        wants_to_learn_count = 0
-        user_similarity_count = 0
-        
-        for u, v, attrs in tqdm(list(G.edges(data=True)), desc="Migrating edges"):
-            try:
-                if u.startswith('user_') and v.startswith('skill_'):
-                    if attrs.get('edge_type') == 'has':
-                        try:
-                            has_skill.insert({
-                                '_from': f'users/{u}',
-                                '_to': f'skills/{v}',
-                                **attrs
-                            }, overwrite=False)
-                            has_skill_count += 1
-                        except Exception as e:
-                            if "unique constraint violated" not in str(e).lower():
-                                logger.warning(f"Error inserting has_skill edge {u}->{v}: {e}")
-                    
-                    elif attrs.get('edge_type') == 'wants':
-                        try:
-                            wants_to_learn.insert({
-                                '_from': f'users/{u}',
-                                '_to': f'skills/{v}',
-                                **attrs
-                            }, overwrite=False)
-                            wants_to_learn_count += 1
-                        except Exception as e:
-                            if "unique constraint violated" not in str(e).lower():
-                                logger.warning(f"Error inserting wants_to_learn edge {u}->{v}: {e}")
-                
-                elif u.startswith('user_') and v.startswith('user_'):
-                    try:
-                        user_similarity.insert({
-                            '_from': f'users/{u}',
-                            '_to': f'users/{v}',
-                            **attrs
-                        }, overwrite=False)
-                        user_similarity_count += 1
-                    except Exception as e:
-                        if "unique constraint violated" not in str(e).lower():
-                            logger.warning(f"Error inserting user_similarity edge {u}->{v}: {e}")
-            except Exception as e:
-                logger.error(f"Error processing edge {u}->{v}: {e}")
-        
-        logger.info(f"Migrated {has_skill_count} has_skill edges, {wants_to_learn_count} wants_to_learn edges, and {user_similarity_count} user_similarity edges")
+            checkpoint_path = args.checkpoint or f"{args.graph}.checkpoint"
+            if args.restart and os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+            logger.info(f"Streaming {args.graph} with {args.workers} workers")
+            migrate_streaming(
+                connect, args.graph,
+                batch_size=args.batch_size,
+                workers=args.workers,
+                checkpoint_path=checkpoint_path,
+                on_duplicate=args.on_duplicate
+            )
         logger.info("Migration complete!")
 
     except Exception as e:
@@ -161,4 +429,4 @@ def main():
         raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()